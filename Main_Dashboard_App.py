@@ -3,43 +3,43 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 
-from config import USE_GOOGLE_SHEETS, DEFAULT_CURRENCY
-from data_manager import init_storage, load_data, save_data, bump_data_version, clean_data
-from ui_components import sidebar_add_expense, filter_section, theme_css
+from data_manager import prefetch_storage, init_storage, load_data, save_data, append_data, apply_edits, incomplete_rows
+from ui_components import (
+    sidebar_add_expense, filter_section, theme_css, reporting_currency_select, missing_rate_warning,
+    hidden_columns, paginate, perf_panel, period_options, selected_period, period_select, editor_deltas
+)
 from charts import kpi_row, category_pie
-from import_export import import_button, export_buttons
+from import_export import import_button, merge_import, export_buttons
+from core.schema import to_editable
+from core.cache import CACHE
+from core.tracing import start_rerun
 
 
 # ----------------- PAGE SETUP -----------------
 st.set_page_config(page_title="💰 Expense Dashboard", layout="wide")
+start_rerun("Main")  # spans below are grouped per rerun (tracing.py)
+prefetch_storage()  # storage opens (Google auth) while the skeleton below renders
 
 # --- Theme ---
 dark_mode = st.sidebar.checkbox("🌗 Dark mode", value=False)
 theme_css(dark_mode)
+currency = reporting_currency_select()
 
 st.title("💰 Expense Dashboard")
 
 
 # ----------------- DATA LOAD -----------------
-sheet = init_storage()
-version = st.session_state.get("data_version", 0)
-df = load_data(_sheet=sheet, version=version)
+storage = init_storage()
+# A pushdown store (partitioned, SQLite) is read one period at a time; others load the whole ledger
+df = None if storage.supports_pushdown else load_data(storage=storage)  # typed by schema.apply_schema
 
-# Normalize Date column (datetime -> date only)
-if not df.empty and "Date" in df.columns:
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
-
-# Ensure expected columns exist
-expected_cols = ["Date", "ExpenseType", "PricePaid", "Quantity", "PricePerUnit"]
-for c in expected_cols:
-    if c not in df.columns:
-        df[c] = None
+# The period picked in "Select Period" below (its widget state), read first so only it is loaded
+years, months = period_options(df, storage)
+period = selected_period(years, months, "overview")
 
 # Reset merge flags on normal load
-if st.session_state.get("merge_complete", False):
-    st.session_state.pop("merge_complete", None)
-if st.session_state.get("merge_complete_flagged", False):
-    st.session_state.pop("merge_complete_flagged", None)
+just_merged = st.session_state.pop("merge_complete", False)
+st.session_state.pop("merge_complete_flagged", None)
 
 
 # ----------------- LOGGING HELPER -----------------
@@ -48,52 +48,45 @@ def log(msg):
 
 
 # ----------------- SIDEBAR FEATURES -----------------
-sidebar_add_expense(df, lambda d: save_data(d, sheet))
-df_filtered = filter_section(df)
+# Only the new rows are written: one journal record locally, one queued append for Sheets
+sidebar_add_expense(df, lambda d, new_rows=None: append_data([new_rows], storage))
+df_filtered = filter_section(df, storage, scope=period, currency=currency)  # with Amount in the reporting currency
 
 
 # ----------------- IMPORT + MERGE HANDLING -----------------
 log("Import check start")
 
 # Control import preview visibility
-show_import_ui = not st.session_state.get("merge_complete", False) and not st.session_state.get("merge_complete_flagged", False)
+show_import_ui = not just_merged
 
 if show_import_ui:
-    imported_df = import_button(existing_columns=df.columns.tolist() if not df.empty else None)
-
-    if imported_df is not None and not imported_df.empty:
-        # Normalize Date column
-        if "Date" in imported_df.columns:
-            imported_df["Date"] = pd.to_datetime(imported_df["Date"], errors="coerce").dt.date
-
-        st.session_state["pending_import_df"] = imported_df
-        st.session_state["merge_ready"] = True
-        log(f"✅ {len(imported_df)} rows ready to merge.")
-
-        # Show preview
-        st.subheader("📄 Preview Imported Data")
-        st.dataframe(imported_df, width="stretch", hide_index=True)
+    pending_file = import_button()
+    if pending_file is not None:
+        log(f"✅ {pending_file.name} ready to merge.")
 else:
-    if st.session_state.get("merge_complete", False):
-        st.sidebar.success("✅ Last import merged successfully.")
-
-
-# Perform merge
+    if just_merged:
+        report = st.session_state.get("last_merge_report", {})
+        st.sidebar.success(
+            f"✅ Last import merged: {report.get('inserted', 0):,} inserted, "
+            f"{report.get('skipped', 0):,} duplicates skipped."
+        )
+        if report.get("flagged"):
+            with st.sidebar.expander(f"⚠️ {report['flagged']:,} possible near-duplicates inserted"):
+                st.dataframe(to_editable(report["flagged_rows"]), hide_index=True, column_config=hidden_columns())
+
+
+# Perform merge (streamed chunk by chunk into storage)
 if st.session_state.get("merge_ready", False):
-    pending_df = st.session_state.get("pending_import_df", pd.DataFrame())
-    if not pending_df.empty:
+    pending_file = st.session_state.get("pending_import_file")
+    if pending_file is not None:
         try:
-            log(f"🚀 Starting merge process with {len(pending_df)} rows.")
-            df_combined = pd.concat([df, pending_df], ignore_index=True)
-            df_combined = clean_data(df_combined)
-            save_data(df_combined, sheet)
-            st.cache_data.clear()
-            bump_data_version()
-            st.success("✅ Imported data merged successfully!")
+            log(f"🚀 Starting merge process for {pending_file.name}.")
+            report = merge_import(pending_file, storage)
+            st.session_state["last_merge_report"] = report
 
             # Cleanup session
             st.session_state.pop("merge_ready", None)
-            st.session_state.pop("pending_import_df", None)
+            st.session_state.pop("pending_import_file", None)
 
             # Flag to prevent import preview during rerun
             st.session_state["merge_complete_flagged"] = True
@@ -106,51 +99,73 @@ if st.session_state.get("merge_ready", False):
             st.error(f"❌ Merge failed: {e}")
             log(f"❌ Exception: {e}")
     else:
-        log("⚠️ No data in pending_import_df to merge.")
+        log("⚠️ No pending import file to merge.")
 else:
     log("⏸️ Waiting for user to confirm import.")
 
 
 # ----------------- EXPORT BUTTONS -----------------
-export_buttons(df)
+export_buttons(df, storage)
+
+
+# ----------------- GOOGLE SHEETS RESYNC -----------------
+if storage.name == "sheets":
+    if storage.syncing:
+        st.sidebar.caption("🔄 Showing the local copy while the Google Sheet syncs in the background.")
+    elif storage.last_sync_error is not None:
+        st.sidebar.caption(f"⚠️ Google Sheet sync failed ({storage.last_sync_error}); showing the local copy.")
+    status = storage.status()
+    if status["pending"]:
+        retry = f", retrying in {status['retry_in']:.0f}s" if status["retry_in"] else ""
+        error = f" — last error: {status['last_error']}" if status["last_error"] else ""
+        st.sidebar.caption(f"⏳ {status['pending']} change batch(es) waiting to sync{retry}{error}")
+    elif status["last_synced"] is not None:
+        st.sidebar.caption(f"✅ All changes synced ({status['last_synced']:%H:%M:%S})")
+    if st.sidebar.button("🔄 Resync Google Sheet", help="Clear the sheet and rewrite every row."):
+        save_data(df, storage, mode="resync")
+        st.sidebar.success("✅ Sheet rewritten from current data.")
+        st.rerun()
+elif getattr(storage, "last_error", None) is not None:
+    st.sidebar.caption(f"⚠️ Compacting the local journal failed ({storage.last_error}); changes stay journaled and are retried.")
+
+
+# ----------------- CACHE STATS -----------------
+with st.sidebar.expander("🧮 Cache stats", expanded=False):
+    stats = CACHE.stats()
+    st.caption(
+        f"Hits: {stats['hits']} · Misses: {stats['misses']} · Evictions: {stats['evictions']}  \n"
+        f"Entries: {stats['entries']} · {stats['bytes'] / 1e6:,.1f} / {stats['max_bytes'] / 1e6:,.0f} MB"
+    )
 
 
 # ----------------- INCOMPLETE ENTRIES HANDLER -----------------
-if not df.empty and all(c in df.columns for c in ["Date", "ExpenseType"]):
-    missing_critical = df[
-        df["Date"].isna() | (df["Date"] == "") |
-        df["ExpenseType"].isna() | (df["ExpenseType"] == "")
-    ].copy()
-
-    if not missing_critical.empty:
-        with st.expander(f"⚠️ {len(missing_critical)} Incomplete Entries — Click to Review", expanded=False):
-            st.warning(
-                "Some entries are missing **Date** or **Expense Type**. "
-                "These records are excluded from charts and filters until fixed."
-            )
-
-            if "Date" in missing_critical.columns:
-                missing_critical.loc[:, "Date"] = (
-                    pd.to_datetime(missing_critical["Date"], errors="coerce").dt.date
-                )
-
-            editable_missing = st.data_editor(
-                missing_critical,
-                num_rows="dynamic",
-                width="stretch",
-                key="edit_missing_entries",
-                hide_index=True
-            )
-
-            if st.button("💾 Save Fixed Entries", width="stretch"):
-                df = df.drop(missing_critical.index)
-                df = pd.concat([df, editable_missing], ignore_index=True)
-                save_data(df, sheet)
-                bump_data_version()
-                st.success("✅ Fixed entries saved successfully!")
-                st.rerun()
-    else:
-        st.sidebar.success("✅ No incomplete entries found.")
+missing_critical = incomplete_rows(storage=storage)
+
+if not missing_critical.empty:
+    with st.expander(f"⚠️ {len(missing_critical)} Incomplete Entries — Click to Review", expanded=False):
+        st.warning(
+            "Some entries are missing **Date** or **Expense Type**. "
+            "These records are excluded from charts and filters until fixed."
+        )
+
+        shown_missing = to_editable(missing_critical).reset_index(drop=True)
+        st.data_editor(
+            shown_missing,
+            num_rows="dynamic",
+            width="stretch",
+            key="edit_missing_entries",
+            hide_index=True,
+            column_config=hidden_columns(),
+        )
+
+        if st.button("💾 Save Fixed Entries", width="stretch"):
+            # Only the fixed rows are written (matched on RowID)
+            updates, inserts, deletes = editor_deltas(shown_missing, st.session_state.get("edit_missing_entries") or {})
+            apply_edits(updates, inserts, deletes, storage)
+            st.success("✅ Fixed entries saved successfully!")
+            st.rerun()
+elif years:
+    st.sidebar.success("✅ No incomplete entries found.")
 else:
     st.sidebar.info("ℹ️ No data or missing expected columns yet.")
 
@@ -158,55 +173,40 @@ else:
 # ----------------- MONTH / YEAR FILTER FIRST -----------------
 st.markdown("### 📅 Select Period")
 
-if not df_filtered.empty and "Date" in df_filtered.columns:
-    df_filtered["Date"] = pd.to_datetime(df_filtered["Date"], errors="coerce")
-
-    if df_filtered["Date"].notna().any():
-        years = sorted(df_filtered["Date"].dt.year.dropna().unique().tolist(), reverse=True)
-        months = sorted(df_filtered["Date"].dt.month.dropna().unique().tolist())
-
-        col_year, col_month = st.columns([1, 1])
-        with col_year:
-            selected_year = st.selectbox("Select Year", years, key="overview_year")
-        with col_month:
-            month_names = ["All"] + [pd.Timestamp(2000, m, 1).strftime("%B") for m in months]
-            selected_month = st.selectbox("Select Month", month_names, key="overview_month")
-
-        # Filter by selected year/month
-        df_month_filtered = df_filtered[df_filtered["Date"].dt.year == selected_year]
-        if selected_month != "All":
-            month_num = pd.to_datetime(selected_month, format="%B").month
-            df_month_filtered = df_month_filtered[df_month_filtered["Date"].dt.month == month_num]
-    else:
-        df_month_filtered = pd.DataFrame()
-        st.info("No valid dates found in dataset.")
+if period is not None:
+    period_select(years, months, "overview")
+    # filter_section already narrowed the rows to the period; totals below are in the reporting currency (Amount)
+    missing_rate_warning(df_filtered, currency)
+elif not missing_critical.empty:
+    df_filtered = pd.DataFrame()
+    st.info("No valid dates found in dataset.")
 else:
-    df_month_filtered = pd.DataFrame()
+    df_filtered = pd.DataFrame()
     st.info("No expense records available yet.")
 
 
 # ----------------- MAIN DASHBOARD (OVERVIEW) -----------------
 st.markdown("## 📈 Overview")
-if not df_month_filtered.empty:
-    kpi_row(df_month_filtered)
+if not df_filtered.empty:
+    kpi_row(df_filtered, currency)
 else:
     st.info("No data to display KPIs for the selected period.")
 
 
 # ----------------- EXPENSES BY MONTH TABLE -----------------
 st.markdown("### 📅 Expenses by Month")
-if not df_month_filtered.empty:
-    df_display = df_month_filtered.copy()
-    df_display["Date"] = df_display["Date"].dt.strftime("%Y-%m-%d")
-    st.dataframe(df_display, width="stretch", hide_index=True)
+if not df_filtered.empty:
+    page, _ = paginate(df_filtered, "overview_page", sort_columns=["Date", "PricePaid", "Category", "Shop", "Item"])
+    df_display = page.assign(Date=page["Date"].dt.strftime("%Y-%m-%d"))
+    st.dataframe(df_display, width="stretch", hide_index=True, column_config=hidden_columns())
 else:
     st.info("No expenses recorded for the selected period.")
 
 
 # ----------------- PIE CHART -----------------
 st.markdown("## 🥧 Spending Breakdown")
-if not df_month_filtered.empty:
-    category_pie(df_month_filtered)
+if not df_filtered.empty:
+    category_pie(df_filtered, currency)
 else:
     st.info("No spending data to visualize for the selected period.")
 
@@ -218,3 +218,5 @@ if st.sidebar.button("➡️ Go to Analytics Page"):
 
 if st.sidebar.button("✏️ Edit / Delete Entries"):
     st.switch_page("pages/Edit_or_Delete.py")
+
+perf_panel()
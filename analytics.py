@@ -1,31 +1,18 @@
 # analytics.py
 import streamlit as st
-import pandas as pd
-from datetime import datetime
-
-# statsmodels optional import handled safely
-try:
-    from statsmodels.tsa.holtwinters import ExponentialSmoothing
-    HAS_STATS = True
-except Exception:
-    HAS_STATS = False
-
-@st.cache_data(ttl=300)
-def monthly_agg_for_forecast(df):
-    df2 = df.copy()
-    df2["Date"] = pd.to_datetime(df2["Date"], errors="coerce")
-    df2 = df2.dropna(subset=["Date"])
-    df2["YearMonth"] = df2["Date"].dt.to_period("M").astype(str)
-    monthly = df2.groupby("YearMonth")["PricePaid"].sum().reset_index().sort_values("YearMonth")
-    return monthly
-
-def monthly_trends(df):
+from config import DEFAULT_CURRENCY
+from core.forecasting import HAS_STATS, PENDING, forecast_next, group_forecasts
+from core.reports import monthly_totals, month_change, top_categories, efficiency_scores, what_if_savings
+from core.tracing import traced
+
+@traced("analytics.monthly_trends")
+def monthly_trends(cube, currency=DEFAULT_CURRENCY):
     st.subheader("📈 Expense Trends & Forecasts")
-    if df.empty:
+    if cube.empty:
         st.info("No data to display.")
         return
 
-    monthly = monthly_agg_for_forecast(df)
+    monthly = monthly_totals(cube)
     if monthly.empty:
         st.info("No monthly data available.")
         return
@@ -35,10 +22,8 @@ def monthly_trends(df):
     st.line_chart(monthly.set_index("YearMonth")["PricePaid"])
 
     # percent change vs previous month
-    if len(monthly) >= 2:
-        last = monthly["PricePaid"].iloc[-1]
-        prev = monthly["PricePaid"].iloc[-2]
-        pct_change = ((last - prev) / prev * 100) if prev != 0 else 0
+    pct_change = month_change(monthly)
+    if pct_change is not None:
         if pct_change > 0:
             st.markdown(f"**Change vs previous month:** ⬆️ {pct_change:.1f}%")
         else:
@@ -55,55 +40,75 @@ def monthly_trends(df):
         st.warning("Need at least 2 months of data to forecast.")
         return
 
-    try:
-        model = ExponentialSmoothing(monthly["PricePaid"], trend="add", seasonal=None)
-        fit = model.fit()
-        forecast = fit.forecast(1)
-        next_month_forecast = float(forecast.iloc[0])
-        st.markdown(f"**Forecast (next month):** {next_month_forecast:,.0f} SEK")
-    except Exception as e:
-        st.error(f"Forecast failed: {e}")
+    # Cached on the series itself and fitted in the worker pool, never on this thread
+    fit = forecast_next(monthly["PricePaid"].to_numpy())
+    if fit is PENDING:
+        st.info("⏳ Forecast pending: the model workers are still starting.")
+        if st.button("🔄 Refresh forecast", key="forecast_refresh_total"):
+            st.rerun()
+    elif fit is None:
+        st.error("Forecast failed (the fit errored or timed out).")
+    else:
+        st.markdown(f"**Forecast (next month):** {fit['forecast']:,.0f} {currency}")
 
 
-def category_insights(df):
+@traced("analytics.group_forecast_table")
+def group_forecast_table(cube, currency=DEFAULT_CURRENCY):
+    st.subheader("🔮 Next-Month Forecasts by Category & Shop")
+    if cube.empty or not HAS_STATS:
+        st.info("Forecasting needs data and the `statsmodels` package.")
+        return
+
+    for tab, by in zip(st.tabs(["Category", "Shop"]), ["Category", "Shop"]):
+        with tab:
+            forecasts = group_forecasts(cube, by)
+            pending = forecasts.attrs["pending"]
+            if pending:
+                st.info(f"⏳ Forecast pending for {pending} {by.lower()} group(s): the model workers are still starting.")
+                if st.button("🔄 Refresh forecasts", key=f"forecast_refresh_{by}"):
+                    st.rerun()
+            if forecasts.empty:
+                if not pending:
+                    st.info("Not enough months of data to forecast.")
+                continue
+            st.dataframe(
+                forecasts.sort_values("Forecast", ascending=False),
+                hide_index=True,
+                column_config={
+                    "LastMonth": st.column_config.NumberColumn(f"Last month ({currency})", format="%.0f"),
+                    "Forecast": st.column_config.NumberColumn(f"Forecast ({currency})", format="%.0f"),
+                    "Change %": st.column_config.NumberColumn(format="%+.1f%%"),
+                },
+            )
+
+
+@traced("analytics.category_insights")
+def category_insights(cube, currency=DEFAULT_CURRENCY):
     st.subheader("🏆 Category Insights")
-    if df.empty:
+    if cube.empty:
         st.info("No data yet.")
         return
 
-    df2 = df.copy()
-    df2["PricePaid"] = pd.to_numeric(df2["PricePaid"], errors="coerce").fillna(0)
-    df2["Date"] = pd.to_datetime(df2["Date"], errors="coerce")
-    current_month = pd.Timestamp.now().to_period("M").strftime("%Y-%m")
-    df2["YearMonth"] = df2["Date"].dt.to_period("M").astype(str)
-    this_month = df2[df2["YearMonth"] == current_month]
-
-    if this_month.empty:
+    top3 = top_categories(cube)
+    if top3.empty:
         st.info("No expenses recorded this month.")
     else:
-        cat_sum = this_month.groupby("Category")["PricePaid"].sum().reset_index().sort_values("PricePaid", ascending=False)
-        top3 = cat_sum.head(3)
         st.write("**Top 3 Categories (This Month):**")
-        for i, row in top3.iterrows():
-            st.write(f"{i+1}. {row['Category']} — {row['PricePaid']:.0f} SEK")
+        for i, row in enumerate(top3.itertuples(index=False)):
+            st.write(f"{i+1}. {row.Category} — {row.Sum:.0f} {currency}")
 
     # Efficiency score (overall dataset)
-    efficiency = df2.groupby("Category").agg(TotalSpend=("PricePaid", "sum"),
-                                            Purchases=("Category", "count")).reset_index()
-    efficiency["EfficiencyScore"] = efficiency.apply(lambda r: (r["TotalSpend"] / r["Purchases"]) if r["Purchases"] else 0, axis=1)
-    st.write("**Category Efficiency Score (SEK per purchase):**")
-    st.dataframe(efficiency[["Category", "EfficiencyScore"]].sort_values("EfficiencyScore", ascending=False))
+    st.write(f"**Category Efficiency Score ({currency} per purchase):**")
+    st.dataframe(efficiency_scores(cube), hide_index=True)
 
 
-def what_if_simulation(df):
+@traced("analytics.what_if_simulation")
+def what_if_simulation(cube, currency=DEFAULT_CURRENCY):
     st.sidebar.markdown("### 💭 What-if Simulation")
-    if df.empty:
+    if cube.empty:
         st.sidebar.info("No data to simulate.")
         return
     reduction = st.sidebar.slider("Reduce Dining Expenses by (%)", 0, 100, 10)
-    yearly_spend = df["PricePaid"].sum()
-    dining_spend = df[df["Category"].str.contains("dining", case=False, na=False)]["PricePaid"].sum()
-    savings = dining_spend * (reduction / 100)
-    new_total = yearly_spend - savings
-    st.sidebar.info(f"💡 Potential yearly savings: **{savings:,.0f} SEK**")
-    st.sidebar.caption(f"New estimated yearly total: {new_total:,.0f} SEK")
+    savings, new_total = what_if_savings(cube, reduction, "dining")
+    st.sidebar.info(f"💡 Potential yearly savings: **{savings:,.0f} {currency}**")
+    st.sidebar.caption(f"New estimated yearly total: {new_total:,.0f} {currency}")
@@ -0,0 +1,556 @@
+# benchmarks.py
+"""
+Benchmark suite over synthetic ledgers (synthetic_data.py).
+Times the hot paths (load, cleaning, filtering, the chart / analytics
+aggregations, the import merge and exports) at each requested size and
+writes the results as JSON, so runs on two commits can be compared:
+
+    python benchmarks.py --sizes 10k 100k 1M -o bench/head.json
+    python benchmarks.py --compare bench/base.json bench/head.json
+    python benchmarks.py --startup
+
+
+- Cold cases drop the cache namespaces they depend on before every timed call;
+  warm cases (drop=()) measure the cached path
+- Runs in a scratch directory with a fixed exchange-rate provider, so it never
+  touches the app's own store and needs no network
+- --startup imports each page's modules in a fresh interpreter (-X importtime)
+  and fails when one exceeds its budget or eagerly loads a deferred module
+"""
+import argparse
+import ast
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import SIZES, generate_ledger, parse_size
+
+BENCHMARKS = []  # registered cases, in run order
+REPEATS = {10_000: 5, 100_000: 5, 1_000_000: 3}  # timed runs per case, by ledger size (larger: 1)
+REGRESSION_THRESHOLD = 1.2  # --compare flags cases whose median got this much slower
+
+# Cold import budget per page, in seconds (streamlit + pandas alone take about 1.1 s)
+PAGE_IMPORT_BUDGETS = {
+    "Main_Dashboard_App.py": 1.8,
+    "pages/Analytics_and_Trends.py": 1.8,
+    "pages/Edit_or_Delete.py": 1.8,
+}
+# Imported on first use only; a page that loads one of these at import time fails --startup
+DEFERRED_MODULES = ("plotly.express", "statsmodels", "gspread", "oauth2client", "openpyxl", "requests")
+
+
+def benchmark(name, group, drop=(), setup=None, max_rows=None):
+    """
+    Register fn(workload, *setup(workload)) as a timed case.
+    drop: cache namespaces discarded before each run ("*" = the whole cache).
+    max_rows: skip the case on larger ledgers.
+    """
+    def decorator(fn):
+        BENCHMARKS.append({"name": name, "group": group, "fn": fn, "drop": drop, "setup": setup, "max_rows": max_rows})
+        return fn
+    return decorator
+
+
+class _FixedRates:
+    """Offline rate provider: fixed SEK-based rates."""
+    SEK = {"SEK": 1.0, "INR": 0.125, "USD": 10.5, "EUR": 11.4}
+
+    def fetch(self, base, symbols, date):
+        return {target: self.SEK[base] / self.SEK[target] for target in symbols if target in self.SEK}
+
+
+class _Upload(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+class Workload:
+    """A synthetic ledger in an Arrow store, loaded the way the app loads it."""
+
+    def __init__(self, rows, workdir, seed=0):
+        from config import DEFAULT_CURRENCY
+        from core.ledger import load_data, get_cube, reporting_data
+        from core.storage_backends import ArrowBackend, PartitionedBackend
+
+        self.rows = rows
+        self.workdir = workdir
+        self.currency = DEFAULT_CURRENCY
+        self.path = os.path.join(workdir, f"ledger_{rows}.arrow")
+        self.storage = ArrowBackend(self.path)
+        self.storage.save(generate_ledger(rows, seed=seed))  # the app's own Arrow schema
+        self.raw = self.storage.load()
+        self.df = load_data(self.storage)
+        self.report = reporting_data(self.storage, self.currency)
+        self.cube = get_cube(self.storage, self.currency)
+        self.partitioned = PartitionedBackend(os.path.join(workdir, f"ledger_{rows}"))
+        self.partitioned.save(self.raw)
+
+        dates = self.df["Date"]
+        span = dates.max() - dates.min()
+        self.period = {"Year": [dates.max().year], "Month": [dates.max().month]}  # the latest month
+        self.expense = generate_ledger(1, seed=seed + 2)  # one row added from the sidebar
+        self.filters = {
+            "Category": self.df["Category"].value_counts().index[:3].tolist(),
+            "Shop": self.df["Shop"].value_counts().index[:5].tolist(),
+            "PricePaid": (0.0, float(self.df["PricePaid"].quantile(0.9))),
+            "Date": ((dates.min() + span / 4).date(), (dates.max() - span / 4).date()),
+        }
+
+        # Import: a tenth of the ledger's size, half of it rows the store already has
+        size = max(rows // 10, 1)
+        fresh = generate_ledger(size - size // 2, seed=seed + 1)
+        repeated = self.raw.sample(size // 2, random_state=seed)
+        upload = pd.concat([fresh, repeated], ignore_index=True).drop(columns="RowID")
+        self.upload = _Upload(upload.to_csv(index=False).encode("utf-8"), "import.csv")
+
+
+# ====================================================
+# 📦 LOAD / CLEAN
+# ====================================================
+@benchmark("load_data (cold)", "load", drop=("load_data",))
+def _load_cold(w):
+    from core.ledger import load_data
+    return load_data(w.storage)
+
+
+@benchmark("load_data (cached)", "load")
+def _load_warm(w):
+    from core.ledger import load_data
+    return load_data(w.storage)
+
+
+@benchmark("clean_data", "load")
+def _clean(w):
+    from core.ledger import clean_data
+    return clean_data(w.raw)
+
+
+@benchmark("reporting_data (currency normalization)", "load", drop=("reporting_data",))
+def _reporting(w):
+    from core.ledger import reporting_data
+    return reporting_data(w.storage, w.currency)
+
+
+@benchmark("get_cube (cold)", "load", drop=("cube", "reporting_data"))
+def _cube(w):
+    from core.ledger import get_cube
+    return get_cube(w.storage, w.currency)
+
+
+# ====================================================
+# 📅 PERIOD READS (one month of the ledger)
+# ====================================================
+@benchmark("read latest month (partitioned)", "period", drop=("query_data",))
+def _period_partitioned(w):
+    from core.ledger import query_data
+    return query_data(w.partitioned, w.period)
+
+
+@benchmark("read latest month (single file)", "period", drop=("load_data", "query_data"))
+def _period_single_file(w):
+    from core.ledger import query_data
+    return query_data(w.storage, w.period)
+
+
+@benchmark("period options (partitioned)", "period", drop=("distinct_values",))
+def _period_options(w):
+    from core.ledger import distinct_values
+    return [distinct_values(w.partitioned, "Month", {"Year": [year]}) for year in distinct_values(w.partitioned, "Year")]
+
+
+# ====================================================
+# ✍️ WRITES (adding an expense, journal compaction)
+# ====================================================
+def _write_target(w):
+    """A copy of the workload's partitioned store (the cases write to it), without a journal."""
+    from core.storage_backends import PartitionedBackend
+
+    path = os.path.join(w.workdir, "write_target")
+    shutil.rmtree(path, ignore_errors=True)
+    shutil.copytree(w.partitioned.path, path)
+    for stale in (f"{path}.journal", f"{path}.journal.checkpoint"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    return PartitionedBackend(path)
+
+
+def _journaled_target(w):
+    from core.journal import JournaledStorage
+
+    backend = _write_target(w)
+    return (JournaledStorage(backend, f"{backend.path}.journal", compact_bytes=float("inf")),)
+
+
+def _pending_journal(w):
+    """A journal holding 100 added expenses of 10 rows, waiting to be compacted."""
+    (storage,) = _journaled_target(w)
+    storage.append_chunks(generate_ledger(10, seed=i) for i in range(100))
+    return (storage,)
+
+
+@benchmark("add expense (journaled)", "write", setup=_journaled_target)
+def _add_journaled(w, storage):
+    from core.ledger import append_data
+    return append_data([w.expense], storage)
+
+
+@benchmark("add expense (partition rewrite)", "write", setup=lambda w: (_write_target(w),))
+def _add_rewrite(w, storage):
+    from core.ledger import append_data
+    return append_data([w.expense], storage)
+
+
+@benchmark("journal compaction (1k rows)", "write", setup=_pending_journal)
+def _compaction(w, storage):
+    return storage.compact()
+
+
+# ====================================================
+# 🔍 FILTERING (filter_section)
+# ====================================================
+@benchmark("filter index build", "filter", drop=("bitmap_index",))
+def _index_build(w):
+    from core.bitmap_index import filter_index
+    return filter_index(w.df)
+
+
+@benchmark("filter rows (bitmap index)", "filter")
+def _filter_index(w):
+    from core.bitmap_index import filter_index
+    return filter_index(w.df).take(w.df, w.filters)
+
+
+@benchmark("filter options (bitmap index)", "filter")
+def _filter_options(w):
+    from core.bitmap_index import filter_index
+    index = filter_index(w.df)
+    return [index.options(column, w.filters) for column in ("Category", "Shop")]
+
+
+@benchmark("filter rows (scan)", "filter")
+def _filter_scan(w):
+    from core.storage_backends import apply_filters
+    return apply_filters(w.df, w.filters)
+
+
+@benchmark("filter_section", "filter")
+def _filter_section(w):
+    from ui_components import filter_section
+    return filter_section(w.df)
+
+
+# ====================================================
+# 📊 CHARTS / ANALYTICS
+# ====================================================
+@benchmark("kpi_row", "charts")
+def _kpi(w):
+    from charts import kpi_row
+    kpi_row(w.report, w.currency)
+
+
+@benchmark("category_pie", "charts")
+def _pie(w):
+    from charts import category_pie
+    category_pie(w.report, w.currency)
+
+
+@benchmark("monthly_spending", "charts", drop=("monthly_totals",))
+def _monthly(w):
+    from charts import monthly_spending
+    monthly_spending(w.cube, w.currency)
+
+
+@benchmark("daily_spending", "charts")
+def _daily(w):
+    from charts import daily_spending
+    daily_spending(w.cube, w.currency)
+
+
+@benchmark("calendar_heatmap", "charts")
+def _heatmap(w):
+    from charts import calendar_heatmap
+    calendar_heatmap(w.cube)
+
+
+@benchmark("stacked_area_chart", "charts")
+def _stacked(w):
+    from charts import stacked_area_chart
+    stacked_area_chart(w.cube)
+
+
+@benchmark("multi_year_comparison", "charts")
+def _multi_year(w):
+    from charts import multi_year_comparison
+    multi_year_comparison(w.cube)
+
+
+@benchmark("monthly_trends (cold)", "analytics", drop=("monthly_totals", "forecast"))
+def _trends(w):
+    from analytics import monthly_trends
+    monthly_trends(w.cube, w.currency)
+
+
+@benchmark("group_forecast_table (cold)", "analytics", drop=("group_series", "forecast"))
+def _group_forecasts_cold(w):
+    from analytics import group_forecast_table
+    group_forecast_table(w.cube, w.currency)
+
+
+@benchmark("group_forecast_table (cached)", "analytics")
+def _group_forecasts_warm(w):
+    from analytics import group_forecast_table
+    group_forecast_table(w.cube, w.currency)
+
+
+@benchmark("category_insights", "analytics")
+def _insights(w):
+    from analytics import category_insights
+    category_insights(w.cube, w.currency)
+
+
+@benchmark("what_if_simulation", "analytics")
+def _what_if(w):
+    from analytics import what_if_simulation
+    what_if_simulation(w.cube, w.currency)
+
+
+# ====================================================
+# 📥 IMPORT MERGE / 📤 EXPORT
+# ====================================================
+def _fresh_store(w):
+    """A copy of the workload's store (merges write to it) and no dedup index."""
+    from config import FINGERPRINT_INDEX_FILE
+    from core.storage_backends import ArrowBackend
+
+    path = os.path.join(w.workdir, "merge_target.arrow")
+    shutil.copyfile(w.path, path)
+    if os.path.exists(FINGERPRINT_INDEX_FILE):
+        os.remove(FINGERPRINT_INDEX_FILE)
+    w.upload.seek(0)
+    return (ArrowBackend(path),)
+
+
+@benchmark("import merge (dedup, append)", "import", setup=_fresh_store)
+def _merge(w, storage):
+    from core.ledger import import_data, merge_data
+    return merge_data((chunk for chunk, _ in import_data(w.upload)), storage)
+
+
+def _export_case(file_type, max_rows=None):
+    @benchmark(f"export {file_type}", "export", drop=("export",), max_rows=max_rows)
+    def _export(w):
+        from core.ledger import cached_export_bytes
+        return cached_export_bytes(w.df, file_type, w.storage)
+    return _export
+
+
+for _file_type, _max_rows in [("csv", None), ("csv.gz", None), ("parquet", None), ("xlsx", 100_000)]:
+    _export_case(_file_type, _max_rows)
+
+
+# ====================================================
+# 🚀 COLD START
+# ====================================================
+def _page_imports(path):
+    """A page's top-level import statements, as source."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_profile(page, root=None):
+    """
+    Cold import of a page's modules in a fresh interpreter. Returns seconds,
+    the slowest top-level imports and any DEFERRED_MODULES that got loaded.
+    """
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    probe = _page_imports(os.path.join(root, page)) + (
+        f"\nimport sys\nprint([m for m in {DEFERRED_MODULES!r} if m in sys.modules])"
+    )
+    done = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe], cwd=root, capture_output=True, text=True, check=True
+    )
+    top = []
+    for line in done.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # top level: imported by the page itself, not a dependency
+            top.append((name.strip(), int(cumulative) / 1e6))
+    top.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "page": page,
+        "seconds": sum(seconds for _, seconds in top),
+        "slowest": top[:5],
+        "eager": ast.literal_eval(done.stdout.strip().splitlines()[-1]),
+    }
+
+
+def check_startup(budgets=PAGE_IMPORT_BUDGETS):
+    """Print each page's import profile against its budget. Returns the pages over budget or loading deferred modules."""
+    failures = []
+    for page, budget in budgets.items():
+        profile = import_profile(page)
+        over = profile["seconds"] > budget
+        flag = "  <-- over budget" if over else ""
+        print(f"{page:<32} {profile['seconds']:6.2f} s / {budget:.2f} s{flag}")
+        print("    " + ", ".join(f"{name} {seconds:.2f}" for name, seconds in profile["slowest"]))
+        if profile["eager"]:
+            print(f"    loaded at import: {', '.join(profile['eager'])}  <-- should be deferred")
+        if over or profile["eager"]:
+            failures.append(profile)
+    return failures
+
+
+# ====================================================
+# ▶️ RUNNER
+# ====================================================
+def _environment():
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    import pyarrow
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pyarrow.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _time_case(case, workload, repeat):
+    from core.cache import CACHE
+
+    runs = []
+    for _ in range(repeat):
+        for namespace in case["drop"]:
+            CACHE.clear() if namespace == "*" else CACHE.discard(namespace)
+        args = case["setup"](workload) if case["setup"] else ()
+        start = time.perf_counter()
+        case["fn"](workload, *args)
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run(sizes, only=None, seed=0, workdir=None):
+    """Run every registered case (or those whose name contains only) at each size."""
+    import streamlit.logger
+    from core.currency_manager import set_rate_provider
+
+    streamlit.logger.set_log_level("error")  # bare-mode warnings from the render functions
+    set_rate_provider(_FixedRates())
+    results = []
+    for label in sizes:
+        rows = parse_size(label)
+        repeat = REPEATS.get(rows, 1)
+        start = time.perf_counter()
+        workload = Workload(rows, workdir, seed=seed)
+        print(f"== {label} ({rows:,} rows, setup {time.perf_counter() - start:.1f}s)", file=sys.stderr)
+        for case in BENCHMARKS:
+            if only and only not in case["name"]:
+                continue
+            result = {"size": label, "rows": rows, "group": case["group"], "case": case["name"]}
+            if case["max_rows"] and rows > case["max_rows"]:
+                result["skipped"] = f"over {case['max_rows']:,} rows"
+            else:
+                try:
+                    runs = _time_case(case, workload, repeat)
+                    result.update(runs=runs, min=min(runs), median=statistics.median(runs))
+                except Exception as e:
+                    result["error"] = f"{type(e).__name__}: {e}"
+            results.append(result)
+            print(f"  {case['name']:<42} {_describe(result)}", file=sys.stderr)
+        del workload
+    return results
+
+
+def _describe(result):
+    if "median" in result:
+        return f"{result['median'] * 1000:10.1f} ms"
+    return result.get("skipped") or result.get("error")
+
+
+def compare(baseline_path, current_path, threshold=REGRESSION_THRESHOLD):
+    """Print per-case median ratios (current / baseline). Returns the regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["size"], r["case"]): r for r in json.load(f)["results"]}
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    regressions = []
+    for result in current:
+        before = baseline.get((result["size"], result["case"]))
+        if before is None or "median" not in before or "median" not in result:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- slower"
+            regressions.append(result)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{result['size']:>5} {result['case']:<42} {before['median'] * 1000:10.1f} -> "
+              f"{result['median'] * 1000:10.1f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Expense tracker benchmark suite.")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k"], help=f"ledger sizes ({', '.join(SIZES)} or a number)")
+    parser.add_argument("-o", "--out", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("-k", "--only", help="run only cases whose name contains this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two results files")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--startup", action="store_true", help="check each page's cold import time against its budget")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        return 1 if check_startup() else 0
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        return 1 if regressions else 0
+
+    out = os.path.abspath(args.out)
+    workdir = tempfile.mkdtemp(prefix="expense-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # relative store paths from config (rates, dedup index) land here
+    try:
+        results = run(args.sizes, only=args.only, seed=args.seed, workdir=workdir)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"environment": _environment(), "seed": args.seed, "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# chart_data.py
+"""
+Data reduction for charts, so payloads stay bounded as the ledger grows.
+- lttb_indices / downsample: Largest-Triangle-Three-Buckets downsampling of
+  long series to CHART_MAX_POINTS, keeping the visual shape (peaks, dips)
+- downsample_shared: one common x subset for several stacked series
+- fold_top_n: keep the CHART_TOP_N largest categories, fold the rest into "Other"
+- daily_grid: year-aware weekday x ISO-week grid (one column per week of
+  every year), pre-aggregated so a heatmap ships cells, not days
+- render_mode: WebGL for series longer than CHART_WEBGL_THRESHOLD, judged on
+  the full series (the downsampled trace still carries up to CHART_MAX_POINTS)
+"""
+import numpy as np
+import pandas as pd
+
+from config import CHART_MAX_POINTS, CHART_TOP_N, CHART_WEBGL_THRESHOLD
+from core.derived import add_derived
+
+OTHER = "Other"
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def lttb_indices(y, threshold, x=None):
+    """
+    Positions of the points LTTB keeps out of y (at most threshold, always
+    the first and last). x defaults to the positions themselves.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    y = np.nan_to_num(y)
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)  # threshold - 2 inner buckets
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        nxt_start, nxt_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_start:nxt_end].mean()
+        avg_y = y[nxt_start:nxt_end].mean()
+        # Point in this bucket forming the largest triangle with a and the next average
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(df, x, y, max_points=CHART_MAX_POINTS):
+    """Rows of df (sorted by x) reduced to about max_points with LTTB on y."""
+    if len(df) <= max_points:
+        return df
+    df = df.sort_values(x)
+    xs = df[x]
+    numeric_x = xs.astype("int64") if pd.api.types.is_datetime64_any_dtype(xs) else (
+        xs if pd.api.types.is_numeric_dtype(xs) else None
+    )
+    return df.iloc[lttb_indices(df[y].to_numpy(), max_points, None if numeric_x is None else numeric_x.to_numpy())]
+
+
+def downsample_shared(df, x, y, by, max_points=CHART_MAX_POINTS):
+    """
+    Long-format series (one per value of by) cut to a common set of about
+    max_points x values, chosen by LTTB on their total, so stacks stay aligned.
+    """
+    totals = df.groupby(x, observed=True)[y].sum().sort_index()
+    if len(totals) <= max_points:
+        return df
+    kept = totals.index[lttb_indices(totals.to_numpy(), max_points)]
+    return df[df[x].isin(kept)]
+
+
+def fold_top_n(df, by, value, n=CHART_TOP_N, keys=()):
+    """
+    Aggregated rows with the n largest values of by (by total value) kept and
+    the rest summed into one "Other" per combination of keys.
+    """
+    totals = df.groupby(by, observed=True)[value].sum()
+    if len(totals) <= n:
+        return df
+    top = totals.nlargest(n).index
+    labels = df[by].astype(object).where(df[by].isin(top), OTHER)
+    folded = (
+        df.assign(**{by: labels})
+        .groupby(list(keys) + [by], observed=True, sort=False)[value].sum()
+        .reset_index()
+    )
+    order = {name: i for i, name in enumerate(list(top) + [OTHER])}  # largest first, Other last
+    return folded.sort_values(by, key=lambda s: s.map(order), kind="stable", ignore_index=True)
+
+
+def fill_missing(df, x, by, value):
+    """Long-format series with a 0 for every (x, by) pair missing, so areas stack correctly."""
+    wide = df.pivot_table(index=x, columns=by, values=value, aggfunc="sum", fill_value=0.0, observed=True)
+    return wide.reset_index().melt(id_vars=x, var_name=by, value_name=value)
+
+
+def daily_grid(daily, date_column="Date", value_column="PricePaid"):
+    """
+    Weekday x ISO-week matrix of daily totals across years: rows Monday..Sunday,
+    one column per week from the first to the last date ("2024-W05"); days
+    without spending are NaN.
+    """
+    days = add_derived(daily.rename(columns={date_column: "Date"}), ["Weekday", "ISOYear", "ISOWeek"])
+    days["Week"] = days["ISOYear"].astype(str) + "-W" + days["ISOWeek"].astype(str).str.zfill(2)
+    grid = days.pivot_table(index="Weekday", columns="Week", values=value_column, aggfunc="sum")
+
+    # Every week in the range, so gaps show as gaps instead of being squeezed out
+    dates = days["Date"]
+    mondays = pd.date_range(dates.min() - pd.Timedelta(days=dates.min().dayofweek), dates.max(), freq="W-MON")
+    iso = mondays.isocalendar()
+    weeks = iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2)
+    return grid.reindex(index=WEEKDAYS, columns=weeks.tolist())
+
+
+def render_mode(points):
+    """Plotly render_mode for a series of this many points (count them before downsampling)."""
+    return "webgl" if points > CHART_WEBGL_THRESHOLD else "svg"
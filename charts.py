@@ -1,39 +1,40 @@
 # charts.py
-import pandas as pd
-import plotly.express as px
 import streamlit as st
+from core.cube import rollup
+from chart_data import downsample, downsample_shared, fold_top_n, fill_missing, daily_grid, render_mode
+from core.reports import monthly_totals
+from config import DEFAULT_CURRENCY
+from core.tracing import traced
 
 
-@st.cache_data(ttl=300)
-def grouped_monthly(df):
-    df2 = df.copy()
-    df2["Date"] = pd.to_datetime(df2["Date"], errors="coerce")
-    df2 = df2.dropna(subset=["Date"])
-    df2["YearMonth"] = df2["Date"].dt.to_period("M").astype(str)
-    agg = (
-        df2.groupby("YearMonth")["PricePaid"]
-        .sum()
-        .reset_index()
-        .sort_values("YearMonth")
-    )
-    return agg
+def _px():
+    """plotly.express, imported with the first chart instead of with the page (~0.2 s)."""
+    import plotly.express as px
+    return px
+
+
+def _amount_column(df):
+    """Reporting-currency Amount when the frame was normalized, else raw PricePaid."""
+    return "Amount" if "Amount" in df.columns else "PricePaid"
 
 
-def kpi_row(df):
+@traced("chart.kpi_row")
+def kpi_row(df, currency=DEFAULT_CURRENCY):
     if df.empty or "PricePaid" not in df.columns:
         st.info("No data to show KPIs.")
         return
 
-    total_spent = df["PricePaid"].sum()
-    avg_tx = df["PricePaid"].mean() if len(df) > 0 else 0
+    amount = df[_amount_column(df)]
+    total_spent = amount.sum()
+    avg_tx = amount.mean() if len(df) > 0 else 0
     categories = df["Category"].nunique()
     col1, col2, col3 = st.columns(3)
     col1.markdown(
-        f"<div class='kpi-card'><div class='kpi-label'>💰 Total Spent</div><div class='kpi-value'>{total_spent:,.0f} SEK</div></div>",
+        f"<div class='kpi-card'><div class='kpi-label'>💰 Total Spent</div><div class='kpi-value'>{total_spent:,.0f} {currency}</div></div>",
         unsafe_allow_html=True,
     )
     col2.markdown(
-        f"<div class='kpi-card'><div class='kpi-label'>🧾 Avg Transaction</div><div class='kpi-value'>{avg_tx:,.0f} SEK</div></div>",
+        f"<div class='kpi-card'><div class='kpi-label'>🧾 Avg Transaction</div><div class='kpi-value'>{avg_tx:,.0f} {currency}</div></div>",
         unsafe_allow_html=True,
     )
     col3.markdown(
@@ -42,99 +43,121 @@ def kpi_row(df):
     )
 
 
-def category_pie(df):
+@traced("chart.category_pie")
+def category_pie(df, currency=DEFAULT_CURRENCY):
     if df.empty:
         st.info("No data available to display.")
         return
+    column = _amount_column(df)
     agg = (
-        df.groupby("Category")["PricePaid"]
+        df.groupby("Category", observed=True)[column]
         .sum()
         .reset_index()
-        .sort_values("PricePaid", ascending=False)
+        .sort_values(column, ascending=False)
     )
-    fig = px.pie(
+    agg = fold_top_n(agg, "Category", column)
+    fig = _px().pie(
         agg,
         names="Category",
-        values="PricePaid",
-        title="💸 Spending by Category",
+        values=column,
+        title=f"💸 Spending by Category ({currency})",
         hole=0.3,
     )
     st.plotly_chart(fig, width="stretch", config={"displayModeBar": False})
 
 
-def monthly_spending(df):
-    if df.empty:
+@traced("chart.monthly_spending")
+def monthly_spending(cube, currency=DEFAULT_CURRENCY):
+    if cube.empty:
         st.info("No data available to display.")
         return
-    agg = grouped_monthly(df)
-    fig = px.line(
+    monthly = monthly_totals(cube)
+    agg = downsample(monthly, "YearMonth", "PricePaid")
+    fig = _px().line(
         agg,
         x="YearMonth",
         y="PricePaid",
         markers=True,
         title="📈 Monthly Spending Trend",
-        labels={"PricePaid": "SEK"},
+        labels={"PricePaid": currency},
+        render_mode=render_mode(len(monthly)),
     )
     st.plotly_chart(fig, width="stretch", config={"displayModeBar": False})
 
 
-def calendar_heatmap(df):
-    if df.empty:
+@traced("chart.daily_spending")
+def daily_spending(cube, currency=DEFAULT_CURRENCY):
+    if cube.empty:
+        st.info("No data available to display.")
+        return
+    # One point per day with spending: thousands over a few years, so LTTB and WebGL apply here
+    daily = rollup(cube, "Day")[["Day", "Sum"]].rename(columns={"Day": "Date", "Sum": "PricePaid"})
+    agg = downsample(daily, "Date", "PricePaid")
+    fig = _px().line(
+        agg,
+        x="Date",
+        y="PricePaid",
+        title="📉 Daily Spending",
+        labels={"PricePaid": currency},
+        render_mode=render_mode(len(daily)),
+    )
+    st.plotly_chart(fig, width="stretch", config={"displayModeBar": False})
+
+
+@traced("chart.calendar_heatmap")
+def calendar_heatmap(cube):
+    if cube.empty:
         st.info("No data available to display.")
         return
-    df2 = df.copy()
-    df2["Date"] = pd.to_datetime(df2["Date"], errors="coerce")
-    df2 = df2.dropna(subset=["Date"])
-    daily = df2.groupby(df2["Date"].dt.date)["PricePaid"].sum().reset_index()
+    daily = rollup(cube, "Day")[["Day", "Sum"]]
     daily.columns = ["Date", "PricePaid"]
-    daily["Date"] = pd.to_datetime(daily["Date"])
-    daily["dow"] = daily["Date"].dt.day_name()
-    daily["week"] = daily["Date"].dt.isocalendar().week
-    fig = px.density_heatmap(
-        daily,
-        x="week",
-        y="dow",
-        z="PricePaid",
-        title="📆 Spending Heatmap (week vs weekday)",
+    # One cell per day, weeks of every year side by side (a week is "2024-W05")
+    grid = daily_grid(daily)
+    fig = _px().imshow(
+        grid,
+        aspect="auto",
+        title="📆 Spending Heatmap (ISO week vs weekday)",
         color_continuous_scale="Blues",
+        labels={"x": "Week", "y": "", "color": "Spent"},
     )
     st.plotly_chart(fig, width="stretch", config={"displayModeBar": False})
 
 
-def stacked_area_chart(df):
-    if df.empty:
+@traced("chart.stacked_area_chart")
+def stacked_area_chart(cube):
+    if cube.empty:
         st.info("No data available to display.")
         return
-    df2 = df.copy()
-    df2["Date"] = pd.to_datetime(df2["Date"], errors="coerce")
-    df2 = df2.dropna(subset=["Date"])
-    df2["YearMonth"] = df2["Date"].dt.to_period("M").astype(str)
     monthly_cat = (
-        df2.groupby(["YearMonth", "Category"])["PricePaid"]
-        .sum()
-        .reset_index()
-        .sort_values("YearMonth")
+        rollup(cube, ["YearMonth", "Category"])[["YearMonth", "Category", "Sum"]]
+        .rename(columns={"Sum": "PricePaid"})
     )
-    fig = px.area(
+    monthly_cat = fold_top_n(monthly_cat, "Category", "PricePaid", keys=["YearMonth"])
+    order = monthly_cat.groupby("Category", observed=True)["PricePaid"].sum().sort_values(ascending=False).index.tolist()
+    monthly_cat = downsample_shared(fill_missing(monthly_cat, "YearMonth", "Category", "PricePaid"), "YearMonth", "PricePaid", "Category")
+    monthly_cat = monthly_cat.sort_values("YearMonth", kind="stable")
+    fig = _px().area(
         monthly_cat,
         x="YearMonth",
         y="PricePaid",
         color="Category",
+        category_orders={"Category": order},
         title="📊 Monthly Spending by Category (Stacked)",
     )
     st.plotly_chart(fig, width="stretch", config={"displayModeBar": False})
 
 
-def multi_year_comparison(df):
-    if df.empty:
+@traced("chart.multi_year_comparison")
+def multi_year_comparison(cube):
+    if cube.empty:
         st.info("No data available to display.")
         return
-    df2 = df.copy()
-    df2["Date"] = pd.to_datetime(df2["Date"], errors="coerce")
-    df2 = df2.dropna(subset=["Date"])
-    df2["Year"] = df2["Date"].dt.year
-    agg = df2.groupby(["Year", "Category"])["PricePaid"].sum().reset_index()
-    fig = px.bar(
+    agg = (
+        rollup(cube, ["Year", "Category"])[["Year", "Category", "Sum"]]
+        .rename(columns={"Sum": "PricePaid"})
+    )
+    agg = fold_top_n(agg, "Category", "PricePaid", keys=["Year"])
+    fig = _px().bar(
         agg,
         x="Category",
         y="PricePaid",
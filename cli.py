@@ -0,0 +1,159 @@
+# cli.py
+"""
+Command-line front end over core/ (no Streamlit, no plotly):
+    python cli.py import expenses.csv         append every row
+    python cli.py merge expenses.xlsx         append only rows not already stored
+    python cli.py export -f parquet -o out.parquet
+    python cli.py report --currency SEK --by Shop --forecast
+    python cli.py relabel-currency --before 2026-10-17
+Heavy modules are imported inside the commands, so --help and argument
+errors return at once. With Google Sheets, commands read the sheet itself
+(a blocking sync, not the local mirror) and wait until their writes have
+reached it; a write that doesn't make it exits with status 1.
+"""
+import argparse
+import sys
+
+EXPORT_CHOICES = ["csv", "csv.gz", "xlsx", "parquet"]  # core.ledger.EXPORT_FORMATS
+FLUSH_TIMEOUT = 300  # seconds to wait for queued Sheets writes before giving up
+
+
+def _storage(args):
+    from core.ledger import open_storage
+
+    storage = open_storage(use_sheets=not args.local)
+    if storage.name == "sheets":
+        storage.sync()  # the app reconciles the mirror in the background; a one-shot command can't
+    return storage
+
+
+def _finish_writes(storage):
+    """Return once every write reached the store; raise OSError if one didn't."""
+    if hasattr(storage, "flush"):  # Sheets: the write-behind queue
+        if not storage.flush(timeout=FLUSH_TIMEOUT):
+            pending = storage.status()["pending"]
+            raise OSError(f"{pending} change batch(es) not written to Google Sheets "
+                          f"(kept in the local journal for the next run): {storage.last_error}")
+    elif hasattr(storage, "compact"):
+        storage.compact()  # fold the journaled rows into the local store before the process exits
+
+
+def _import(args):
+    from core.ledger import import_data, append_data, merge_data
+
+    storage = _storage(args)
+    with open(args.file, "rb") as f:
+        chunks = (chunk for chunk, _ in import_data(f))
+        if args.command == "merge":
+            report = merge_data(chunks, storage)
+            summary = (f"{report['inserted']:,} inserted, {report['skipped']:,} duplicates skipped, "
+                       f"{report['flagged']:,} possible near-duplicates inserted")
+        else:
+            summary = f"{append_data(chunks, storage):,} rows imported"
+    _finish_writes(storage)
+    print(summary)
+
+
+def _export(args):
+    from core.ledger import load_data, cached_export_bytes
+
+    storage = _storage(args)
+    data = cached_export_bytes(load_data(storage), args.format, storage)
+    out = args.out or f"expenses_export.{args.format}"
+    with open(out, "wb") as f:
+        f.write(data)
+    print(f"Wrote {len(data):,} bytes to {out}")
+
+
+def _relabel(args):
+    from core.ledger import relabel_converted_rows
+
+    storage = _storage(args)
+    relabelled = relabel_converted_rows(storage, args.before)
+    _finish_writes(storage)
+    print(f"{relabelled:,} rows relabelled")
+
+
+def _report(args):
+    import pandas as pd
+    from core.ledger import reporting_data, get_cube
+    from core.currency_manager import unconverted_counts
+    from core.reports import summary, category_totals
+
+    storage = _storage(args)
+    cube = get_cube(storage, args.currency)
+    if cube.empty:
+        print("No data.")
+        return
+    for code, n in unconverted_counts(reporting_data(storage, args.currency)).items():
+        print(f"warning: no {code} -> {args.currency} rate; {n:,} rows left out of the totals", file=sys.stderr)
+    s = summary(cube, forecast=args.forecast)
+    print(f"Total spent:   {s['total']:,.0f} {args.currency} over {s['transactions']:,} transactions, {s['months']} months")
+    print(f"Last month:    {s['last_month']}  {s['last_month_total']:,.0f} {args.currency}"
+          + ("" if s["change_pct"] is None else f" ({s['change_pct']:+.1f}% vs previous)"))
+    if s["forecast"] is not None:
+        print(f"Forecast next: {s['forecast']:,.0f} {args.currency}")
+
+    with pd.option_context("display.float_format", "{:,.0f}".format, "display.width", 120):
+        if args.by == "Category":
+            print("\n" + category_totals(cube).head(args.top).to_string(index=False))
+        else:
+            from core.cube import rollup
+            totals = rollup(cube, args.by).rename(columns={"Sum": "TotalSpend", "Count": "Purchases"})
+            totals = totals.sort_values("TotalSpend", ascending=False)[[args.by, "TotalSpend", "Purchases"]]
+            print("\n" + totals.head(args.top).to_string(index=False))
+
+        if args.forecast:
+            from core.forecasting import HAS_STATS, group_forecasts
+
+            if not HAS_STATS:
+                print("\nForecasting needs the `statsmodels` package.", file=sys.stderr)
+            else:
+                forecasts = group_forecasts(cube, args.by, block=True).sort_values("Forecast", ascending=False)
+                print("\n" + forecasts.head(args.top).to_string(index=False))
+
+
+def main(argv=None):
+    from config import DEFAULT_CURRENCY, SUPPORTED_CURRENCIES
+
+    parser = argparse.ArgumentParser(description="Expense tracker command line.")
+    parser.add_argument("--local", action="store_true", help="use the local store even if Google Sheets is enabled")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in [("import", "append every row of a CSV/XLSX file"),
+                            ("merge", "append only rows not already stored (deduplicating)")]:
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument("file")
+        sub.set_defaults(handler=_import)
+
+    sub = commands.add_parser("export", help="write the ledger to a file")
+    sub.add_argument("-f", "--format", choices=EXPORT_CHOICES, default="csv")
+    sub.add_argument("-o", "--out", help="output file (default expenses_export.<format>)")
+    sub.set_defaults(handler=_export)
+
+    sub = commands.add_parser("report", help="print a spending summary")
+    sub.add_argument("--currency", choices=SUPPORTED_CURRENCIES, default=DEFAULT_CURRENCY)
+    sub.add_argument("--by", choices=["Category", "Shop"], default="Category")
+    sub.add_argument("--top", type=int, default=10, help="rows per table")
+    sub.add_argument("--forecast", action="store_true", help="add next-month forecasts (overall and per group)")
+    sub.set_defaults(handler=_report)
+
+    sub = commands.add_parser(
+        "relabel-currency",
+        help="one-time fix: label rows converted on entry (before amounts were stored as paid) "
+             f"as {DEFAULT_CURRENCY}",
+    )
+    sub.add_argument("--before", required=True, metavar="YYYY-MM-DD",
+                     help="the day amounts started being stored as paid; older non-"
+                          f"{DEFAULT_CURRENCY} rows are relabelled")
+    sub.set_defaults(handler=_relabel)
+
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
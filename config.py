@@ -3,13 +3,50 @@ USE_GOOGLE_SHEETS = True
 SHEET_NAME = "ExpenseTracker"
 WORKSHEET_NAME = "Transactions"
 LOCAL_CSV_FILE = "expenses_local.csv"
+LOCAL_ARROW_FILE = "expenses_local.arrow"
+LOCAL_SQLITE_FILE = "expenses_local.db"
+LOCAL_PARTITION_DIR = "expenses_local"      # one Arrow file per year / month + manifest.json
+LOCAL_JOURNAL_FILE = "expenses_local.journal"   # fsynced row writes waiting to be compacted into the local store
+JOURNAL_COMPACT_BYTES = 8_000_000                 # journal size that triggers a background compaction
+LOCAL_STORAGE_BACKEND = "partitioned"   # "partitioned" (per-month Arrow files), "arrow" (typed, memory-mapped), "sqlite" (indexed, filter pushdown) or "csv"
 CREDENTIALS_FILE = "credentials.json"
+SHEETS_MIRROR_FILE = "sheets_mirror.json"   # local copy of the worksheet, refreshed incrementally
+WRITE_JOURNAL_DIR = "write_journal"         # Sheets writes waiting for the background writer
+WRITE_COALESCE_SECONDS = 1.0                # saves arriving within this window go out as one write
+WRITE_RETRY_MAX = 300                       # seconds; cap on the retry backoff while Sheets is down
+
+# Import settings
+IMPORT_CHUNK_ROWS = 5000     # rows parsed / validated / written per chunk
+IMPORT_PREVIEW_ROWS = 200    # size of the sampled preview
+FINGERPRINT_INDEX_FILE = "expenses_fingerprints.npz"   # dedup index for merges
 
 # UI settings
+TABLE_PAGE_SIZES = [50, 100, 250, 500]   # rows per page offered by paginated tables
+TABLE_PAGE_SIZE = 100                    # default page size
 DEFAULT_CURRENCY = "SEK"
 SUPPORTED_CURRENCIES = ["SEK", "INR", "USD", "EUR"]
+CHART_MAX_POINTS = 2000         # points per chart series before LTTB downsampling (chart_data.py)
+CHART_TOP_N = 8                 # categories shown per chart; the rest are folded into "Other"
+CHART_WEBGL_THRESHOLD = 1000    # series points (before downsampling) above which line traces use WebGL; keep below CHART_MAX_POINTS
+
+# Exchange rates (currency_manager.py)
+RATES_DB_FILE = "exchange_rates.db"   # persistent (date, base, target) rate store
+RATE_FETCH_TIMEOUT = 5                # seconds per batched provider request
+RATE_RETRY_AFTER = 300                # seconds before retrying a failed fetch
 
 # Cache TTLs (seconds)
 CACHE_TTL_SHORT = 60        # small operations
 CACHE_TTL_MEDIUM = 300      # grouping / charts
 CACHE_TTL_LONG = 3600       # exchange rates
+
+# Forecasting (forecasting.py)
+FORECAST_WORKERS = 2        # worker processes for per-category / per-shop fits (at most one per CPU)
+FORECAST_TIMEOUT = 5        # seconds to wait for any one series before skipping it
+FORECAST_MIN_MONTHS = 2     # shortest series that gets a forecast
+
+# Tracing (tracing.py): history kept for the performance panel's percentiles and dumps
+TRACE_HISTORY_SPANS = 20000
+TRACE_HISTORY_RERUNS = 200
+
+# In-process data cache (cache.py): total size budget before LRU eviction
+CACHE_MAX_BYTES = 512 * 1024 * 1024
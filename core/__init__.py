@@ -0,0 +1,7 @@
+# core/__init__.py
+"""
+Streamlit-free core of the expense tracker: storage, cleaning, aggregation,
+forecasting and currency conversion. Used by the Streamlit pages (through
+data_manager, analytics, charts) and by cli.py; nothing here imports streamlit
+or plotly. Import the submodules directly (core.ledger, core.reports, ...).
+"""
@@ -0,0 +1,112 @@
+# core/bitmap_index.py
+"""
+Per-column value -> row bitmap index for the cascading filters.
+Built once per data version (cached on the frame fingerprint); afterwards a
+filter mask is a bitwise AND / OR of packed bitmaps and a dropdown's options
+come from intersecting each value's bitmap with the mask, with no frame scans
+or copies. Takes the same filters dict as storage_backends.apply_filters.
+- Columns with up to BITMAP_MAX_VALUES values keep one packed bitmap per value
+- Wider columns (e.g. Item) keep integer codes; their masks are a table lookup
+- Date, PricePaid and (in reporting-currency frames) Amount ranges compare
+  against the stored column arrays
+"""
+import numpy as np
+import pandas as pd
+
+from core.cache import cached_on_frame
+from core import derived
+from core.storage_backends import RANGE_COLUMNS
+from core.tracing import span, traced
+
+INDEXED_COLUMNS = ["ExpenseType", "Category", "Subcategory", "Item", "Brand", "Shop", "Year", "Month"]
+BITMAP_MAX_VALUES = 64
+
+
+class _Column:
+    """Sorted distinct values, per-row codes (-1 = missing) and, if narrow, packed bitmaps."""
+
+    def __init__(self, series):
+        codes, values = pd.factorize(series, sort=True, use_na_sentinel=True)
+        self.values = list(values)
+        self.codes = codes
+        self.bitmaps = None
+        if len(values) <= BITMAP_MAX_VALUES:
+            self.bitmaps = np.stack([np.packbits(codes == k) for k in range(len(values))]) if len(values) else None
+
+    def mask(self, selection):
+        """Packed bitmap of rows whose value is in selection."""
+        positions = pd.Index(self.values).get_indexer(list(selection))
+        positions = positions[positions >= 0]
+        if self.bitmaps is not None and len(positions):
+            return np.bitwise_or.reduce(self.bitmaps[positions], axis=0)
+        table = np.zeros(len(self.values) + 1, dtype=bool)  # last slot catches code -1
+        table[positions] = True
+        return np.packbits(table[self.codes])
+
+    def present(self, mask, n):
+        """Values that occur in at least one row of mask."""
+        if self.bitmaps is not None:
+            hits = np.flatnonzero((self.bitmaps & mask).any(axis=1))
+        else:
+            codes = self.codes[np.unpackbits(mask, count=n).astype(bool)]
+            hits = np.unique(codes[codes >= 0])
+        return [self.values[i] for i in hits]
+
+
+class BitmapIndex:
+    """Filter masks and dropdown options for one version of the ledger."""
+
+    def __init__(self, df):
+        self.n = len(df)
+        dates = pd.to_datetime(df["Date"], errors="coerce") if "Date" in df.columns else pd.Series(pd.NaT, index=df.index)
+        self.columns = {}
+        for name in INDEXED_COLUMNS:
+            # Year / Month are the precomputed derived columns (derived.py)
+            series = derived.column(df, name) if name in ("Year", "Month") else df.get(name)
+            if series is not None:
+                self.columns[name] = _Column(series.astype(object).where(series.notna(), None))
+        self.ranges = {
+            "Date": dates.dt.normalize().to_numpy(dtype="datetime64[ns]"),
+            "PricePaid": pd.to_numeric(df["PricePaid"], errors="coerce").to_numpy(dtype=float)
+            if "PricePaid" in df.columns else np.full(self.n, np.nan),
+        }
+        if "Amount" in df.columns:
+            self.ranges["Amount"] = df["Amount"].to_numpy(dtype=float)
+        self._all = np.packbits(np.ones(self.n, dtype=bool))
+
+    def mask(self, filters):
+        """Packed bitmap of the rows matching filters (AND across columns, OR within one)."""
+        mask = self._all
+        for column, selection in (filters or {}).items():
+            if selection is None or len(selection) == 0:
+                continue
+            if column in RANGE_COLUMNS and column in self.ranges:
+                low, high = selection
+                values = self.ranges[column]
+                if column == "Date":
+                    low, high = pd.Timestamp(low).to_datetime64(), pd.Timestamp(high).to_datetime64()
+                mask = mask & np.packbits((values >= low) & (values <= high))
+            elif column in self.columns:
+                mask = mask & self.columns[column].mask(selection)
+        return mask
+
+    def options(self, column, filters=None):
+        """Sorted values of column among the rows matching filters."""
+        if column not in self.columns:
+            return []
+        return self.columns[column].present(self.mask(filters), self.n)
+
+    def positions(self, filters):
+        return np.flatnonzero(np.unpackbits(self.mask(filters), count=self.n))
+
+    @traced("bitmap_index.take", arg=None)
+    def take(self, df, filters):
+        """The rows of df (the frame the index was built from) matching filters."""
+        return df.iloc[self.positions(filters)]
+
+
+@cached_on_frame("bitmap_index")
+def filter_index(df):
+    """BitmapIndex for df, built once per data version."""
+    with span("bitmap_index.build", rows=len(df)):
+        return BitmapIndex(df)
@@ -0,0 +1,182 @@
+# core/cache.py
+"""
+Version-keyed, bounded in-process cache.
+Entries are keyed on (namespace, dataset fingerprint, params) instead of hashing
+DataFrame contents. The fingerprint comes from the storage backend (file
+stat / revision counter), so a lookup costs a tuple comparison.
+- LRU eviction once the estimated size passes CACHE_MAX_BYTES
+- Storing a new fingerprint in a namespace drops that namespace's older ones
+  (entries differing only in params, e.g. the currency, live side by side)
+- hits / misses / evictions counters via CACHE.stats()
+"""
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import wraps
+
+import pandas as pd
+
+from config import CACHE_MAX_BYTES
+from core.tracing import span
+
+_MISSING = object()
+
+
+def estimate_size(value):
+    """Rough in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class VersionedCache:
+    """LRU cache keyed on (namespace, fingerprint, params) with a byte budget."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (value, size, expires_at)
+        self._latest = {}               # namespace -> newest fingerprint seen
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _drop_superseded(self, namespace, fingerprint):
+        if self._latest.get(namespace) == fingerprint:
+            return
+        self._latest[namespace] = fingerprint
+        for key in [k for k in self._entries if k[0] == namespace and k[1] != fingerprint]:
+            self._drop(key)
+            self.evictions += 1
+
+    def peek(self, namespace, fingerprint, params=()):
+        """Return a cached value (or None) without touching the counters."""
+        with self._lock:
+            entry = self._entries.get((namespace, fingerprint, params))
+            if entry is None or (entry[2] is not None and entry[2] < time.monotonic()):
+                return None
+            return entry[0]
+
+    def entries(self, namespace, fingerprint):
+        """[(params, value)] for every live entry stored under namespace and fingerprint."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key[2], value) for key, (value, _, expires_at) in self._entries.items()
+                if key[0] == namespace and key[1] == fingerprint and (expires_at is None or expires_at >= now)
+            ]
+
+    def put(self, namespace, fingerprint, value, params=(), ttl=None):
+        """Store a value, evicting superseded versions and least-recently-used entries."""
+        key = (namespace, fingerprint, params)
+        size = estimate_size(value)
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._drop_superseded(namespace, fingerprint)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, namespace, fingerprint, compute, params=(), ttl=None, rekey=None):
+        """
+        Return the cached value for the key, computing and storing it on a miss.
+        rekey(value) gives the fingerprint to store a computed value under, for
+        computations that can move it (a load that refreshes its source).
+        """
+        key = (namespace, fingerprint, params)
+        with span(f"cache.{namespace}") as s:
+            with self._lock:
+                entry = self._entries.get(key, _MISSING)
+                if entry is not _MISSING:
+                    if entry[2] is None or entry[2] >= time.monotonic():
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        s.attrs["hit"] = True
+                        return entry[0]
+                    self._drop(key)
+                self.misses += 1
+            s.attrs["hit"] = False
+            value = compute()
+            return self.put(namespace, fingerprint if rekey is None else rekey(value), value, params=params, ttl=ttl)
+
+    def discard(self, namespace):
+        """Drop every entry stored under namespace."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == namespace]:
+                self._drop(key)
+            self._latest.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+CACHE = VersionedCache(CACHE_MAX_BYTES)
+
+
+# ====================================================
+# 🏷️ FRAME FINGERPRINTS
+# ====================================================
+# Frames produced from a fingerprinted dataset (loaded ledger, cube) are tagged
+# so functions receiving them can use the tag as their cache key. The variant
+# tells apart frames built from the same data (e.g. the cube per currency): it
+# goes into the params, so they are cached side by side and only a new dataset
+# fingerprint supersedes them.
+_TAGS = {}
+
+
+def tag_fingerprint(obj, fingerprint, variant=()):
+    """Remember the dataset fingerprint (and variant) a frame was built from."""
+    key = id(obj)
+    _TAGS[key] = (weakref.ref(obj, lambda _: _TAGS.pop(key, None)), fingerprint, variant)
+    return obj
+
+
+def frame_fingerprint(obj):
+    """(fingerprint, variant) of a tagged frame, or a content hash for untagged frames."""
+    entry = _TAGS.get(id(obj))
+    if entry is not None and entry[0]() is obj:
+        return entry[1], entry[2]
+    return ("content", len(obj), int(pd.util.hash_pandas_object(obj, index=False).sum())), ()
+
+
+def cached_on_frame(namespace, ttl=None):
+    """Decorator: cache fn(frame, *args) on the frame's fingerprint plus its variant and args."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(frame, *args):
+            fingerprint, variant = frame_fingerprint(frame)
+            return CACHE.get_or_compute(
+                namespace, fingerprint, lambda: fn(frame, *args), params=variant + args, ttl=ttl
+            )
+        return wrapper
+    return decorator
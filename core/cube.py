@@ -0,0 +1,71 @@
+# core/cube.py
+"""
+Pre-aggregated spending cube shared by charts and analytics.
+One cell per (Day, YearMonth, Year, Category, Subcategory, Shop, Currency)
+holding Sum / Count / Min / Max of the amount (PricePaid, or the reporting-
+currency Amount added by currency_manager.normalize_amounts). Views roll the cube up to the
+keys they need instead of re-scanning raw transactions. Count counts rows
+with an amount: a row without one (e.g. no exchange rate) is in no measure.
+"""
+import pandas as pd
+
+from core.derived import column
+from core.tracing import traced
+
+CUBE_KEYS = ["Day", "YearMonth", "Year", "Category", "Subcategory", "Shop", "Currency"]
+CUBE_MEASURES = ["Sum", "Count", "Min", "Max"]
+
+
+@traced("build_cube")
+def build_cube(df, value_column="PricePaid"):
+    """
+    Aggregate raw transactions into cube cells. Rows without a valid Date are skipped.
+    Expects a frame typed by schema.apply_schema.
+    """
+    if df.empty or "Date" not in df.columns:
+        return pd.DataFrame(columns=CUBE_KEYS + CUBE_MEASURES)
+
+    base = pd.DataFrame({
+        "Day": df["Date"],
+        "YearMonth": column(df, "YearMonth"),
+        "Year": column(df, "Year"),
+    })
+    for key in CUBE_KEYS[3:]:
+        base[key] = df[key] if key in df.columns else None
+    base["PricePaid"] = df[value_column]
+    base = base.dropna(subset=["Day"])
+    base["Year"] = base["Year"].astype(int)
+
+    return (
+        base.groupby(CUBE_KEYS, dropna=False, observed=True)["PricePaid"]
+        .agg(Sum="sum", Count="count", Min="min", Max="max")
+        .reset_index()
+    )
+
+
+@traced("merge_cubes")
+def merge_cubes(cube, delta):
+    """Fold the cells of delta (e.g. built from appended rows) into cube."""
+    if delta.empty:
+        return cube
+    if cube.empty:
+        return delta
+    return (
+        pd.concat([cube, delta], ignore_index=True)
+        .groupby(CUBE_KEYS, dropna=False, observed=True)
+        .agg(Sum=("Sum", "sum"), Count=("Count", "sum"), Min=("Min", "min"), Max=("Max", "max"))
+        .reset_index()
+    )
+
+
+@traced("rollup")
+def rollup(cube, keys):
+    """
+    Roll the cube up to the given key(s).
+    Cells with a missing key are dropped, as a plain groupby would.
+    """
+    return (
+        cube.groupby(keys, observed=True)
+        .agg(Sum=("Sum", "sum"), Count=("Count", "sum"), Min=("Min", "min"), Max=("Max", "max"))
+        .reset_index()
+    )
@@ -0,0 +1,203 @@
+# core/currency_manager.py
+"""
+Exchange rates backed by a persistent on-disk store.
+- Rates live in SQLite keyed by (date, base, target), so restarts cost nothing
+- A miss fetches every SUPPORTED_CURRENCIES rate for the base in one request
+- When the provider is unreachable the last known rate is served instantly
+- The provider is pluggable (set_rate_provider), e.g. a local stub in tests
+- normalize_amounts converts a whole ledger into a reporting currency at once;
+  unconverted_counts reports the rows it had no rate for (left out of totals)
+"""
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import date as _date
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_CURRENCY, SUPPORTED_CURRENCIES, RATES_DB_FILE, RATE_FETCH_TIMEOUT, RATE_RETRY_AFTER
+from core.tracing import traced
+
+
+class ExchangeRateHostProvider:
+    """exchangerate.host: all symbols for one base and date in a single call."""
+
+    def fetch(self, base, symbols, date):
+        import requests  # only needed on a cache miss; keeps the import cheap
+
+        endpoint = "latest" if date == _date.today().isoformat() else date
+        resp = requests.get(
+            f"https://api.exchangerate.host/{endpoint}",
+            params={"base": base, "symbols": ",".join(symbols)},
+            timeout=RATE_FETCH_TIMEOUT,
+        ).json()
+        rates = resp.get("rates") or {}
+        return {target: float(rate) for target, rate in rates.items() if rate}
+
+
+class RateStore:
+    """SQLite table of rates keyed by (date, base, target)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rates ("
+                " date TEXT, base TEXT, target TEXT, rate REAL,"
+                " PRIMARY KEY (date, base, target))"
+            )
+
+    def get(self, date, base, target):
+        with closing(sqlite3.connect(self.path)) as conn:
+            row = conn.execute(
+                "SELECT rate FROM rates WHERE date = ? AND base = ? AND target = ?", (date, base, target)
+            ).fetchone()
+        return row[0] if row else None
+
+    def latest(self, base, target, on_or_before=None):
+        """Most recent known rate (up to on_or_before if given), or None."""
+        sql = "SELECT rate FROM rates WHERE base = ? AND target = ?"
+        params = [base, target]
+        if on_or_before:
+            sql += " AND date <= ?"
+            params.append(on_or_before)
+        with closing(sqlite3.connect(self.path)) as conn:
+            row = conn.execute(sql + " ORDER BY date DESC LIMIT 1", params).fetchone()
+            if row is None and on_or_before:
+                # Nothing that old: fall back to the earliest rate we have
+                row = conn.execute(
+                    "SELECT rate FROM rates WHERE base = ? AND target = ? ORDER BY date LIMIT 1", (base, target)
+                ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, date, base, rates):
+        """Store base -> target rates for a date, plus their inverses."""
+        rows = []
+        for target, rate in rates.items():
+            rows.append((date, base, target, rate))
+            if rate:
+                rows.append((date, target, base, 1.0 / rate))
+        with self._lock, closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO rates VALUES (?, ?, ?, ?)", rows)
+
+
+_provider = ExchangeRateHostProvider()
+_store = None
+_store_lock = threading.Lock()
+_failed_fetches = {}  # (date, base) -> monotonic time of the last failed fetch
+
+
+def set_rate_provider(provider):
+    """Swap the rate provider (anything with fetch(base, symbols, date) -> {target: rate})."""
+    global _provider
+    _provider = provider
+    _failed_fetches.clear()
+
+
+def get_rate_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RateStore(RATES_DB_FILE)
+        return _store
+
+
+def refresh_rates(base, date=None):
+    """Fetch and store all SUPPORTED_CURRENCIES rates for base on date. Returns True on success."""
+    date = date or _date.today().isoformat()
+    last_failure = _failed_fetches.get((date, base))
+    if last_failure is not None and time.monotonic() - last_failure < RATE_RETRY_AFTER:
+        return False  # recently offline: don't stall every rerun on the timeout
+    try:
+        rates = _provider.fetch(base, [c for c in SUPPORTED_CURRENCIES if c != base], date)
+    except Exception:
+        rates = {}
+    if not rates:
+        _failed_fetches[(date, base)] = time.monotonic()
+        return False
+    _failed_fetches.pop((date, base), None)
+    get_rate_store().put_many(date, base, rates)
+    return True
+
+
+def get_exchange_rate(base="INR", target="SEK", date=None):
+    """
+    Return conversion factor: 1 base = X target, for date (ISO string, default today).
+    Served from the store when known; otherwise fetched in one batch, falling
+    back to the last known rate when offline. None if no rate was ever seen.
+    """
+    if base == target:
+        return 1.0
+    date = date or _date.today().isoformat()
+    store = get_rate_store()
+    rate = store.get(date, base, target)
+    if rate is None and refresh_rates(base, date):
+        rate = store.get(date, base, target)
+    if rate is None:
+        rate = store.latest(base, target, on_or_before=date)
+    return rate
+
+
+# ====================================================
+# 💱 BATCH NORMALIZATION INTO THE REPORTING CURRENCY
+# ====================================================
+def rate_history(target):
+    """All stored rates into target as a DataFrame [Date, Currency, Rate]."""
+    with closing(sqlite3.connect(get_rate_store().path)) as conn:
+        history = pd.read_sql_query(
+            "SELECT date AS Date, base AS Currency, rate AS Rate FROM rates WHERE target = ? ORDER BY date",
+            conn, params=(target,),
+        )
+    history["Date"] = pd.to_datetime(history["Date"]).astype("datetime64[ns]")
+    return history
+
+
+@traced("normalize_amounts")
+def normalize_amounts(df, target=DEFAULT_CURRENCY, amount_column="PricePaid", out_column="Amount"):
+    """
+    Return df with out_column = amount_column converted into target.
+    One vectorized merge_asof against the stored (date, currency) rate table
+    picks the rate nearest each row's Date; rows without a Currency are taken
+    to be in DEFAULT_CURRENCY. Rows with no known rate at all get NaN
+    (see unconverted_counts).
+    """
+    currency = df["Currency"].astype(object).where(df["Currency"].notna(), DEFAULT_CURRENCY)
+    foreign = currency != target
+    rates = np.where(foreign, np.nan, 1.0)
+
+    if foreign.any():
+        history = rate_history(target)
+        if not set(currency[foreign].unique()) <= set(history["Currency"]):
+            refresh_rates(target)  # one batched request covers every currency
+            history = rate_history(target)
+
+        left = pd.DataFrame({
+            "Date": df["Date"].astype("datetime64[ns]").to_numpy(),
+            "Currency": currency.to_numpy(),
+            "_pos": np.arange(len(df)),
+        })[foreign.to_numpy()]
+        dated = left["Date"].notna()
+        if dated.any() and not history.empty:
+            merged = pd.merge_asof(
+                left[dated].sort_values("Date"), history.sort_values("Date"),
+                on="Date", by="Currency", direction="nearest",
+            )
+            rates[merged["_pos"].to_numpy()] = merged["Rate"].to_numpy()
+        if (~dated).any() and not history.empty:
+            latest = history.groupby("Currency")["Rate"].last()
+            undated = left[~dated]
+            rates[undated["_pos"].to_numpy()] = undated["Currency"].map(latest).to_numpy(dtype=float)
+
+    return df.assign(**{out_column: df[amount_column].to_numpy() * rates})
+
+
+def unconverted_counts(df, amount_column="PricePaid", out_column="Amount"):
+    """{currency: rows} that normalize_amounts left at NaN for lack of a rate."""
+    lost = df[out_column].isna() & df[amount_column].notna()
+    if not lost.any():
+        return {}
+    currency = df["Currency"].astype(object).where(df["Currency"].notna(), DEFAULT_CURRENCY)
+    return currency[lost].value_counts().to_dict()
@@ -0,0 +1,140 @@
+# core/dedup.py
+"""
+Hash-indexed deduplicating merge for imports.
+Every row gets a 64-bit fingerprint over normalized Date / Shop / Item /
+PricePaid / Quantity (vectorized with pandas' hash_pandas_object). A
+persistent index of fingerprint -> count for the stored ledger lets a
+re-imported, overlapping statement be merged in O(n):
+- skipped:  the stored ledger already holds as many copies of the row
+- flagged:  new row, but same day + shop + whole-unit amount as a stored row
+- inserted: everything else (flagged rows are inserted too)
+Counts (not a plain set) keep genuinely repeated purchases on the same day.
+Every chunk is checked against the index as it was before the import, so
+rows repeated within one file are treated the same wherever the chunks split.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FINGERPRINT_COLUMNS = ["Date", "Shop", "Item", "PricePaid", "Quantity"]
+
+
+def _norm_text(series):
+    return series.astype(object).where(series.notna(), "").astype(str).str.strip().str.lower().str.split().str.join(" ")
+
+
+def _hash(frame):
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype="uint64")
+
+
+def row_fingerprints(df):
+    """Exact-match fingerprints for schema-typed rows."""
+    return _hash(pd.DataFrame({
+        "Date": df["Date"].dt.strftime("%Y-%m-%d").fillna(""),
+        "Shop": _norm_text(df["Shop"]),
+        "Item": _norm_text(df["Item"]),
+        "PricePaid": df["PricePaid"].round(2).fillna(0.0),
+        "Quantity": df["Quantity"].round(3).fillna(0.0),
+    }))
+
+
+def near_fingerprints(df):
+    """Looser fingerprints (day, shop, amount rounded to whole units) for near-duplicates."""
+    return _hash(pd.DataFrame({
+        "Date": df["Date"].dt.strftime("%Y-%m-%d").fillna(""),
+        "Shop": _norm_text(df["Shop"]),
+        "PricePaid": df["PricePaid"].round(0).fillna(0.0),
+    }))
+
+
+class FingerprintIndex:
+    """
+    Fingerprint counts for the stored ledger, persisted to an .npz file.
+    source is the storage fingerprint the index was built against; a
+    mismatch means the store changed elsewhere and the index is rebuilt.
+    """
+
+    def __init__(self, exact=None, near=None, source=None):
+        self.exact = exact if exact is not None else pd.Series(dtype="int64")
+        self.near = near if near is not None else pd.Index([], dtype="uint64")
+        self.source = source
+
+    @classmethod
+    def build(cls, df, source=None):
+        if df.empty:
+            return cls(source=source)
+        exact = pd.Series(row_fingerprints(df)).value_counts()
+        near = pd.Index(np.unique(near_fingerprints(df)))
+        return cls(exact, near, source)
+
+    @classmethod
+    def load(cls, path):
+        """Return the saved index, or None if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                exact = pd.Series(data["exact_counts"], index=data["exact_keys"])
+                source = json.loads(str(data["source"]))
+                return cls(exact, pd.Index(data["near_keys"]), source)
+        except Exception:
+            return None
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            exact_keys=self.exact.index.to_numpy(dtype="uint64"),
+            exact_counts=self.exact.to_numpy(dtype="int64"),
+            near_keys=self.near.to_numpy(dtype="uint64"),
+            source=np.array(json.dumps(self.source, default=str)),
+        )
+        os.replace(tmp_path, path)
+
+    def matches(self, source):
+        return json.dumps(self.source, default=str) == json.dumps(source, default=str)
+
+    def add(self, df):
+        """Record rows that were written to storage."""
+        if df.empty:
+            return
+        counts = pd.Series(row_fingerprints(df)).value_counts()
+        self.exact = self.exact.add(counts, fill_value=0).astype("int64")
+        self.near = self.near.union(pd.Index(np.unique(near_fingerprints(df))))
+
+
+def deduplicate(chunks, index, report):
+    """
+    Filter an iterable of schema-typed chunks against the index, yielding only
+    rows to insert. report (a dict) accumulates inserted / skipped / flagged
+    counts and keeps up to 100 flagged rows under "flagged_rows".
+    """
+    # The stored ledger's fingerprints as of the start: the caller may add
+    # written chunks to index meanwhile (add() replaces, never mutates, these)
+    exact, near_keys = index.exact, index.near
+    seen = pd.Series(dtype="int64")  # fingerprint -> copies already met in this import
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        fps = pd.Series(row_fingerprints(chunk), index=chunk.index)
+
+        # Occurrence number of each row among identical rows met so far in the import
+        occurrence = fps.map(seen).fillna(0).astype("int64") + fps.groupby(fps).cumcount()
+        stored = fps.map(exact).fillna(0).astype("int64")
+        duplicate = occurrence < stored
+        seen = seen.add(fps.value_counts(), fill_value=0).astype("int64")
+
+        fresh = chunk[~duplicate.to_numpy()]
+        near = pd.Series(near_fingerprints(fresh), index=fresh.index).isin(near_keys)
+
+        report["skipped"] = report.get("skipped", 0) + int(duplicate.sum())
+        report["inserted"] = report.get("inserted", 0) + len(fresh)
+        report["flagged"] = report.get("flagged", 0) + int(near.sum())
+        flagged_rows = report.get("flagged_rows")
+        if near.any() and (flagged_rows is None or len(flagged_rows) < 100):
+            report["flagged_rows"] = pd.concat([flagged_rows, fresh[near.to_numpy()]]).head(100)
+
+        if not fresh.empty:
+            yield fresh
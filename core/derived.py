@@ -0,0 +1,90 @@
+# core/derived.py
+"""
+Derived-column engine.
+Calendar parts of Date (Year, Month, MonthName, YearMonth, Weekday, ISO year /
+week) and PricePerUnit are registered once with vectorized definitions.
+load_data adds them to the ledger once per data version. After a save, only
+the appended or edited rows are derived, and the result is spliced into the
+cached frame (see core.ledger). Consumers read the precomputed columns through
+column(), which derives on the fly only for frames that lack them.
+"""
+import pandas as pd
+
+from core.schema import EXPECTED_COLUMNS, as_datetime
+from core.tracing import traced
+
+DERIVED_COLUMNS = {}  # name -> definition(df) -> Series
+
+
+def derived_column(name):
+    """Register a vectorized definition for a derived column."""
+    def decorator(fn):
+        DERIVED_COLUMNS[name] = fn
+        return fn
+    return decorator
+
+
+@derived_column("Year")
+def _year(df):
+    return as_datetime(df["Date"]).dt.year.astype("Int64")
+
+
+@derived_column("Month")
+def _month(df):
+    return as_datetime(df["Date"]).dt.month.astype("Int64")
+
+
+@derived_column("MonthName")
+def _month_name(df):
+    return as_datetime(df["Date"]).dt.month_name()
+
+
+@derived_column("YearMonth")
+def _year_month(df):
+    return as_datetime(df["Date"]).dt.strftime("%Y-%m")
+
+
+@derived_column("Weekday")
+def _weekday(df):
+    return as_datetime(df["Date"]).dt.day_name()
+
+
+@derived_column("ISOYear")
+def _iso_year(df):
+    return as_datetime(df["Date"]).dt.isocalendar().year.astype("Int64")
+
+
+@derived_column("ISOWeek")
+def _iso_week(df):
+    return as_datetime(df["Date"]).dt.isocalendar().week.astype("Int64")
+
+
+@derived_column("PricePerUnit")
+def _price_per_unit(df):
+    """PricePaid / Quantity; 0 when either is missing or Quantity is 0."""
+    price = pd.to_numeric(df["PricePaid"], errors="coerce")
+    quantity = pd.to_numeric(df["Quantity"], errors="coerce")
+    valid = price.notna() & quantity.notna() & (quantity != 0)
+    return (price / quantity.where(valid)).round(2).where(valid, 0.0)
+
+
+# Derived columns that are not part of the stored schema (PricePerUnit is stored)
+DERIVED_ONLY = [name for name in DERIVED_COLUMNS if name not in EXPECTED_COLUMNS]
+
+
+@traced("add_derived")
+def add_derived(df, names=None):
+    """Return df with the given (default: all) derived columns computed."""
+    if df.empty and "Date" not in df.columns:
+        return df
+    return df.assign(**{name: DERIVED_COLUMNS[name](df) for name in (names or DERIVED_COLUMNS)})
+
+
+def column(df, name):
+    """A derived column: the precomputed one if df has it, else computed now."""
+    return df[name] if name in df.columns else DERIVED_COLUMNS[name](df)
+
+
+def strip_derived(df):
+    """Drop derived-only columns before a frame is written to storage or exported."""
+    return df.drop(columns=[name for name in DERIVED_ONLY if name in df.columns])
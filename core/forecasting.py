@@ -0,0 +1,245 @@
+# core/forecasting.py
+"""
+Cached, parallel next-month forecasts (Holt-Winters exponential smoothing).
+- Fits are cached on a hash of the monthly series and the model parameters,
+  so an unchanged series is never refitted across reruns or pages
+- Per-group forecasts (category, shop) fit their uncached series in a small
+  process pool, each with its own timeout. A series that fails or times out is
+  cached as failed for that series (a late result still replaces it), so
+  reruns don't resubmit it
+- While the pool is still starting, the app gets PENDING instead of a fit;
+  nothing is fitted in the script thread
+- Without statsmodels every forecast is None
+"""
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from core.cache import CACHE, cached_on_frame
+from config import FORECAST_WORKERS, FORECAST_TIMEOUT, FORECAST_MIN_MONTHS
+from core.cube import rollup
+from core.tracing import traced
+
+FORECAST_PARAMS = {"trend": "add", "seasonal": None}
+
+# statsmodels is only imported where a fit actually runs
+HAS_STATS = importlib.util.find_spec("statsmodels") is not None
+
+PENDING = "pending"               # forecast_many result for a fit queued behind the pool start-up
+_FAILED = {"forecast": None}      # cached in place of a fit that failed or timed out
+
+_pool = None
+_pool_ready = threading.Event()   # workers have started and imported statsmodels
+_pool_lock = threading.Lock()
+_inflight = {}                    # series key -> future, so a rerun never resubmits a running fit
+
+
+def _init_worker():
+    import statsmodels.tsa.holtwinters  # noqa: F401  (paid once per worker, not per fit)
+
+
+def _ping():
+    return True
+
+
+def _fit(values, params):
+    """Fit one series and forecast the next value (runs in a worker process)."""
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fit = ExponentialSmoothing(np.asarray(values, dtype=float), **params).fit()
+    return {
+        "forecast": float(fit.forecast(1)[0]),
+        "alpha": float(fit.params.get("smoothing_level", np.nan)),
+        "beta": float(fit.params.get("smoothing_trend", np.nan) or np.nan),
+    }
+
+
+def series_key(values, params=FORECAST_PARAMS):
+    """Hash of a monthly series and the model parameters."""
+    digest = hashlib.sha1(np.asarray(values, dtype=float).tobytes())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+@contextmanager
+def _bare_main():
+    """
+    Hide __main__ from the workers spawned inside. Under Streamlit it is the
+    page script, which each spawned worker would otherwise re-run on start.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _get_pool():
+    """
+    Shared worker pool, started in the background on first use. Spawned, not
+    forked, because the app runs background threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = max(1, min(FORECAST_WORKERS, os.cpu_count() or 1))
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            with _bare_main():
+                # One ping per worker spawns them all here (the pool would otherwise start them on later submits)
+                pings = [_pool.submit(_ping) for _ in range(workers)]
+            pings[0].add_done_callback(lambda f: f.exception() is None and _pool_ready.set())
+        return _pool
+
+
+def _submit(pool, key, values, params):
+    """The running fit for key, submitting it if there is none."""
+    with _pool_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _inflight[key] = pool.submit(_fit, values, params)
+    future.add_done_callback(lambda f: _finished(key, f))
+    return future
+
+
+def _finished(key, future):
+    """Cache a pool fit when it completes, including one nobody waits for any more."""
+    try:
+        fit = future.result()
+    except Exception:
+        fit = None
+    _remember(key, fit)
+    with _pool_lock:
+        _inflight.pop(key, None)
+
+
+def _remember(key, fit):
+    CACHE.put("forecast", "fits", _FAILED if fit is None else fit, params=(key,))
+
+
+@traced("forecast_many", arg=None)
+def forecast_many(series, params=FORECAST_PARAMS, timeout=FORECAST_TIMEOUT, block=False):
+    """
+    Forecasts for {name: values}. Cached fits are returned as they are; the rest
+    are fitted in the pool. A series that fails or exceeds timeout maps to None.
+    Until the pool has started, uncached series map to PENDING, unless block
+    (one-shot callers such as the CLI) waits for it.
+    """
+    results, pending = {}, {}
+    for name, values in series.items():
+        if not HAS_STATS or len(values) < FORECAST_MIN_MONTHS:
+            results[name] = None
+            continue
+        key = series_key(values, params)
+        cached = CACHE.peek("forecast", "fits", (key,))
+        if cached is not None:
+            results[name] = None if cached is _FAILED else cached
+        else:
+            pending[name] = (key, list(values))
+    if not pending:
+        return results
+
+    try:
+        pool = _get_pool()
+    except Exception:
+        pool = None  # no process pool here (e.g. sandboxed)
+    if pool is None:
+        for name, (key, values) in pending.items():
+            try:
+                fit = _fit(values, params)
+            except Exception:
+                fit = None
+            _remember(key, fit)
+            results[name] = fit
+        return results
+
+    futures = {name: _submit(pool, key, values, params) for name, (key, values) in pending.items()}
+    if not block and not _pool_ready.is_set():
+        # Workers still spawning and importing statsmodels: the fits stay queued for a later rerun
+        results.update((name, PENDING) for name in futures)
+        return results
+    _collect(futures, pending, results, timeout)
+    return results
+
+
+def _collect(futures, pending, results, timeout):
+    """Gather pool results. A series' timeout runs from when it starts executing."""
+    started = {}
+    while futures:
+        wait(futures.values(), timeout=0.05, return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for name, future in list(futures.items()):
+            if future.done():
+                del futures[name]
+                try:
+                    fit = future.result()
+                except Exception:
+                    fit = None
+                results[name] = fit  # cached by _finished
+            elif future.running() and now - started.setdefault(name, now) > timeout:
+                del futures[name]  # left to finish in the background; _finished caches it if it does
+                _remember(pending[name][0], None)
+                results[name] = None
+
+
+def forecast_next(values, params=FORECAST_PARAMS, block=False):
+    """Cached next-value forecast for one series, fitted in the pool like forecast_many (None / PENDING alike)."""
+    return forecast_many({"total": values}, params, block=block)["total"]
+
+
+@cached_on_frame("group_series")
+def group_series(cube, by):
+    """
+    Monthly totals per value of by, as {name: values}, each running from the
+    group's first month to the last month in the cube (missing months are 0).
+    """
+    monthly = rollup(cube, ["YearMonth", by]).pivot(index="YearMonth", columns=by, values="Sum")
+    if monthly.empty:
+        return {}
+    months = pd.period_range(monthly.index.min(), monthly.index.max(), freq="M").strftime("%Y-%m")
+    monthly = monthly.reindex(months)
+    series = {}
+    for name in monthly.columns:
+        values = monthly[name]
+        first = values.first_valid_index()
+        series[name] = values.loc[first:].fillna(0.0).to_numpy()
+    return series
+
+
+@traced("group_forecasts")
+def group_forecasts(cube, by="Category", block=False):
+    """
+    DataFrame [by, LastMonth, Forecast, Change %] of next-month forecasts per
+    group; attrs["pending"] counts the groups whose fit is still queued.
+    """
+    series = group_series(cube, by)
+    fits = forecast_many(series, block=block)
+    rows = []
+    for name, values in series.items():
+        fit = fits.get(name)
+        if fit is None or fit is PENDING:
+            continue
+        last = float(values[-1])
+        change = (fit["forecast"] - last) / last * 100 if last else np.nan
+        rows.append({by: name, "LastMonth": last, "Forecast": fit["forecast"], "Change %": change})
+    forecasts = pd.DataFrame(rows, columns=[by, "LastMonth", "Forecast", "Change %"])
+    forecasts.attrs["pending"] = sum(fit is PENDING for fit in fits.values())
+    return forecasts
@@ -0,0 +1,304 @@
+# core/journal.py
+"""
+Append-only write-ahead journal in front of a local snapshot store
+(partitioned / Arrow / CSV), so adding or editing a few rows never rewrites
+the store.
+- append_chunks / apply_changes write one record per batch (the rows added or
+  changed, the RowIDs deleted) to the end of the journal and fsync it: the cost
+  follows the batch, and a crash loses at most the batch being written
+- Reads replay the journal on top of the snapshot. Replay is an upsert by
+  RowID, so applying a record twice changes nothing. Option lists (distinct)
+  are the snapshot's plus the journal's, rescanned only while the journal holds
+  edits or deletes that could have removed a value
+- Once the journal passes JOURNAL_COMPACT_BYTES a background thread folds it
+  into the snapshot, records the last folded record in a checkpoint and trims
+  the journal. A crash in between only replays records the snapshot already has
+- A torn record at the end (crash mid-write) is cut off on open
+"""
+import json
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+import pandas as pd
+
+from core.schema import EXPECTED_COLUMNS, apply_schema
+from core.storage_backends import (
+    StorageBackend, apply_filters, apply_row_changes, _file_fingerprint, _filter_series, _incomplete_mask
+)
+from core.tracing import span
+
+_HEADER = struct.Struct(">QI")  # payload length, crc32 of the payload
+
+
+def _fsync_dir(path):
+    """Make a file creation / rename in path durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JournaledStorage(StorageBackend):
+    """Wraps a local backend; writes go to an fsynced journal that is compacted into it."""
+
+    def __init__(self, backend, path, compact_bytes=8_000_000):
+        self.backend = backend
+        self.name = backend.name
+        self.supports_pushdown = backend.supports_pushdown
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint"
+        self.compact_bytes = compact_bytes
+        self._records = []      # (lsn, upserts, deleted RowIDs, replaces) after the checkpoint, oldest first
+        self._lsn = 0           # last record written
+        self._checkpoint = 0    # last record folded into the snapshot
+        self._overlay = None    # (upserts, deleted) net effect of _records, built on demand
+        self._lock = threading.RLock()
+        self._fold_lock = threading.Lock()  # one fold / full save at a time: file backends have no lock of their own
+        self._compactor = None
+        self.last_error = None
+
+        self._read_checkpoint()
+        self._read_journal()
+        self._maybe_compact()
+
+    def __getattr__(self, name):
+        # Backend-specific extras (manifest, ...)
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    # ----------------- journal -----------------
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                self._checkpoint = json.load(f)["lsn"]
+        except (FileNotFoundError, ValueError, KeyError):
+            self._checkpoint = 0
+        self._lsn = self._checkpoint
+
+    def _write_checkpoint(self, lsn):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"lsn": lsn}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+        _fsync_dir(os.path.dirname(self.checkpoint_path))
+        self._checkpoint = lsn
+
+    def _read_journal(self):
+        """Load the records after the checkpoint; a torn tail is truncated away."""
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                length, crc = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break  # torn write from a crash: the batch never completed
+                record = pickle.loads(payload)
+                good = f.tell()
+                self._lsn = max(self._lsn, record["lsn"])
+                if record["lsn"] > self._checkpoint:
+                    self._records.append((record["lsn"], record["upserts"], set(record["deletes"]), record.get("replaces", True)))
+        if good < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+
+    def _append(self, upserts, deletes, replaces):
+        """
+        Write one record and fsync it; returns once the batch is durable.
+        replaces: the batch may rewrite or delete rows already stored (an edit, not only new rows).
+        """
+        with self._lock:
+            self._lsn += 1
+            record = {"lsn": self._lsn, "upserts": upserts, "deletes": [int(i) for i in deletes], "replaces": replaces}
+            payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+            created = not os.path.exists(self.path)
+            with span("journal.append", rows=len(upserts) + len(deletes), nbytes=len(payload)):
+                with open(self.path, "ab") as f:
+                    f.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if created:
+                    _fsync_dir(os.path.dirname(self.path))
+            self._records.append((self._lsn, upserts, set(record["deletes"]), replaces))
+            self._overlay = None
+        self._maybe_compact()
+
+    def _net(self, records):
+        """(upserts, deleted): the latest version of every written row and the RowIDs deleted."""
+        frames, deleted = [], set()
+        for _, upserts, deletes, _ in records:
+            if len(upserts):
+                frames.append(upserts)
+                deleted -= set(upserts["RowID"].dropna().astype("int64"))
+            deleted |= deletes
+        upserts = apply_schema(pd.concat(frames, ignore_index=True)) if frames else apply_schema(pd.DataFrame(columns=EXPECTED_COLUMNS))
+        upserts = upserts.drop_duplicates("RowID", keep="last")
+        return upserts[~upserts["RowID"].isin(list(deleted))].reset_index(drop=True), deleted
+
+    def overlay(self):
+        """Net effect of the journal not yet folded into the snapshot."""
+        with self._lock:
+            if self._overlay is None:
+                self._overlay = self._net(self._records)
+            return self._overlay
+
+    # ----------------- compaction -----------------
+    def journal_bytes(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def _maybe_compact(self):
+        if self.journal_bytes() < self.compact_bytes:
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self._compact_quietly, daemon=True)
+            self._compactor.start()
+
+    def _compact_quietly(self):
+        try:
+            self.compact()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e  # the journal stays; the next write retries
+
+    def compact(self):
+        """Fold the journal into the snapshot, then drop the folded records."""
+        with self._fold_lock:
+            self._fold()
+
+    def _fold(self):
+        """compact() with the fold lock held."""
+        with self._lock:
+            records = list(self._records)
+        if not records:
+            return
+        upserts, deleted = self._net(records)
+        with span("journal.compact", rows=len(upserts) + len(deleted), records=len(records)):
+            # Upserts by RowID (unknown ids are appended), so folding twice is harmless
+            self.backend.apply_changes(upserts, upserts.iloc[:0], sorted(deleted))
+            with self._lock:
+                lsn = records[-1][0]
+                self._write_checkpoint(lsn)
+                self._records = [r for r in self._records if r[0] > lsn]
+                self._overlay = None
+                self._rewrite_journal()
+
+    def _rewrite_journal(self):
+        """Keep only the records after the checkpoint (called with the lock held)."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for lsn, upserts, deletes, replaces in self._records:
+                record = {"lsn": lsn, "upserts": upserts, "deletes": sorted(deletes), "replaces": replaces}
+                payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                f.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(os.path.dirname(self.path))
+
+    def status(self):
+        """Journal size, pending records and the last compaction error."""
+        return {
+            "records": len(self._records),
+            "bytes": self.journal_bytes(),
+            "compacting": self._compactor is not None and self._compactor.is_alive(),
+            "last_error": self.last_error,
+        }
+
+    # ----------------- backend interface -----------------
+    # Reads take the overlay before touching the snapshot: a compaction finishing
+    # in between only folds in rows the overlay still carries.
+    def fingerprint(self):
+        return (self.backend.fingerprint(), _file_fingerprint("journal", self.path))
+
+    def load(self):
+        upserts, deleted = self.overlay()
+        rows = self.backend.load()
+        if not len(upserts) and not deleted:
+            return rows
+        with span("journal.replay", rows=len(upserts) + len(deleted)):
+            # Rewritten rows keep their place; rows new to the snapshot go at the end
+            return apply_row_changes(apply_schema(rows), upserts, upserts.iloc[:0], sorted(deleted))
+
+    def _overlaid(self, rows, upserts, deleted, kept):
+        """Snapshot rows minus those the journal rewrote or deleted, plus kept (the matching journal rows)."""
+        removed = deleted | set(upserts["RowID"].astype("int64"))
+        stale = pd.to_numeric(rows["RowID"], errors="coerce").isin(list(removed))  # callers type the result
+        return pd.concat([rows[~stale], kept], ignore_index=True)
+
+    def query(self, filters):
+        upserts, deleted = self.overlay()
+        rows = self.backend.query(filters)
+        if not len(upserts) and not deleted:
+            return rows
+        return self._overlaid(rows, upserts, deleted, apply_filters(upserts, filters))
+
+    def distinct(self, column, filters=None):
+        with self._lock:
+            upserts, _ = self.overlay()
+            replaces = any(record[3] for record in self._records)
+        if replaces:  # an edited / deleted row may have held a value's last occurrence: rescan
+            values, added = set(), self.query(filters)
+        else:
+            values, added = set(self.backend.distinct(column, filters)), apply_filters(upserts, filters)
+        if len(added) and (column in added.columns or column in ("Year", "Month")):
+            values |= set(_filter_series(added, column).dropna().unique().tolist())
+        return sorted(values)
+
+    def value_range(self, column):
+        """Snapshot range widened by the journal's rows (deletes only narrow it once compacted)."""
+        upserts, _ = self.overlay()
+        low, high = self.backend.value_range(column)
+        series = _filter_series(upserts, column).dropna() if len(upserts) else upserts.iloc[:0, 0]
+        if series.empty:
+            return low, high
+        return (series.min() if low is None else min(low, series.min()),
+                series.max() if high is None else max(high, series.max()))
+
+    def incomplete(self):
+        upserts, deleted = self.overlay()
+        rows = self.backend.incomplete()
+        if not len(upserts) and not deleted:
+            return rows
+        return self._overlaid(rows, upserts, deleted, upserts[_incomplete_mask(upserts)])
+
+    def save(self, df, mode="diff"):
+        """Full rewrite: fold the journal first, so a crash mid-save never replays it over df."""
+        with self._fold_lock:  # waits for a background fold, which would otherwise overwrite df
+            self._fold()
+            self.backend.save(df, mode=mode)
+
+    def append_chunks(self, chunks):
+        """One fsynced record per chunk; the snapshot is not touched."""
+        written = 0
+        for chunk in chunks:
+            if len(chunk):
+                self._append(apply_schema(chunk), [], replaces=False)
+                written += len(chunk)
+        return written
+
+    def apply_changes(self, updates, inserts, deletes):
+        self._append(
+            apply_schema(pd.concat([updates, inserts], ignore_index=True)), deletes,
+            replaces=bool(len(updates) or len(deletes)),
+        )
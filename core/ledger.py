@@ -0,0 +1,532 @@
+# core/ledger.py
+"""
+Streamlit-free ledger operations: open the configured store; load, save, edit,
+import, merge and export; the reporting-currency view and the aggregate cube.
+Results are cached on the storage fingerprint (core.cache), so every front end
+(the Streamlit pages via data_manager, cli.py, scheduled jobs) shares them.
+- Problems that don't stop an operation (storage fallback, an unreadable
+  store, an unsaved dedup index) go to the notifier (set_notifier)
+- Failed writes and unreadable imports raise
+"""
+import io
+import logging
+import os
+
+import pandas as pd
+from config import (
+    USE_GOOGLE_SHEETS, SHEET_NAME, WORKSHEET_NAME,
+    LOCAL_CSV_FILE, LOCAL_ARROW_FILE, LOCAL_SQLITE_FILE, LOCAL_PARTITION_DIR, LOCAL_STORAGE_BACKEND,
+    LOCAL_JOURNAL_FILE, JOURNAL_COMPACT_BYTES,
+    CREDENTIALS_FILE, SHEETS_MIRROR_FILE, WRITE_JOURNAL_DIR, WRITE_COALESCE_SECONDS, WRITE_RETRY_MAX,
+    DEFAULT_CURRENCY, CACHE_TTL_MEDIUM, IMPORT_CHUNK_ROWS, FINGERPRINT_INDEX_FILE
+)
+from core.schema import EXPECTED_COLUMNS, apply_schema, with_row_ids, concat_typed
+from core.derived import add_derived, strip_derived
+from core.storage_backends import (
+    SheetsBackend, CsvBackend, ArrowBackend, SQLiteBackend, PartitionedBackend,
+    apply_filters, apply_row_changes
+)
+from core.write_behind import WriteBehindStorage
+from core.journal import JournaledStorage
+from core.cube import build_cube, merge_cubes
+from core.cache import CACHE, frame_fingerprint, tag_fingerprint
+from core.tracing import span, traced
+from core.currency_manager import normalize_amounts
+from core.dedup import FingerprintIndex, deduplicate
+
+
+_logger = logging.getLogger("expense_tracker")
+
+
+def _log(level, message):
+    getattr(_logger, level)(message)
+
+
+_notify = _log  # notify(level, message), level one of "info" / "warning" / "error"
+
+
+def set_notifier(notifier):
+    """Route non-fatal messages (notifier(level, message)) e.g. into the page; default: logging."""
+    global _notify
+    _notify = notifier or _log
+
+
+def open_local_storage(notify=None):
+    """
+    Return the configured local backend (year / month partitions by default, CSV as fallback).
+    File stores sit behind a write-ahead journal, so row writes append instead of rewriting files;
+    SQLite already writes rows in transactions.
+    """
+    if LOCAL_STORAGE_BACKEND == "sqlite":
+        return SQLiteBackend(LOCAL_SQLITE_FILE, legacy_csv=LOCAL_CSV_FILE)
+    backend = None
+    if LOCAL_STORAGE_BACKEND in ("partitioned", "arrow"):
+        try:
+            if LOCAL_STORAGE_BACKEND == "partitioned":
+                backend = PartitionedBackend(LOCAL_PARTITION_DIR, legacy=(LOCAL_ARROW_FILE, LOCAL_CSV_FILE))
+            else:
+                backend = ArrowBackend(LOCAL_ARROW_FILE, legacy_csv=LOCAL_CSV_FILE)
+        except ImportError:
+            (notify or _notify)("warning", "pyarrow not installed. Using local CSV storage.")
+    return JournaledStorage(backend or CsvBackend(LOCAL_CSV_FILE), LOCAL_JOURNAL_FILE, compact_bytes=JOURNAL_COMPACT_BYTES)
+
+
+def open_storage(use_sheets=USE_GOOGLE_SHEETS, notify=None):
+    """
+    Return the storage backend: Google Sheets if enabled and available, else the local store.
+    gspread / oauth2client are only imported here, when Sheets is enabled.
+    notify overrides the notifier, e.g. to collect messages on a background thread.
+    """
+    if not use_sheets:
+        return open_local_storage(notify)
+    try:
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        scope = ["https://spreadsheets.google.com/feeds",
+                 "https://www.googleapis.com/auth/drive"]
+        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, scope)
+        client = gspread.authorize(creds)
+        try:
+            sheet = client.open(SHEET_NAME).worksheet(WORKSHEET_NAME)
+        except gspread.exceptions.WorksheetNotFound:
+            sh = client.open(SHEET_NAME)
+            sheet = sh.add_worksheet(title=WORKSHEET_NAME, rows="1000", cols="12")
+            sheet.append_row(EXPECTED_COLUMNS)
+        # Sheets round trips are slow: saves return once journaled, a background thread sends them
+        return WriteBehindStorage(
+            SheetsBackend(sheet, mirror_path=SHEETS_MIRROR_FILE), WRITE_JOURNAL_DIR,
+            coalesce_seconds=WRITE_COALESCE_SECONDS, retry_max=WRITE_RETRY_MAX,
+        )
+    except Exception as e:
+        (notify or _notify)("warning", f"Google Sheets not available ({e}). Using local storage fallback.")
+        return open_local_storage(notify)
+
+
+def _freeze(filters):
+    """Hashable form of a filters dict, for use in cache keys."""
+    return tuple(sorted(
+        (column, tuple(selection)) for column, selection in (filters or {}).items()
+        if selection is not None and len(selection) > 0
+    ))
+
+
+def load_data(storage):
+    """
+    Load data from the storage backend, typed once via schema.apply_schema and
+    with the derived columns (derived.py) computed once per data version.
+    Cached on the storage fingerprint as of after the load (loading can pull
+    remote changes, e.g. Sheets), so the next call hits.
+    The returned frame is shared between callers: treat it as read-only.
+    """
+
+    def _load():
+        try:
+            with span("storage.load", backend=storage.name) as s:
+                df = s.measure(storage.load())
+        except Exception as e:
+            _notify("warning", f"⚠️ Could not load data from {storage.name} storage: {e}")
+            df = pd.DataFrame(columns=EXPECTED_COLUMNS)
+        return tag_fingerprint(add_derived(apply_schema(df)), storage.fingerprint())
+
+    return CACHE.get_or_compute(
+        "load_data", storage.fingerprint(), _load, ttl=CACHE_TTL_MEDIUM, rekey=lambda rows: frame_fingerprint(rows)[0]
+    )
+
+
+def _advance_loaded(old_fingerprint, new_fingerprint, change):
+    """
+    Seed the load cache for new_fingerprint with change(frame cached for
+    old_fingerprint), so a write re-derives only the rows it touched instead
+    of reloading and re-deriving the whole ledger.
+    """
+    old = CACHE.peek("load_data", old_fingerprint)
+    if old is None:
+        return  # nothing cached: the next load_data does the full pass
+    new = tag_fingerprint(change(old), new_fingerprint)
+    CACHE.put("load_data", new_fingerprint, new, ttl=CACHE_TTL_MEDIUM)
+
+
+def save_data(df, storage, mode="diff"):
+    """
+    Save DataFrame through the storage backend. Raises if the write fails.
+    For Google Sheets the write is queued (see write_behind.py) and this returns
+    at once; mode="diff" sends only changed/added/removed rows, mode="resync"
+    clears the sheet and rewrites everything.
+    """
+    with span("storage.save", backend=storage.name, mode=mode) as s:
+        storage.save(s.measure(strip_derived(df)), mode=mode)
+
+
+# ====================================================
+# 💱 REPORTING CURRENCY (shared, per storage fingerprint)
+# ====================================================
+def reporting_data(storage, currency=DEFAULT_CURRENCY):
+    """
+    The loaded ledger plus an Amount column in the reporting currency,
+    converted in one vectorized pass and cached per storage fingerprint and
+    currency. Always the whole ledger: the cache key says nothing about a frame.
+    """
+    rows = load_data(storage)
+    fingerprint, _ = frame_fingerprint(rows)
+    return CACHE.get_or_compute(
+        "reporting_data", fingerprint,
+        lambda: tag_fingerprint(normalize_amounts(rows, currency), fingerprint, ("reporting_data", currency)),
+        params=(currency,),
+    )
+
+
+# ====================================================
+# 🧊 AGGREGATE CUBE (shared, per storage fingerprint and currency)
+# ====================================================
+def get_cube(storage, currency=DEFAULT_CURRENCY):
+    """Return the aggregate cube of reporting-currency amounts, built once per storage fingerprint."""
+    report = reporting_data(storage, currency)
+    fingerprint, _ = frame_fingerprint(report)
+
+    def _build():
+        cube = build_cube(report, value_column="Amount")
+        return tag_fingerprint(cube, fingerprint, ("cube", currency))
+
+    return CACHE.get_or_compute("cube", fingerprint, _build, params=(currency,))
+
+
+# ====================================================
+# 💱 LEGACY CURRENCY LABELS (one-time migration)
+# ====================================================
+def relabel_converted_rows(storage, before):
+    """
+    Rows added in the sidebar before amounts were stored as paid hold an amount
+    already converted into DEFAULT_CURRENCY under the label of the currency
+    paid in, so reports would convert them twice. Relabel every row dated
+    before `before` with another Currency as DEFAULT_CURRENCY (amounts are
+    unchanged). Returns the rows relabelled; a second run finds none.
+    """
+    rows = load_data(storage)
+    currency = rows["Currency"].astype(object)
+    stale = rows[(rows["Date"] < pd.Timestamp(before)) & currency.notna() & (currency != DEFAULT_CURRENCY)]
+    if len(stale):
+        apply_edits(stale.assign(Currency=DEFAULT_CURRENCY), stale.iloc[:0], [], storage)
+    return len(stale)
+
+
+def _cube_deltas(old_fingerprint):
+    """An empty delta cube for every currency that has a cube cached for old_fingerprint."""
+    empty = build_cube(pd.DataFrame(columns=EXPECTED_COLUMNS))
+    return {params: empty for params, _ in CACHE.entries("cube", old_fingerprint)}
+
+
+def _fold_into_deltas(deltas, rows):
+    """Add appended rows (schema-typed) to each currency's delta cube."""
+    for params in deltas:
+        converted = normalize_amounts(rows, params[0])
+        deltas[params] = merge_cubes(deltas[params], build_cube(converted, value_column="Amount"))
+
+
+def _advance_cubes(deltas, old_fingerprint, new_fingerprint):
+    """Fold the deltas into the cubes cached for old_fingerprint, storing them under new_fingerprint."""
+    # Read every old cube first: storing under the new fingerprint drops the old ones
+    cubes = {params: CACHE.peek("cube", old_fingerprint, params) for params in deltas}
+    for params, cube in cubes.items():
+        if cube is None:
+            continue  # nothing current to update; the next get_cube rebuilds
+        cube = merge_cubes(cube, deltas[params])
+        CACHE.put("cube", new_fingerprint, tag_fingerprint(cube, new_fingerprint, ("cube",) + params), params=params)
+
+
+def query_data(storage, filters=None):
+    """
+    Return only the rows matching filters.
+    Pushed down to the backend when it supports it, else filtered in pandas.
+    The result is tagged, so frame-keyed caches (e.g. the filter index) reuse it.
+    """
+    fingerprint = storage.fingerprint()
+
+    def _query():
+        if storage.supports_pushdown:
+            with span("storage.query", backend=storage.name) as s:
+                rows = add_derived(apply_schema(s.measure(storage.query(filters))))
+        else:
+            rows = apply_filters(load_data(storage), filters)
+        return tag_fingerprint(rows, fingerprint, ("query_data",) + _freeze(filters))
+
+    return CACHE.get_or_compute("query_data", fingerprint, _query, params=_freeze(filters), ttl=CACHE_TTL_MEDIUM)
+
+
+def reporting_rows(storage, filters=None, currency=DEFAULT_CURRENCY):
+    """
+    query_data(storage, filters) plus the reporting-currency Amount, converted
+    once per storage fingerprint, filters and currency.
+    """
+    if not filters:
+        return reporting_data(storage, currency)
+    rows = query_data(storage, filters)
+    fingerprint, variant = frame_fingerprint(rows)
+    params = variant + (currency,)
+    return CACHE.get_or_compute(
+        "reporting_rows", fingerprint,
+        lambda: tag_fingerprint(normalize_amounts(rows, currency), fingerprint, ("reporting_rows",) + params),
+        params=params, ttl=CACHE_TTL_MEDIUM,
+    )
+
+
+def distinct_values(storage, column="Category", filters=None):
+    """Sorted unique values of a column among the rows matching filters."""
+
+    def _distinct():
+        if storage.supports_pushdown:
+            return storage.distinct(column, filters)
+        df = query_data(storage, filters)
+        if column in ("Year", "Month"):
+            dates = df["Date"]
+            values = dates.dt.year if column == "Year" else dates.dt.month
+        elif column in df.columns:
+            values = df[column]
+        else:
+            return []
+        return sorted(values.dropna().unique().tolist())
+
+    return CACHE.get_or_compute(
+        "distinct_values", storage.fingerprint(), _distinct,
+        params=(column, _freeze(filters)), ttl=CACHE_TTL_MEDIUM
+    )
+
+
+def value_range(storage, column="PricePaid"):
+    """(min, max) of a column, or (None, None) when there is no data."""
+
+    def _range():
+        if storage.supports_pushdown:
+            return storage.value_range(column)
+        df = load_data(storage)
+        if column not in df.columns:
+            return None, None
+        values = df[column].dropna()
+        return (values.min(), values.max()) if not values.empty else (None, None)
+
+    return CACHE.get_or_compute(
+        "value_range", storage.fingerprint(), _range, params=(column,), ttl=CACHE_TTL_MEDIUM
+    )
+
+
+def incomplete_rows(storage):
+    """
+    Rows missing Date or ExpenseType (left out of charts and filters until fixed).
+    A pushdown store reads only where they are (e.g. the partitions that have any).
+    """
+
+    def _incomplete():
+        if storage.supports_pushdown:
+            rows = add_derived(apply_schema(storage.incomplete()))
+        else:
+            rows = load_data(storage)
+        return rows[rows["Date"].isna() | rows["ExpenseType"].isna()]
+
+    return CACHE.get_or_compute("incomplete_rows", storage.fingerprint(), _incomplete, ttl=CACHE_TTL_MEDIUM)
+
+
+def apply_edits(updates, inserts, deletes, storage):
+    """
+    Send only edited rows (matched on RowID), new rows and deleted RowIDs to
+    storage, so the cost follows the size of the edit, not of the ledger.
+    Raises if the write fails.
+    """
+    previous_fingerprint = storage.fingerprint()
+    updates = add_derived(apply_schema(strip_derived(updates)))
+    inserts = add_derived(apply_schema(with_row_ids(strip_derived(inserts))))
+    with span("storage.apply_changes", rows=len(updates) + len(inserts) + len(deletes), backend=storage.name):
+        storage.apply_changes(strip_derived(updates), strip_derived(inserts), list(deletes))
+    _advance_loaded(
+        previous_fingerprint, storage.fingerprint(),
+        lambda old: apply_row_changes(old, updates, inserts, list(deletes)),
+    )
+
+
+@traced("append_data", arg=None)
+def append_data(chunks, storage):
+    """
+    Append rows to storage chunk by chunk (e.g. from import_data) and fold
+    them into the aggregate cube as they pass. Returns the rows written.
+    """
+    previous_fingerprint = storage.fingerprint()
+    deltas = _cube_deltas(previous_fingerprint)
+    appended = []  # derived chunks, spliced into the cached ledger afterwards
+
+    def _tracked(chunks):
+        for chunk in chunks:
+            _fold_into_deltas(deltas, chunk)
+            appended.append(add_derived(chunk))
+            yield chunk
+
+    with span("storage.append_chunks", backend=storage.name) as s:
+        written = s.rows = storage.append_chunks(_tracked(chunks))
+    _advance_loaded(previous_fingerprint, storage.fingerprint(), lambda old: concat_typed([old] + appended))
+    _advance_cubes(deltas, previous_fingerprint, storage.fingerprint())
+    return written
+
+
+@traced("merge_data", arg=None)
+def merge_data(chunks, storage, index_file=FINGERPRINT_INDEX_FILE):
+    """
+    Deduplicating merge: append only rows not already in storage.
+    Uses the persistent fingerprint index (rebuilt when the store changed
+    elsewhere) and returns a report with inserted / skipped / flagged counts.
+    """
+    index = FingerprintIndex.load(index_file)
+    if index is None or not index.matches(storage.fingerprint()):
+        index = FingerprintIndex.build(load_data(storage), storage.fingerprint())
+
+    report = {"inserted": 0, "skipped": 0, "flagged": 0}
+
+    def _indexed(chunks):
+        for chunk in chunks:
+            index.add(chunk)
+            yield chunk
+
+    append_data(_indexed(deduplicate(chunks, index, report)), storage)
+    index.source = storage.fingerprint()
+    try:
+        index.save(index_file)
+    except OSError as e:
+        _notify("warning", f"Could not save the import fingerprint index: {e}")
+    return report
+
+
+# ====================================================
+# 📥 STREAMING IMPORT
+# ====================================================
+def _header_key(name):
+    return "".join(ch for ch in str(name).lower() if ch.isalnum())
+
+
+_HEADER_ALIASES = {_header_key(col): col for col in EXPECTED_COLUMNS}
+
+
+def _file_size(file):
+    size = getattr(file, "size", None)  # Streamlit uploads
+    if size is None:
+        try:
+            size = os.fstat(file.fileno()).st_size  # files opened from disk
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            size = 0
+    return size
+
+
+def _read_chunks(uploaded_file, chunk_rows):
+    """Yield (raw DataFrame chunk, fraction of the file read) from a CSV/XLSX upload or open file."""
+    uploaded_file.seek(0)
+    size = _file_size(uploaded_file)
+    if uploaded_file.name.endswith(".csv"):
+        for chunk in pd.read_csv(uploaded_file, chunksize=chunk_rows):
+            yield chunk, (min(uploaded_file.tell() / size, 1.0) if size else 0.0)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        total = workbook.active.max_row or 0
+        header = next(rows, None)
+        if header is None:
+            return
+        batch, seen = [], 1
+        for row in rows:
+            batch.append(row)
+            seen += 1
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=header), (min(seen / total, 1.0) if total else 0.0)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header), 1.0
+    finally:
+        workbook.close()
+
+
+def normalize_chunk(chunk):
+    """
+    Map an imported chunk onto EXPECTED_COLUMNS, give its rows fresh RowIDs and type it.
+    Headers are matched ignoring case, spaces and punctuation ("Price Paid" -> PricePaid);
+    unknown columns are dropped, missing ones added empty. Fully empty rows are skipped.
+    """
+    chunk = chunk.rename(columns=lambda c: _HEADER_ALIASES.get(_header_key(c), c))
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()].reindex(columns=EXPECTED_COLUMNS)
+    chunk = chunk.drop(columns="RowID").dropna(how="all")  # imported rows get ids of their own
+    return apply_schema(with_row_ids(chunk))
+
+
+def import_data(uploaded_file, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Stream a CSV/XLSX file (an upload or a binary file object with a .name)
+    as normalized chunks. Yields (chunk, progress) with progress in [0, 1];
+    memory stays at about one chunk.
+    """
+    for chunk, progress in _read_chunks(uploaded_file, chunk_rows):
+        yield normalize_chunk(chunk), progress
+
+
+EXPORT_FORMATS = {
+    # file_type: (file extension, mime type)
+    "csv": ("csv", "text/csv"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _xlsx_bytes(df, sheet_name="Expenses"):
+    """Build an XLSX with openpyxl's write-only mode (rows are streamed, not held as cells)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(df.columns.tolist())
+    plain = df.astype(object).where(df.notna(), None)
+    for row in plain.itertuples(index=False, name=None):
+        sheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def export_data_bytes(df, file_type="csv"):
+    """Return (bytes, mime) for a download_button: csv, csv.gz, xlsx or parquet."""
+    if file_type not in EXPORT_FORMATS:
+        return None, None
+    mime = EXPORT_FORMATS[file_type][1]
+    if file_type == "csv":
+        return df.to_csv(index=False).encode("utf-8"), mime
+    if file_type == "csv.gz":
+        output = io.BytesIO()
+        df.to_csv(output, index=False, compression={"method": "gzip", "compresslevel": 6})
+        return output.getvalue(), mime
+    if file_type == "xlsx":
+        return _xlsx_bytes(df), mime
+    output = io.BytesIO()
+    df.to_parquet(output, index=False)
+    return output.getvalue(), mime
+
+
+def _traced_export(df, file_type):
+    with span(f"export.{file_type}", rows=len(df)) as s:
+        data = export_data_bytes(strip_derived(df), file_type)[0]
+        s.nbytes = len(data) if data is not None else None
+        return data
+
+
+def cached_export_bytes(df, file_type, storage):
+    """Export bytes generated on demand and cached per storage fingerprint and format."""
+    return CACHE.get_or_compute(
+        "export", storage.fingerprint(), lambda: _traced_export(df, file_type),
+        params=(file_type,)
+    )
+
+
+def clean_data(df):
+    """
+    Standardizes and cleans expense data.
+    - Strips whitespace (blank text becomes missing)
+    - Normalizes 'Date' to datetime64 at midnight
+    - Applies the canonical schema (categoricals, float64 amounts)
+    """
+    return apply_schema(df)
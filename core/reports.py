@@ -0,0 +1,89 @@
+# core/reports.py
+"""
+Summary tables over the aggregate cube, shared by the analytics page,
+the charts and cli.py's report command. Plain DataFrames / numbers only;
+rendering is up to the caller.
+"""
+import pandas as pd
+
+from config import CACHE_TTL_MEDIUM
+from core.cube import rollup
+from core.cache import cached_on_frame
+from core.forecasting import HAS_STATS, forecast_next
+
+
+@cached_on_frame("monthly_totals", ttl=CACHE_TTL_MEDIUM)
+def monthly_totals(cube):
+    """YearMonth / PricePaid totals, oldest month first."""
+    return (
+        rollup(cube, "YearMonth")[["YearMonth", "Sum"]]
+        .rename(columns={"Sum": "PricePaid"})
+        .sort_values("YearMonth")
+        .reset_index(drop=True)
+    )
+
+
+def month_change(monthly):
+    """% change of the last month vs the one before, or None with fewer than 2 months."""
+    if len(monthly) < 2:
+        return None
+    last, prev = monthly["PricePaid"].iloc[-1], monthly["PricePaid"].iloc[-2]
+    return (last - prev) / prev * 100 if prev != 0 else 0
+
+
+def category_totals(cube):
+    """Category / TotalSpend / Purchases, largest spend first."""
+    return (
+        rollup(cube, "Category")
+        .rename(columns={"Sum": "TotalSpend", "Count": "Purchases"})
+        [["Category", "TotalSpend", "Purchases"]]
+        .sort_values("TotalSpend", ascending=False, ignore_index=True)
+    )
+
+
+def top_categories(cube, month=None, n=3):
+    """The n largest categories (Category / Sum) of a "YYYY-MM" month, the current one by default."""
+    month = month or pd.Timestamp.now().to_period("M").strftime("%Y-%m")
+    this_month = cube[cube["YearMonth"] == month]
+    if this_month.empty:
+        return pd.DataFrame(columns=["Category", "Sum"])
+    return rollup(this_month, "Category").sort_values("Sum", ascending=False).head(n)[["Category", "Sum"]]
+
+
+def efficiency_scores(cube):
+    """Category / EfficiencyScore: average spend per purchase, highest first."""
+    totals = category_totals(cube)
+    totals["EfficiencyScore"] = (totals["TotalSpend"] / totals["Purchases"]).where(totals["Purchases"] > 0, 0)
+    return totals[["Category", "EfficiencyScore"]].sort_values("EfficiencyScore", ascending=False)
+
+
+def what_if_savings(cube, reduction, category="dining"):
+    """(savings, new total) when spending in categories matching category is cut by reduction %."""
+    by_category = rollup(cube, "Category")
+    total = cube["Sum"].sum()
+    matching = by_category[by_category["Category"].str.contains(category, case=False, na=False)]["Sum"].sum()
+    savings = matching * (reduction / 100)
+    return savings, total - savings
+
+
+def summary(cube, forecast=True):
+    """
+    Headline numbers: total, transactions, months, last month and its change,
+    and the next-month forecast (None when not asked for, without statsmodels,
+    with fewer than 2 months or when the fit fails).
+    """
+    monthly = monthly_totals(cube)
+    if not (forecast and HAS_STATS and len(monthly) >= 2):
+        forecast = None
+    else:
+        fit = forecast_next(monthly["PricePaid"].to_numpy(), block=True)  # one-shot callers: wait for the pool
+        forecast = fit["forecast"] if fit else None
+    return {
+        "total": float(cube["Sum"].sum()),
+        "transactions": int(cube["Count"].sum()),
+        "months": len(monthly),
+        "last_month": monthly["YearMonth"].iloc[-1] if len(monthly) else None,
+        "last_month_total": float(monthly["PricePaid"].iloc[-1]) if len(monthly) else 0.0,
+        "change_pct": month_change(monthly),
+        "forecast": forecast,
+    }
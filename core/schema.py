@@ -0,0 +1,123 @@
+# core/schema.py
+"""
+Canonical in-memory schema for the expense ledger, applied once at load.
+- Date          -> datetime64 (normalized to midnight)
+- Low-cardinality text (ExpenseType, Category, Shop, ...) -> categorical
+- PricePaid / Quantity / PricePerUnit -> float64
+- RowID         -> Int64, a persistent per-transaction id that edits are matched on
+Downstream code relies on these dtypes instead of re-coercing.
+"""
+import numpy as np
+import pandas as pd
+
+from core.tracing import traced
+
+EXPECTED_COLUMNS = [
+    "Date", "ExpenseType", "Category", "Subcategory", "Item",
+    "Brand", "Shop", "PricePaid", "Currency", "Quantity",
+    "QuantityUnit", "PricePerUnit", "RowID"
+]
+DATA_COLUMNS = EXPECTED_COLUMNS[:-1]
+
+# Ids stay below 2**53 so they survive stores that hold numbers as doubles (Sheets, CSV)
+_ROW_ID_MASK = (1 << 53) - 1
+
+NUMERIC_COLUMNS = ["PricePaid", "Quantity", "PricePerUnit"]
+CATEGORICAL_COLUMNS = ["ExpenseType", "Category", "Subcategory", "Brand", "Shop", "Currency", "QuantityUnit"]
+TEXT_COLUMNS = ["Item"]
+
+
+def as_datetime(series):
+    """Return series as datetime64, skipping the parse when it already is."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors="coerce")
+
+
+def _clean_text(series):
+    """Strip whitespace; blanks become missing. Non-string values are kept as text."""
+    text = series.astype(object).where(series.notna(), None).map(
+        lambda v: v if v is None else str(v).strip()
+    )
+    return text.where(text != "", None)
+
+
+def new_row_ids(n):
+    """n fresh random row ids."""
+    return np.random.default_rng().integers(1, _ROW_ID_MASK, size=n, dtype=np.int64)
+
+
+def with_row_ids(df):
+    """Return df with fresh ids for rows that have no RowID yet (new rows)."""
+    ids = pd.to_numeric(df["RowID"], errors="coerce") if "RowID" in df.columns else pd.Series(np.nan, index=df.index)
+    missing = ids.isna().to_numpy()
+    if not missing.any():
+        return df
+    ids = ids.astype("Int64")
+    ids[missing] = new_row_ids(int(missing.sum()))
+    return df.assign(RowID=ids)
+
+
+def _legacy_row_ids(df):
+    """
+    Deterministic ids for rows stored before RowID existed: a hash of the row's
+    contents and its occurrence number among identical rows, so every load of
+    the same data agrees until the ids are written back by the next save.
+    """
+    content = pd.Series(pd.util.hash_pandas_object(df[DATA_COLUMNS], index=False).to_numpy())
+    occurrence = content.groupby(content).cumcount()
+    ids = pd.util.hash_pandas_object(pd.DataFrame({"h": content, "n": occurrence}), index=False)
+    return (ids.to_numpy(dtype="uint64") & _ROW_ID_MASK).astype("int64") | 1
+
+
+@traced("apply_schema")
+def apply_schema(df):
+    """Return df with EXPECTED_COLUMNS present and typed per the canonical schema."""
+    df = df.copy()
+    for col in EXPECTED_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    df["Date"] = as_datetime(df["Date"]).dt.normalize()
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in CATEGORICAL_COLUMNS:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _clean_text(df[col]).astype("category")
+    for col in TEXT_COLUMNS:
+        df[col] = _clean_text(df[col])
+
+    df["RowID"] = pd.to_numeric(df["RowID"], errors="coerce").astype("Int64")
+    missing = df["RowID"].isna().to_numpy()
+    if missing.any():
+        df.loc[missing, "RowID"] = _legacy_row_ids(df)[missing]
+    return df
+
+
+def concat_typed(frames):
+    """
+    Concatenate schema-typed frames keeping categorical columns categorical
+    (categories are unioned first), so the result needs no apply_schema pass.
+    """
+    frames = [f for f in frames if len(f)] or frames[:1]
+    for col in CATEGORICAL_COLUMNS:
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            categories = frames[0][col].cat.categories
+            for f in frames[1:]:
+                categories = categories.union(f[col].cat.categories)
+            frames = [f.assign(**{col: f[col].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_editable(df):
+    """
+    Plain-typed copy for st.data_editor: categoricals become object (so new
+    values can be typed in) and Date becomes datetime.date.
+    """
+    out = df.copy()
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object)
+    if "Date" in out.columns:
+        out["Date"] = as_datetime(out["Date"]).dt.date
+    return out
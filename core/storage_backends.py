@@ -0,0 +1,994 @@
+# core/storage_backends.py
+"""
+Pluggable storage backends behind core.ledger.open_storage / load_data / save_data.
+Every backend exposes the same calls:
+    load()                          -> DataFrame with EXPECTED_COLUMNS
+    fingerprint()                   -> cheap token that changes when the data does
+    save(df, mode)                  -> persist the full frame
+    append_chunks(chunks)           -> add rows from an iterable of frames
+    query(filters)                  -> only the rows matching filters
+    distinct(column, filters)       -> sorted unique values among matching rows
+    value_range(column)             -> (min, max) of a column
+    incomplete()                    -> rows missing Date or ExpenseType
+    apply_changes(updates, inserts, deletes) -> row-level edits matched on RowID
+The base class implements the query helpers in pandas on top of load();
+backends with supports_pushdown = True answer them natively.
+Backends raise on failure; the caller (data_manager in the UI, cli.py) decides how to surface errors.
+
+Filters are a dict of column -> selection:
+    list of values       -> isin (ExpenseType, Category, ..., plus "Year" / "Month")
+    (low, high) tuple    -> inclusive range, for the RANGE_COLUMNS
+Empty or None selections are ignored.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from difflib import SequenceMatcher
+import numpy as np
+import pandas as pd
+from core.schema import EXPECTED_COLUMNS, NUMERIC_COLUMNS, as_datetime, apply_schema, concat_typed, with_row_ids
+from core.tracing import traced
+
+RANGE_COLUMNS = ["Date", "PricePaid", "Amount"]  # Amount: reporting-currency frames only, never a store
+
+
+def _filter_series(df, column):
+    """Column values used for filtering; Year / Month are derived from Date."""
+    if column in ("Year", "Month"):
+        dates = as_datetime(df["Date"])
+        return dates.dt.year if column == "Year" else dates.dt.month
+    if column == "Date":
+        return as_datetime(df["Date"]).dt.normalize()
+    return df[column]
+
+
+@traced("apply_filters")
+def apply_filters(df, filters):
+    """Filter a DataFrame in pandas using the filters dict described above."""
+    mask = pd.Series(True, index=df.index)
+    for column, selection in (filters or {}).items():
+        if selection is None or len(selection) == 0 or (column not in df.columns and column not in ("Year", "Month")):
+            continue
+        series = _filter_series(df, column)
+        if column in RANGE_COLUMNS:
+            low, high = selection
+            if column == "Date":
+                low, high = pd.Timestamp(low), pd.Timestamp(high)
+            mask &= (series >= low) & (series <= high)
+        else:
+            mask &= series.isin(selection)
+    return df[mask]
+
+
+def apply_row_changes(df, updates, inserts, deletes):
+    """
+    Return df (schema-typed) with rows replaced by RowID from updates, rows in
+    deletes (RowIDs) removed and inserts appended. Updated rows keep their position.
+    """
+    ids = pd.Index(df["RowID"])
+    update_ids = updates["RowID"] if len(updates) else pd.Series([], dtype="Int64")
+    drop = ids.isin(list(deletes)) | ids.isin(update_ids)
+    positions = ids.get_indexer(update_ids)
+    order = np.concatenate([
+        np.flatnonzero(~drop),
+        np.where(positions >= 0, positions, len(df)),  # unknown ids land at the end
+        np.full(len(inserts), len(df)),
+    ])
+    out = pd.concat([df[~drop], updates, inserts], ignore_index=True)
+    return apply_schema(out.iloc[np.argsort(order, kind="stable")].reset_index(drop=True))
+
+
+def _file_fingerprint(name, path):
+    """(name, path, mtime, size) for file stores; any write changes it."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (name, path, None, 0)
+    return (name, path, stat.st_mtime_ns, stat.st_size)
+
+
+class StorageBackend:
+    """Base interface for expense storage."""
+    name = "base"
+    supports_pushdown = False
+    revision = 0
+
+    def load(self):
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Cheap dataset identity used as the cache key (see cache.py)."""
+        return (self.name, self.revision)
+
+    def save(self, df, mode="diff"):
+        raise NotImplementedError
+
+    def query(self, filters):
+        return apply_filters(self.load(), filters)
+
+    def distinct(self, column, filters=None):
+        df = apply_filters(self.load(), filters)
+        return sorted(_filter_series(df, column).dropna().unique().tolist())
+
+    def value_range(self, column):
+        series = _filter_series(self.load(), column).dropna()
+        return (series.min(), series.max()) if not series.empty else (None, None)
+
+    def incomplete(self):
+        df = self.load()
+        return df[_incomplete_mask(df)]
+
+    def apply_changes(self, updates, inserts, deletes):
+        """Row-level edits; file stores rewrite the whole frame, row stores override this."""
+        self.save(apply_row_changes(apply_schema(self.load()), updates, inserts, deletes))
+
+    def append_chunks(self, chunks):
+        """Append rows chunk by chunk; returns the number of rows written."""
+        full, written = self.load(), 0
+        for chunk in chunks:
+            full = pd.concat([full, chunk], ignore_index=True)
+            written += len(chunk)
+        self.save(full)
+        return written
+
+
+# ====================================================
+# 📄 GOOGLE SHEETS
+# ====================================================
+def _to_sheet_rows(df):
+    """Render a DataFrame as the list-of-string rows gspread writes (missing -> "")."""
+    out = df.astype(object).where(df.notna(), "")
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            out[col] = df[col].dt.strftime("%Y-%m-%d").fillna("")
+    return out.astype(str).values.tolist()
+
+
+class SheetsBackend(StorageBackend):
+    """
+    gspread worksheet storage backed by a local mirror file.
+    - Cold start serves the mirror at once and reconciles in a background thread;
+      sync() does the same reconcile blocking (one-shot readers such as cli.py)
+    - Refreshes compare the spreadsheet's last-update time with the one seen at
+      the last sync: unchanged means the mirror is current, anything else (an
+      edit, an append, or a time we could not read) means one full pull, compared
+      with the mirror, so edits made elsewhere are never missed
+    - Our own writes record the update time right after writing, so they don't
+      force a pull; an edit landing in that one round trip is not detected
+    save(mode="diff") refreshes first, then pushes only changed rows; mode="resync" rewrites the sheet.
+    """
+    name = "sheets"
+
+    def __init__(self, sheet, mirror_path=None):
+        self.sheet = sheet
+        self.mirror_path = mirror_path
+        # Last rows known to be on the sheet, as strings (header excluded)
+        self._snapshot = None
+        self._header = None
+        self._stamp = None  # spreadsheet last-update time at the last sync (None = unknown)
+        self._lock = threading.RLock()
+        self._reconciler = None
+        self.last_sync_error = None
+
+    def load(self):
+        if self.syncing:
+            return pd.DataFrame(list(self._snapshot), columns=self._header)  # mirror, don't wait
+        with self._lock:
+            if self._snapshot is None and self._read_mirror():
+                self._reconciler = threading.Thread(target=self._reconcile, daemon=True)
+                self._reconciler.start()
+            elif self._snapshot is None:
+                self._full_pull(self._remote_stamp())
+            else:
+                self._refresh()
+            return pd.DataFrame(list(self._snapshot), columns=self._header)
+
+    @property
+    def syncing(self):
+        """True while the cold-start reconcile is still running."""
+        return self._reconciler is not None and self._reconciler.is_alive()
+
+    def fingerprint(self):
+        # Our own saves and remote changes found by a refresh bump the revision
+        return (self.name, self.sheet.id, self.revision)
+
+    def _reconcile(self):
+        try:
+            with self._lock:
+                self._refresh()
+            self.last_sync_error = None
+        except Exception as e:
+            self.last_sync_error = e  # keep serving the mirror; the next load retries
+
+    def _rows(self, values):
+        """Pad / trim sheet rows (trailing blanks are omitted by the API) to the header width."""
+        width = len(self._header)
+        return [(list(row) + [""] * width)[:width] for row in values if any(cell != "" for cell in row)]
+
+    def _remote_stamp(self):
+        try:
+            return self.sheet.spreadsheet.get_lastUpdateTime()
+        except Exception:
+            return None
+
+    @traced("sheets.full_pull", arg=None)
+    def _full_pull(self, stamp=None):
+        values = self.sheet.get_all_values()
+        header = values[0] if values else list(EXPECTED_COLUMNS)
+        self._header = header
+        rows = self._rows(values[1:])
+        if rows != self._snapshot:
+            self.revision += 1
+        self._snapshot = rows
+        self._stamp = stamp
+        self._write_mirror()
+
+    @traced("sheets.refresh", arg=None)
+    def _refresh(self):
+        """Trust the mirror only while the sheet's update time is the one seen at the last sync."""
+        stamp = self._remote_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return  # untouched since the last sync
+        self._full_pull(stamp)  # bumps the revision only if the rows differ from the mirror
+
+    def sync(self):
+        """Bring the snapshot up to date with the sheet now, blocking (no background reconcile)."""
+        with self._lock:
+            if self._snapshot is None and not self._read_mirror():
+                self._full_pull(self._remote_stamp())
+            else:
+                self._refresh()
+            self.last_sync_error = None
+
+    def _read_mirror(self):
+        """Load the mirror into the snapshot; False if missing, unreadable or for another sheet."""
+        if not self.mirror_path or not os.path.exists(self.mirror_path):
+            return False
+        try:
+            with open(self.mirror_path, encoding="utf-8") as f:
+                mirror = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if mirror.get("sheet_id") != self.sheet.id:
+            return False
+        self._header, self._snapshot = mirror["header"], mirror["rows"]
+        self._stamp = mirror.get("stamp")
+        return True
+
+    def _write_mirror(self):
+        if not self.mirror_path:
+            return
+        tmp_path = f"{self.mirror_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sheet_id": self.sheet.id, "stamp": self._stamp, "header": self._header, "rows": self._snapshot}, f)
+        os.replace(tmp_path, self.mirror_path)
+
+    def save(self, df, mode="diff"):
+        with self._lock:
+            self.revision += 1
+            try:
+                if mode == "resync" or (self._header is not None and df.columns.tolist() != self._header):
+                    self._resync(df)  # columns changed (e.g. RowID added): rewrite with the new header
+                else:
+                    if self._snapshot is not None:
+                        self._refresh()  # diff against what the sheet holds, not a stale mirror
+                    self._diff_sync(df)
+            except Exception:
+                self._snapshot = None  # state unknown, re-read next time
+                raise
+            self._header = df.columns.tolist()
+            self._stamp = self._remote_stamp()  # our own write moved the update time
+            self._write_mirror()
+
+    @traced("sheets.resync", arg=1)
+    def _resync(self, df):
+        """Full rewrite: clear the worksheet and push header + every row."""
+        rows = _to_sheet_rows(df)
+        self.sheet.clear()
+        self.sheet.append_row(df.columns.tolist())
+        if rows:
+            self.sheet.append_rows(rows)
+        self._snapshot = rows
+
+    @traced("sheets.diff_sync", arg=1)
+    def _diff_sync(self, df):
+        """
+        Push only what changed since the last sync.
+        - Changed rows go out as one batch_update
+        - Removed / inserted blocks are deleted / inserted in place
+        - Rows past the old end are appended
+        Sheet row 1 is the header, so data row i lives on sheet row i + 2.
+        """
+        from gspread.utils import rowcol_to_a1
+
+        old = self._snapshot
+        if old is None:
+            # No snapshot (e.g. fresh process): read what the sheet holds now
+            old = self.sheet.get_all_values()[1:]
+        new = _to_sheet_rows(df)
+
+        matcher = SequenceMatcher(None, [tuple(r) for r in old], [tuple(r) for r in new], autojunk=False)
+        updates, structural, tail = [], [], []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            overlap = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+            if overlap:
+                updates.append({
+                    "range": f"A{i1 + 2}:{rowcol_to_a1(i1 + overlap + 1, len(df.columns))}",
+                    "values": new[j1:j1 + overlap],
+                })
+            if i2 - i1 > overlap:
+                structural.append(("delete", i1 + overlap, i2, None))
+            if j2 - j1 > overlap:
+                if i2 >= len(old):
+                    tail.extend(new[j1 + overlap:j2])
+                else:
+                    structural.append(("insert", i1 + overlap, None, new[j1 + overlap:j2]))
+
+        # Updates use pre-change positions, so send them before any shifts
+        if updates:
+            self.sheet.batch_update(updates)
+        # Apply structural edits bottom-up so earlier positions stay valid
+        for op, start, end, values in reversed(structural):
+            if op == "delete":
+                self.sheet.delete_rows(start + 2, end + 1)
+            else:
+                self.sheet.insert_rows(values, row=start + 2)
+        if tail:
+            self.sheet.append_rows(tail)
+        self._snapshot = new
+
+    def append_chunks(self, chunks):
+        with self._lock:
+            self.revision += 1
+            if self._snapshot is None:
+                self._full_pull()
+            else:
+                self._refresh()  # rows the sheet gained elsewhere belong before ours in the mirror
+            written = 0
+            for chunk in chunks:
+                rows = _to_sheet_rows(chunk.reindex(columns=self._header))
+                if rows:
+                    self.sheet.append_rows(rows)
+                    self._snapshot.extend(rows)
+                    written += len(rows)
+            self._stamp = self._remote_stamp()  # our own write moved the update time
+            self._write_mirror()
+            return written
+
+
+# ====================================================
+# 🗒️ CSV (legacy local store / import-export format)
+# ====================================================
+class CsvBackend(StorageBackend):
+    """Plain CSV file. Kept for setups without pyarrow."""
+    name = "csv"
+
+    def __init__(self, path):
+        self.path = path
+
+    def fingerprint(self):
+        return _file_fingerprint(self.name, self.path)
+
+    def load(self):
+        if os.path.exists(self.path):
+            return pd.read_csv(self.path)
+        return pd.DataFrame(columns=EXPECTED_COLUMNS)
+
+    def save(self, df, mode="diff"):
+        df.to_csv(self.path, index=False)
+
+    def append_chunks(self, chunks):
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        columns = pd.read_csv(self.path, nrows=0).columns.tolist() if exists else EXPECTED_COLUMNS
+        written = 0
+        for chunk in chunks:
+            chunk.reindex(columns=columns).to_csv(self.path, mode="a", header=not exists, index=False)
+            exists = True
+            written += len(chunk)
+        return written
+
+
+# ====================================================
+# 🏹 ARROW IPC (typed, memory-mapped local store)
+# ====================================================
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    fields = []
+    for col in columns:
+        if col == "Date":
+            fields.append(pa.field(col, pa.date32()))
+        elif col in NUMERIC_COLUMNS:
+            fields.append(pa.field(col, pa.float64()))
+        elif col == "RowID":
+            fields.append(pa.field(col, pa.int64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def _arrow_table(df, schema):
+    """Convert df to an Arrow table with the given schema (missing columns are null)."""
+    import pyarrow as pa
+
+    typed = pd.DataFrame(index=df.index)
+    for col in schema.names:
+        values = df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if col == "Date":
+            typed[col] = pd.to_datetime(values, errors="coerce").dt.date
+        elif col in NUMERIC_COLUMNS:
+            typed[col] = pd.to_numeric(values, errors="coerce")
+        elif col == "RowID":
+            typed[col] = pd.to_numeric(values, errors="coerce").astype("Int64")
+        elif isinstance(values.dtype, pd.StringDtype) or (
+            isinstance(values.dtype, pd.CategoricalDtype)
+            and (isinstance(values.dtype.categories.dtype, pd.StringDtype) or not len(values.dtype.categories))
+        ):
+            typed[col] = values.astype("str")  # already text (apply_schema): no Python pass per value
+        else:
+            typed[col] = values.astype(object).where(values.notna(), None).map(
+                lambda v: v if v is None else str(v)
+            )
+    return pa.Table.from_pandas(typed, schema=schema, preserve_index=False)
+
+
+class ArrowBackend(StorageBackend):
+    """
+    Arrow IPC file with a fixed, typed schema.
+    Reads go through a memory map, so a cold load skips parsing entirely.
+    On first use an existing CSV store is migrated into the Arrow file.
+    """
+    name = "arrow"
+
+    def __init__(self, path, legacy_csv=None):
+        import pyarrow  # noqa: F401  (fail early so callers can fall back)
+
+        self.path = path
+        if legacy_csv and not os.path.exists(path) and os.path.exists(legacy_csv):
+            self.save(pd.read_csv(legacy_csv))
+
+    def fingerprint(self):
+        return _file_fingerprint(self.name, self.path)
+
+    def load(self):
+        import pyarrow as pa
+
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        with pa.memory_map(self.path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas(date_as_object=False)
+
+    def save(self, df, mode="diff"):
+        import pyarrow as pa
+
+        columns = list(dict.fromkeys(EXPECTED_COLUMNS + df.columns.tolist()))
+        table = _arrow_table(df, _arrow_schema(columns))
+
+        # Write to a temp file and swap, so readers never see a half-written store
+        tmp_path = f"{self.path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, self.path)
+
+    def append_chunks(self, chunks):
+        """Append each chunk's rows (see append_tables); memory stays at about one chunk."""
+        written = 0
+
+        def tables(schema):
+            nonlocal written
+            for chunk in chunks:
+                written += len(chunk)
+                yield _arrow_table(chunk, schema)
+
+        self.append_tables(tables)
+        return written
+
+    def append_tables(self, tables, schema=None):
+        """
+        Stream the existing record batches (zero-copy from the memory map) and
+        the Arrow tables yielded by tables(file schema) into a fresh file, so
+        stored rows are copied, never converted. schema is used for a new file
+        (default: EXPECTED_COLUMNS).
+        """
+        import pyarrow as pa
+
+        tmp_path = f"{self.path}.tmp"
+        source = pa.memory_map(self.path, "r") if os.path.exists(self.path) else None
+        try:
+            reader = pa.ipc.open_file(source) if source is not None else None
+            schema = reader.schema if reader is not None else schema or _arrow_schema(EXPECTED_COLUMNS)
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, schema) as writer:
+                    if reader is not None:
+                        for i in range(reader.num_record_batches):
+                            writer.write_batch(reader.get_batch(i))
+                    for table in tables(schema):
+                        writer.write_table(table)
+        finally:
+            if source is not None:
+                source.close()
+        os.replace(tmp_path, self.path)
+
+
+# ====================================================
+# 🗂️ PARTITIONED (one Arrow file per year / month + manifest)
+# ====================================================
+UNDATED = "undated"                     # partition of the rows without a valid Date
+MANIFEST_VALUES = ["Category", "Shop"]  # distinct values kept per partition in the manifest
+
+
+def _partition_keys(df):
+    """Partition key per row: "YYYY-MM" of its Date, or UNDATED."""
+    dates = as_datetime(df["Date"]) if "Date" in df.columns else pd.Series(pd.NaT, index=df.index)
+    codes = (dates.dt.year * 100 + dates.dt.month).fillna(0).astype(int)
+    names = {code: UNDATED if code == 0 else f"{code // 100:04d}-{code % 100:02d}" for code in codes.unique()}
+    return codes.map(names)
+
+
+def _incomplete_mask(df):
+    """Rows missing Date or ExpenseType (blank text counts as missing)."""
+    mask = as_datetime(df["Date"]).isna() if "Date" in df.columns else pd.Series(True, index=df.index)
+    if "ExpenseType" in df.columns:
+        expense_type = df["ExpenseType"]
+        mask |= expense_type.isna() | (expense_type.astype(object).astype(str).str.strip() == "")
+    return mask
+
+
+def _row_hashes(df):
+    """Per-row content hashes, unchanged by the Arrow round trip or apply_schema."""
+    columns = list(dict.fromkeys(EXPECTED_COLUMNS + df.columns.tolist()))
+    stored = df.reindex(columns=columns)
+    stored["Date"] = as_datetime(stored["Date"]).astype("datetime64[ns]")
+    return pd.util.hash_pandas_object(stored, index=False).to_numpy()
+
+
+def _partition_digest(df, hashes=None):
+    """
+    Content hash of a partition's rows: the sum of their row hashes, so
+    appended rows extend it (_merge_stats) without rereading the partition.
+    """
+    hashes = _row_hashes(df) if hashes is None else hashes
+    return f"{int(hashes.sum(dtype=np.uint64)):016x}"
+
+
+def _merge_stats(stats, added):
+    """Manifest stats of a partition after appending rows whose stats are added."""
+    def widen(a, b):
+        return b if a is None else a if b is None else [min(a[0], b[0]), max(a[1], b[1])]
+
+    digest = None  # digests from before they were additive: the next save rewrites the partition
+    if stats["digest"] and len(stats["digest"]) == 16:
+        digest = f"{(int(stats['digest'], 16) + int(added['digest'], 16)) % (1 << 64):016x}"
+    return {
+        "file": stats["file"],
+        "rows": stats["rows"] + added["rows"],
+        "total": stats["total"] + added["total"],
+        "price": widen(stats["price"], added["price"]),
+        "dates": widen(stats["dates"], added["dates"]),
+        "values": {
+            column: sorted(set(stats["values"].get(column, [])) | set(added["values"].get(column, [])))
+            for column in set(stats["values"]) | set(added["values"])
+        },
+        "incomplete": stats["incomplete"] + added["incomplete"],
+        "digest": digest,
+    }
+
+
+class PartitionedBackend(StorageBackend):
+    """
+    Directory of Arrow IPC files, one per calendar month (<dir>/<year>/<YYYY-MM>.arrow;
+    rows without a Date go to undated.arrow), listed in manifest.json with each
+    partition's row count, PricePaid total and range, date range, Category /
+    Shop values, incomplete rows and a content digest.
+    - Year / Month / Date filters pick partitions from the manifest, so reading
+      one month costs the same with one year of history or ten
+    - Year / Month options and the Date / PricePaid ranges come from the manifest alone
+    - Writes rewrite only the partitions whose rows changed; rows new to a
+      partition are appended to it (its stored rows are copied, not converted)
+      and its stats extended
+    On first use an existing single-file store (Arrow or CSV) is split into partitions.
+    """
+    name = "partitioned"
+    supports_pushdown = True
+
+    def __init__(self, path, legacy=()):
+        import pyarrow  # noqa: F401  (fail early so callers can fall back)
+
+        self.path = path
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self._manifest = None
+        self._manifest_stamp = None
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        if not os.path.exists(self.manifest_path):
+            for legacy_path in legacy:
+                if legacy_path and os.path.exists(legacy_path):
+                    is_arrow = legacy_path.endswith(".arrow")
+                    legacy_df = ArrowBackend(legacy_path).load() if is_arrow else pd.read_csv(legacy_path)
+                    self.save(apply_schema(legacy_df))  # stores the RowIDs legacy rows are given on load
+                    break
+
+    def fingerprint(self):
+        return _file_fingerprint(self.name, self.manifest_path)
+
+    def manifest(self):
+        """{partition key: stats}, re-read only when manifest.json changed."""
+        stamp = self.fingerprint()
+        if stamp != self._manifest_stamp:
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                manifest = {"revision": 0, "partitions": {}}
+            self._manifest, self._manifest_stamp = manifest, stamp
+        return self._manifest["partitions"]
+
+    def _write_manifest(self, partitions):
+        self.manifest()
+        manifest = {"revision": self._manifest["revision"] + 1, "partitions": dict(sorted(partitions.items()))}
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest, self._manifest_stamp = manifest, self.fingerprint()
+
+    def _file(self, key):
+        if key == UNDATED:
+            return os.path.join(self.path, f"{UNDATED}.arrow")
+        return os.path.join(self.path, key[:4], f"{key}.arrow")
+
+    def _partition(self, key):
+        os.makedirs(os.path.dirname(self._file(key)), exist_ok=True)
+        return ArrowBackend(self._file(key))
+
+    @staticmethod
+    def _stat_columns(df):
+        """The per-row inputs of _stats, computed once for a batch that spans partitions."""
+        columns = pd.DataFrame({
+            "Date": as_datetime(df["Date"]),
+            "Price": pd.to_numeric(df["PricePaid"], errors="coerce"),
+            "Incomplete": _incomplete_mask(df),
+            "Hash": _row_hashes(df),
+        }, index=df.index)
+        for column in MANIFEST_VALUES:
+            if column in df.columns:
+                columns[column] = df[column].astype(object).where(df[column].notna()).map(str, na_action="ignore")
+        return columns
+
+    def _stats(self, key, df, digest=None, columns=None):
+        columns = self._stat_columns(df) if columns is None else columns
+        dates, price = columns["Date"].dropna(), columns["Price"].dropna()
+        return {
+            "file": os.path.relpath(self._file(key), self.path),
+            "rows": len(columns),
+            "total": float(price.sum()),
+            "price": [float(price.min()), float(price.max())] if len(price) else None,
+            "dates": [dates.min().date().isoformat(), dates.max().date().isoformat()] if len(dates) else None,
+            "values": {
+                column: sorted(v for v in columns[column].dropna().unique() if v.strip())
+                for column in MANIFEST_VALUES if column in columns.columns
+            },
+            "incomplete": int(columns["Incomplete"].sum()),
+            "digest": digest or _partition_digest(df, columns["Hash"].to_numpy()),
+        }
+
+    def _write(self, partitions, key, df, digest=None):
+        """Store df as partition key (removing it when empty) and record its stats."""
+        if len(df):
+            self._partition(key).save(df)
+            partitions[key] = self._stats(key, df, digest)
+        elif key in partitions:
+            os.remove(self._file(key))
+            del partitions[key]
+
+    def _read(self, keys):
+        frames = [self._partition(key).load() for key in keys]
+        if not frames:
+            return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def _prune(self, filters):
+        """Keys of the partitions that can hold rows matching the Year / Month / Date filters."""
+        years, months, dates = ((filters or {}).get(c) for c in ("Year", "Month", "Date"))
+        keys = sorted(self.manifest())
+        if not any(s is not None and len(s) for s in (years, months, dates)):
+            return keys
+        low, high = (pd.Timestamp(d).strftime("%Y-%m") for d in dates) if dates else ("0000-00", "9999-99")
+        years = {int(y) for y in years} if years else None
+        months = {int(m) for m in months} if months else None
+        return [
+            key for key in keys
+            if key != UNDATED and low <= key <= high
+            and (years is None or int(key[:4]) in years)
+            and (months is None or int(key[5:]) in months)
+        ]
+
+    def load(self):
+        return self._read(sorted(self.manifest()))
+
+    def query(self, filters):
+        return apply_filters(self._read(self._prune(filters)), filters)
+
+    def distinct(self, column, filters=None):
+        filters = {c: s for c, s in (filters or {}).items() if s is not None and len(s)}
+        keys = self._prune(filters)
+        if set(filters) <= {"Year", "Month"}:  # whole partitions match: the manifest has the answer
+            if column in ("Year", "Month"):
+                return sorted({int(key[:4]) if column == "Year" else int(key[5:]) for key in keys if key != UNDATED})
+            if column in MANIFEST_VALUES:
+                return sorted({v for key in keys for v in self.manifest()[key]["values"].get(column, [])})
+        df = apply_filters(self._read(keys), filters)
+        if column not in df.columns and column not in ("Year", "Month"):
+            return []
+        return sorted(_filter_series(df, column).dropna().unique().tolist())
+
+    def value_range(self, column):
+        stats = self.manifest().values()
+        if column == "Date":
+            spans = [s["dates"] for s in stats if s["dates"]]
+            return (pd.Timestamp(min(d[0] for d in spans)), pd.Timestamp(max(d[1] for d in spans))) if spans else (None, None)
+        if column == "PricePaid":
+            spans = [s["price"] for s in stats if s["price"]]
+            return (min(p[0] for p in spans), max(p[1] for p in spans)) if spans else (None, None)
+        return super().value_range(column)
+
+    def incomplete(self):
+        keys = [key for key, s in self.manifest().items() if s["incomplete"]]
+        df = self._read(keys)
+        return df[_incomplete_mask(df)]
+
+    def save(self, df, mode="diff"):
+        with self._lock:
+            partitions = dict(self.manifest())
+            keys = _partition_keys(df)
+            for key, part in df.groupby(keys, sort=False):
+                digest = _partition_digest(part)
+                if partitions.get(key, {}).get("digest") != digest or not os.path.exists(self._file(key)):
+                    self._write(partitions, key, part.reset_index(drop=True), digest)
+            for key in set(partitions) - set(keys.unique()):
+                self._write(partitions, key, df.iloc[:0])
+            self._write_manifest(partitions)
+
+    def _append(self, partitions, rows):
+        """
+        Add rows not stored yet to the partitions they fall in: converted to
+        Arrow in one pass, appended behind each partition's stored batches, and
+        folded into its stats.
+        """
+        if not len(rows):
+            return
+        rows = rows.reset_index(drop=True)
+        schema = _arrow_schema(list(dict.fromkeys(EXPECTED_COLUMNS + rows.columns.tolist())))
+        table = _arrow_table(rows, schema)
+        keys = _partition_keys(rows).to_numpy()
+        columns = self._stat_columns(rows)
+        for key in sorted(set(keys)):
+            positions = np.flatnonzero(keys == key)
+            part, piece = rows.iloc[positions], table.take(positions)
+            self._partition(key).append_tables(
+                lambda stored: [piece if piece.schema.equals(stored) else _arrow_table(part, stored)], schema
+            )
+            added = self._stats(key, part, columns=columns.iloc[positions])
+            partitions[key] = _merge_stats(partitions[key], added) if key in partitions else added
+
+    def append_chunks(self, chunks):
+        """Append each chunk's rows to the partitions they fall in; the others are not touched."""
+        with self._lock:
+            partitions, written = dict(self.manifest()), 0
+            for chunk in chunks:
+                self._append(partitions, chunk)
+                written += len(chunk)
+            self._write_manifest(partitions)
+            return written
+
+    def _locate(self, row_ids):
+        """Keys of the partitions holding any of row_ids, reading only their RowID column."""
+        import pyarrow as pa
+
+        wanted = np.fromiter(row_ids, dtype=np.int64)
+        found = set()
+        if not len(wanted):
+            return found
+        for key in self.manifest():
+            with pa.memory_map(self._file(key), "r") as source:
+                ids = pa.ipc.open_file(source).read_all().column("RowID").to_numpy(zero_copy_only=False)
+            if np.isin(ids, wanted).any():
+                found.add(key)
+        return found
+
+    def apply_changes(self, updates, inserts, deletes):
+        """
+        Rewrite only the partitions holding edited / deleted rows, read and
+        edited as one batch (one schema pass), then split by month again.
+        Everything else is appended (_append): new rows, updates for RowIDs not
+        stored (so replaying them is harmless) and rows edited into a month
+        that is not being rewritten.
+        """
+        with self._lock:
+            partitions = dict(self.manifest())
+            update_ids = pd.to_numeric(updates["RowID"], errors="coerce").dropna().astype("int64").tolist() if len(updates) else []
+            rewrite = self._locate(set(update_ids) | {int(i) for i in deletes})
+            current = self._read(sorted(rewrite))
+            if current["RowID"].isna().any():
+                current = apply_schema(current)  # rows stored before RowID existed
+            known = updates["RowID"].isin(current["RowID"]).to_numpy() if len(updates) else np.zeros(0, dtype=bool)
+            out = concat_typed([
+                apply_row_changes(current, updates[known], inserts.iloc[:0], deletes),
+                apply_schema(pd.concat([updates[~known], inserts], ignore_index=True)),
+            ])
+            keys = _partition_keys(out).to_numpy()
+            rewritten = np.isin(keys, list(rewrite))
+            for key in sorted(rewrite):
+                self._write(partitions, key, out[keys == key].reset_index(drop=True))
+            self._append(partitions, out[~rewritten])
+            self._write_manifest(partitions)
+
+
+# ====================================================
+# 🗃️ SQLITE (indexed, filter pushdown)
+# ====================================================
+SQLITE_TABLE = "expenses"
+SQLITE_INDEXED_COLUMNS = ["Date", "Category", "Shop", "ExpenseType", "RowID"]
+
+
+def _sql_type(column):
+    if column in NUMERIC_COLUMNS:
+        return "REAL"
+    return "INTEGER" if column == "RowID" else "TEXT"
+
+
+def _sql_rows(df):
+    """df as plain Python rows for sqlite3: ISO dates, floats, None for missing."""
+    rows = df.copy()
+    if "Date" in rows.columns:
+        dates = pd.to_datetime(rows["Date"], errors="coerce")
+        rows["Date"] = dates.dt.strftime("%Y-%m-%d")
+    for col in NUMERIC_COLUMNS:
+        if col in rows.columns:
+            rows[col] = pd.to_numeric(rows[col], errors="coerce")
+    return rows.astype(object).where(rows.notna(), None)
+
+
+def _sql_expr(column):
+    """SQL expression for a filter column (Year / Month come from the ISO Date text)."""
+    if column == "Year":
+        return "CAST(substr(Date, 1, 4) AS INTEGER)"
+    if column == "Month":
+        return "CAST(substr(Date, 6, 2) AS INTEGER)"
+    return f'"{column}"'
+
+
+def _sql_where(filters):
+    """Translate a filters dict into a WHERE clause and its parameters."""
+    clauses, params = [], []
+    for column, selection in (filters or {}).items():
+        if selection is None or len(selection) == 0:
+            continue
+        expr = _sql_expr(column)
+        if column in RANGE_COLUMNS:
+            low, high = selection
+            if column == "Date":
+                low, high = pd.Timestamp(low).date().isoformat(), pd.Timestamp(high).date().isoformat()
+            clauses.append(f"{expr} BETWEEN ? AND ?")
+            params.extend([low, high])
+        else:
+            clauses.append(f"{expr} IN ({', '.join('?' * len(selection))})")
+            params.extend(selection)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    SQLite file with indexes on Date, Category, Shop, ExpenseType and RowID.
+    Filters are pushed down into SQL so only matching rows reach pandas.
+    Date is stored as ISO text, so range filters and ordering use the index.
+    Edits are applied as UPDATE / INSERT / DELETE of the touched rows only.
+    """
+    name = "sqlite"
+    supports_pushdown = True
+
+    def __init__(self, path, legacy_csv=None):
+        self.path = path
+        fresh = not os.path.exists(path)
+        with closing(self._connect()) as conn, conn:
+            columns = ", ".join(f'"{c}" {_sql_type(c)}' for c in EXPECTED_COLUMNS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} ({columns})")
+            if "RowID" not in self._columns(conn):
+                conn.execute(f'ALTER TABLE {SQLITE_TABLE} ADD COLUMN "RowID" INTEGER')
+            # Rows stored before RowID existed take SQLite's own rowid. The "RowID"
+            # column shadows the rowid alias, so the built-in one is _rowid_ here.
+            conn.execute(f'UPDATE {SQLITE_TABLE} SET "RowID" = _rowid_ WHERE "RowID" IS NULL')
+            for col in SQLITE_INDEXED_COLUMNS:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{col.lower()} ON {SQLITE_TABLE} ("{col}")')
+        if fresh and legacy_csv and os.path.exists(legacy_csv):
+            self.save(pd.read_csv(legacy_csv))
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def fingerprint(self):
+        return _file_fingerprint(self.name, self.path)
+
+    def _columns(self, conn):
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({SQLITE_TABLE})")]
+
+    def _read(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def _insert(self, conn, df):
+        """Insert df rows, adding any columns the table does not have yet."""
+        if df.empty:
+            return
+        known = self._columns(conn)
+        for col in df.columns:
+            if col not in known:
+                conn.execute(f'ALTER TABLE {SQLITE_TABLE} ADD COLUMN "{col}" {_sql_type(col)}')
+        rows = _sql_rows(with_row_ids(df))
+        names = ", ".join(f'"{c}"' for c in rows.columns)
+        marks = ", ".join("?" * len(rows.columns))
+        conn.executemany(f"INSERT INTO {SQLITE_TABLE} ({names}) VALUES ({marks})", rows.values.tolist())
+
+    def load(self):
+        return self._read(f"SELECT * FROM {SQLITE_TABLE} ORDER BY _rowid_")
+
+    def save(self, df, mode="diff"):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"DELETE FROM {SQLITE_TABLE}")
+            self._insert(conn, df)
+
+    def query(self, filters):
+        where, params = _sql_where(filters)
+        return self._read(f"SELECT * FROM {SQLITE_TABLE}{where} ORDER BY _rowid_", params)
+
+    def distinct(self, column, filters=None):
+        where, params = _sql_where(filters)
+        expr = _sql_expr(column)
+        where += (" AND " if where else " WHERE ") + f"{expr} IS NOT NULL"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT DISTINCT {expr} FROM {SQLITE_TABLE}{where} ORDER BY 1", params)
+            return [row[0] for row in rows]
+
+    def value_range(self, column):
+        expr = _sql_expr(column)
+        with closing(self._connect()) as conn:
+            low, high = conn.execute(f"SELECT MIN({expr}), MAX({expr}) FROM {SQLITE_TABLE}").fetchone()
+        if column == "Date" and low is not None:
+            low, high = pd.Timestamp(low), pd.Timestamp(high)
+        return low, high
+
+    def incomplete(self):
+        return self._read(
+            f"SELECT * FROM {SQLITE_TABLE} WHERE \"Date\" IS NULL OR \"Date\" = '' "
+            "OR \"ExpenseType\" IS NULL OR TRIM(\"ExpenseType\") = '' ORDER BY _rowid_"
+        )
+
+    def apply_changes(self, updates, inserts, deletes):
+        with closing(self._connect()) as conn, conn:
+            if len(deletes):
+                conn.executemany(
+                    f'DELETE FROM {SQLITE_TABLE} WHERE "RowID" = ?', [(int(i),) for i in deletes]
+                )
+            if len(updates):
+                columns = [c for c in updates.columns if c != "RowID" and c in self._columns(conn)]
+                assignments = ", ".join(f'"{c}" = ?' for c in columns)
+                rows = _sql_rows(updates)
+                conn.executemany(
+                    f'UPDATE {SQLITE_TABLE} SET {assignments} WHERE "RowID" = ?',
+                    rows[columns + ["RowID"]].values.tolist(),
+                )
+            self._insert(conn, inserts)
+
+    def append_chunks(self, chunks):
+        written = 0
+        with closing(self._connect()) as conn, conn:
+            for chunk in chunks:
+                self._insert(conn, chunk)
+                written += len(chunk)
+        return written
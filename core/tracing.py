@@ -0,0 +1,200 @@
+# core/tracing.py
+"""
+Lightweight per-rerun tracing.
+- span(name) is a context manager, traced(name) a decorator; spans nest and
+  record their duration, rows and bytes moved (set explicitly, or measured
+  from the DataFrame / bytes a traced function returns)
+- Each page calls start_rerun(page) first; its spans are grouped by rerun
+- Spans outside a rerun (background writer threads) are recorded as "background"
+- A bounded history of recent spans feeds the rolling percentiles of the
+  debug panel (ui_components.perf_panel) and its JSON / CSV dumps
+Recording a span costs two perf_counter calls and an append.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import pandas as pd
+
+from config import TRACE_HISTORY_SPANS, TRACE_HISTORY_RERUNS
+
+_spans = deque(maxlen=TRACE_HISTORY_SPANS)      # finished span records, oldest first
+_reruns = deque(maxlen=TRACE_HISTORY_RERUNS)    # finished rerun summaries
+_rerun_ids = itertools.count(1)
+_lock = threading.Lock()
+_local = threading.local()                      # current rerun and span stack of this thread
+
+
+def measure(obj):
+    """(rows, bytes) of a DataFrame / Series / bytes value, else (None, None)."""
+    if isinstance(obj, pd.DataFrame):
+        return len(obj), int(obj.memory_usage(index=False).sum())
+    if isinstance(obj, pd.Series):
+        return len(obj), int(obj.memory_usage(index=False))
+    if isinstance(obj, (bytes, bytearray)):
+        return None, len(obj)
+    return None, None
+
+
+class Span:
+    """An open span; set rows / nbytes (or call measure) before it closes."""
+    __slots__ = ("name", "rows", "nbytes", "attrs")
+
+    def __init__(self, name, rows=None, nbytes=None, attrs=None):
+        self.name = name
+        self.rows = rows
+        self.nbytes = nbytes
+        self.attrs = attrs or {}
+
+    def measure(self, obj):
+        """Take rows / bytes from obj (if measurable) and return obj."""
+        rows, nbytes = measure(obj)
+        if rows is not None:
+            self.rows = rows
+        if nbytes is not None:
+            self.nbytes = nbytes
+        return obj
+
+
+def _current():
+    return getattr(_local, "rerun", None)
+
+
+def start_rerun(page):
+    """Begin collecting this thread's spans for one rerun of page (closing any unfinished one)."""
+    finish_rerun()
+    _local.rerun = {
+        "rerun": next(_rerun_ids), "page": page,
+        "started": datetime.now().isoformat(timespec="milliseconds"),
+        "t0": time.perf_counter(), "spans": [],
+    }
+    _local.stack = []
+
+
+def finish_rerun():
+    """Close the current rerun and return its summary (None if none is open)."""
+    rerun = _current()
+    if rerun is None:
+        return None
+    _local.rerun = None
+    summary = {
+        "rerun": rerun["rerun"], "page": rerun["page"], "started": rerun["started"],
+        "ms": (time.perf_counter() - rerun["t0"]) * 1000, "spans": len(rerun["spans"]),
+    }
+    with _lock:
+        _reruns.append(summary)
+    return summary
+
+
+def current_spans():
+    """Span records of the rerun in progress on this thread."""
+    rerun = _current()
+    return list(rerun["spans"]) if rerun else []
+
+
+@contextmanager
+def span(name, rows=None, nbytes=None, **attrs):
+    """Time a block: with span("storage.load") as s: df = ...; s.measure(df)."""
+    rerun = _current()
+    stack = getattr(_local, "stack", None) if rerun else None
+    handle = Span(name, rows, nbytes, attrs)
+    parent = stack[-1] if stack else None
+    if stack is not None:
+        stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        end = time.perf_counter()
+        if stack is not None:
+            stack.pop()
+        record = {
+            "rerun": rerun["rerun"] if rerun else None,
+            "page": rerun["page"] if rerun else "background",
+            "name": handle.name,
+            "parent": parent,
+            "depth": len(stack) if stack is not None else 0,
+            "start_ms": (start - rerun["t0"]) * 1000 if rerun else 0.0,
+            "ms": (end - start) * 1000,
+            "rows": handle.rows,
+            "bytes": handle.nbytes,
+            **handle.attrs,
+        }
+        if rerun:
+            rerun["spans"].append(record)
+        with _lock:
+            _spans.append(record)
+
+
+def traced(name=None, arg=0):
+    """
+    Decorator: run fn inside a span (named name, default the function's name).
+    Rows / bytes come from the return value, or else from positional argument arg
+    (e.g. the frame a chart is drawn from; use arg=1 on methods, None to skip).
+    """
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label) as s:
+                result = fn(*args, **kwargs)
+                s.measure(result)
+                if s.rows is None and s.nbytes is None and arg is not None and len(args) > arg:
+                    s.measure(args[arg])
+                return result
+        return wrapper
+    return decorator
+
+
+# ====================================================
+# 📈 HISTORY (for the debug panel / offline analysis)
+# ====================================================
+def span_history():
+    """All recorded spans (recent reruns and background) as a DataFrame."""
+    with _lock:
+        records = list(_spans)
+    return pd.DataFrame(records, columns=list(dict.fromkeys(
+        ["rerun", "page", "name", "parent", "depth", "start_ms", "ms", "rows", "bytes"]
+        + [key for record in records for key in record]
+    )))
+
+
+def rerun_history():
+    with _lock:
+        return pd.DataFrame(list(_reruns), columns=["rerun", "page", "started", "ms", "spans"])
+
+
+def percentiles(history=None):
+    """Rolling p50 / p90 / p99 / max duration (ms) and call count per span name."""
+    history = span_history() if history is None else history
+    if history.empty:
+        return pd.DataFrame(columns=["name", "count", "p50", "p90", "p99", "max"])
+    grouped = history.groupby("name")["ms"]
+    stats = grouped.quantile([0.5, 0.9, 0.99]).unstack()
+    stats.columns = ["p50", "p90", "p99"]
+    stats.insert(0, "count", grouped.size())
+    stats["max"] = grouped.max()
+    return stats.reset_index().sort_values("p90", ascending=False, ignore_index=True)
+
+
+def dump(file_type="json"):
+    """Recorded spans and reruns as JSON (one document) or CSV (spans only) bytes."""
+    spans = span_history()
+    if file_type == "csv":
+        return spans.to_csv(index=False).encode("utf-8")
+    reruns = rerun_history()
+    return (
+        '{"reruns": ' + reruns.to_json(orient="records")
+        + ', "spans": ' + spans.to_json(orient="records") + "}"
+    ).encode("utf-8")
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _reruns.clear()
@@ -0,0 +1,208 @@
+# core/write_behind.py
+"""
+Asynchronous write-behind queue in front of a slow storage backend (Google Sheets).
+- save / append_chunks return as soon as the batch is journaled to local disk
+- A background thread flushes batches; a newer full save replaces every
+  pending batch before it, and saves arriving within WRITE_COALESCE_SECONDS
+  go out as one write
+- Failed flushes are retried with exponential backoff up to WRITE_RETRY_MAX
+- Journaled batches survive a restart and are flushed once the backend is back
+- load() shows pending batches on top of the backend, so reads see our writes
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from core.journal import _fsync_dir
+from core.storage_backends import StorageBackend
+from core.tracing import span
+
+_KINDS = ("save", "resync", "append")
+
+
+class WriteBehindStorage(StorageBackend):
+    """Wraps a backend; writes go through a journal and a background writer thread."""
+    supports_pushdown = False
+
+    def __init__(self, backend, journal_dir, coalesce_seconds=1.0, retry_max=300):
+        self.backend = backend
+        self.name = backend.name
+        self.journal_dir = journal_dir
+        self.coalesce_seconds = coalesce_seconds
+        self.retry_max = retry_max
+        self._entries = []      # pending (seq, kind, frame), oldest first
+        self._seq = 0
+        self._applied = 0       # highest seq written to the backend
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.last_error = None
+        self.last_synced = None
+        self.retry_at = None
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self._read_journal()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if self._entries:
+            self._wake.set()  # batches left over from the last run
+
+    def __getattr__(self, name):
+        # Backend-specific extras (syncing, last_sync_error, ...)
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    # ----------------- journal -----------------
+    def _path(self, seq, kind):
+        return os.path.join(self.journal_dir, f"{seq:010d}.{kind}.pkl")
+
+    def _read_journal(self):
+        for filename in sorted(os.listdir(self.journal_dir)):
+            parts = filename.split(".")
+            if len(parts) != 3 or parts[1] not in _KINDS or parts[2] != "pkl":
+                continue
+            seq, kind = int(parts[0]), parts[1]
+            try:
+                frame = pd.read_pickle(os.path.join(self.journal_dir, filename))
+            except Exception:
+                continue  # torn write from a crash: the batch never completed
+            self._entries.append((seq, kind, frame))
+            self._seq = max(self._seq, seq)
+
+    def _discard(self, entries):
+        for seq, kind, _ in entries:
+            try:
+                os.remove(self._path(seq, kind))
+            except FileNotFoundError:
+                pass
+        if entries:
+            _fsync_dir(self.journal_dir)  # a batch that resurfaced after a crash would be sent twice
+
+    def _enqueue(self, kind, frame):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            tmp_path = f"{self._path(seq, kind)}.tmp"
+            with open(tmp_path, "wb") as f:
+                frame.to_pickle(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path(seq, kind))
+            superseded = []
+            if kind != "append":
+                # A full save contains everything queued before it
+                superseded, self._entries = self._entries, []
+                if any(k == "resync" for _, k, _ in superseded):
+                    kind = "resync"
+                    os.replace(self._path(seq, "save"), self._path(seq, kind))
+            _fsync_dir(self.journal_dir)  # the batch is durable before save / append_chunks return
+            self._entries.append((seq, kind, frame))
+            self.revision += 1
+        self._discard(superseded)
+        self._wake.set()
+
+    # ----------------- backend interface -----------------
+    def fingerprint(self):
+        return (self.backend.fingerprint(), self.revision)
+
+    def load(self):
+        while True:
+            with self._lock:
+                applied, entries = self._applied, list(self._entries)
+            full = [i for i, (_, kind, _) in enumerate(entries) if kind != "append"]
+            if full:
+                start = full[-1]
+                base = entries[start][2]
+                tail = entries[start + 1:]
+            else:
+                base = self.backend.load()
+                tail = entries
+            with self._lock:
+                if self._applied == applied:
+                    break  # no flush landed meanwhile, so nothing is counted twice
+        if not tail:
+            return base
+        return pd.concat([base] + [frame for _, _, frame in tail], ignore_index=True)
+
+    def save(self, df, mode="diff"):
+        self._enqueue("resync" if mode == "resync" else "save", df)
+
+    def append_chunks(self, chunks):
+        written = 0
+        for chunk in chunks:
+            if not chunk.empty:
+                self._enqueue("append", chunk)
+                written += len(chunk)
+        return written
+
+    # ----------------- writer thread -----------------
+    def status(self):
+        """Pending batch / row counts and the last error, without waiting on the writer."""
+        with self._lock:
+            entries = list(self._entries)
+        return {
+            "pending": len(entries),
+            "pending_rows": sum(len(frame) for _, kind, frame in entries if kind == "append"),
+            "last_error": self.last_error,
+            "last_synced": self.last_synced,
+            "retry_in": max(0.0, self.retry_at - time.monotonic()) if self.retry_at else None,
+        }
+
+    def flush(self, timeout=None):
+        """Wake the writer now and wait (up to timeout) until nothing is pending."""
+        self.retry_at = None
+        self._wake.set()
+        deadline = time.monotonic() + timeout if timeout else None
+        while self._entries and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.05)
+        return not self._entries
+
+    def _commit(self, upto):
+        """Drop batches up to seq upto once the backend holds them."""
+        with self._lock:
+            done = [e for e in self._entries if e[0] <= upto]
+            self._entries = [e for e in self._entries if e[0] > upto]
+            self._applied = upto
+        self._discard(done)
+
+    def _write(self, entries):
+        """
+        Send a run of pending batches in as few writes as possible: the newest
+        full save, then the appends after it. Progress is committed per write,
+        so a retry never repeats an append that already landed.
+        """
+        full = [i for i, (_, kind, _) in enumerate(entries) if kind != "append"]
+        if full:
+            seq, kind, frame = entries[full[-1]]
+            self.backend.save(frame, mode="resync" if kind == "resync" else "diff")
+            self._commit(seq)
+            entries = entries[full[-1] + 1:]
+        for seq, _, frame in entries:
+            self.backend.append_chunks([frame])
+            self._commit(seq)
+
+    def _run(self):
+        delay = 0
+        while True:
+            woke = self._wake.wait(timeout=delay or None)
+            if woke:
+                time.sleep(self.coalesce_seconds)  # let rapid successive saves pile up
+            self._wake.clear()
+            with self._lock:
+                entries = list(self._entries)
+            if not entries:
+                delay = 0
+                continue
+            try:
+                with span("write_behind.flush", rows=sum(len(frame) for _, _, frame in entries), batches=len(entries)):
+                    self._write(entries)
+            except Exception as e:
+                self.last_error = e
+                delay = min(max(delay * 2, 2), self.retry_max)
+                self.retry_at = time.monotonic() + delay
+                continue
+            self.last_error, self.retry_at, delay = None, None, 0
+            self.last_synced = datetime.now()
@@ -1,126 +1,142 @@
 # data_manager.py
-import os
-import pandas as pd
+"""
+Streamlit adapter over core.ledger: the storage is opened once per process
+on a background thread (prefetch_storage / init_storage), and notices and
+failed writes are shown on the page. Results are cached on the storage
+fingerprint, so a write is picked up by the next read. The logic itself lives
+in core/ and is shared with cli.py.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import streamlit as st
-from config import (
-    USE_GOOGLE_SHEETS, SHEET_NAME, WORKSHEET_NAME,
-    LOCAL_CSV_FILE, CREDENTIALS_FILE, CACHE_TTL_MEDIUM
-)
+from config import DEFAULT_CURRENCY, IMPORT_CHUNK_ROWS
+from core import ledger
+from core.tracing import span
+from core.ledger import EXPORT_FORMATS  # re-exported for import_export
+
+
+def _notify(level, message):
+    getattr(st, level)(message)
+
+
+ledger.set_notifier(_notify)
+
+
+_opener = ThreadPoolExecutor(max_workers=1, thread_name_prefix="open-storage")
+
 
 @st.cache_resource
+def _storage_future():
+    """Open the storage (Google authentication, a first Sheets pull) on a background thread, once per process."""
+    notices = []  # the worker has no page to write to: replayed by init_storage
+    return _opener.submit(ledger.open_storage, notify=lambda level, message: notices.append((level, message))), notices
+
+
+def prefetch_storage():
+    """Start opening the storage now, so it overlaps with rendering the page skeleton."""
+    _storage_future()
+
+
 def init_storage():
-    """Return a gspread worksheet object or None if not available."""
-    if not USE_GOOGLE_SHEETS:
-        return None
+    """Return the storage backend: Google Sheets if available, else the local store."""
+    future, notices = _storage_future()
+    if not future.done():
+        with span("storage.open"):
+            wait([future])
+    if future.exception() is not None:
+        _storage_future.clear()  # retry on the next rerun instead of caching the failure
+        raise future.exception()
+    for level, message in notices:
+        _notify(level, message)
+    return future.result()
+
+
+def load_data(storage=None):
+    """
+    Load the typed ledger (core.ledger.load_data), cached on the storage fingerprint.
+    The returned frame is shared between reruns: treat it as read-only.
+    """
+    return ledger.load_data(storage or init_storage())
+
+
+def save_data(df, storage=None, mode="diff"):
+    """Save DataFrame through the storage backend (see core.ledger.save_data)."""
+    storage = storage or init_storage()
     try:
-        import gspread
-        from oauth2client.service_account import ServiceAccountCredentials
-
-        scope = ["https://spreadsheets.google.com/feeds",
-                 "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, scope)
-        client = gspread.authorize(creds)
-        try:
-            sheet = client.open(SHEET_NAME).worksheet(WORKSHEET_NAME)
-        except gspread.exceptions.WorksheetNotFound:
-            sh = client.open(SHEET_NAME)
-            sheet = sh.add_worksheet(title=WORKSHEET_NAME, rows="1000", cols="12")
-            sheet.append_row([
-                "Date", "ExpenseType", "Category", "Subcategory", "Item",
-                "Brand", "Shop", "PricePaid", "Currency", "Quantity",
-                "QuantityUnit", "PricePerUnit"
-            ])
-        return sheet
+        ledger.save_data(df, storage, mode=mode)
     except Exception as e:
-        st.warning(f"Google Sheets not available ({e}). Using local CSV fallback.")
-        return None
-
-
-EXPECTED_COLUMNS = [
-    "Date", "ExpenseType", "Category", "Subcategory", "Item",
-    "Brand", "Shop", "PricePaid", "Currency", "Quantity",
-    "QuantityUnit", "PricePerUnit"
-]
-
-
-@st.cache_data(ttl=CACHE_TTL_MEDIUM, show_spinner=False)
-def load_data(_sheet=None, version=0):
-    """Load data from Google Sheets or local CSV (reactive via version)."""
-    if USE_GOOGLE_SHEETS and _sheet is not None:
-        try:
-            records = _sheet.get_all_records()
-            df = pd.DataFrame(records)
-        except Exception as e:
-            st.warning(f"⚠️ Could not fetch data from Google Sheets: {e}")
-            df = pd.DataFrame()
-    else:
-        if os.path.exists(LOCAL_CSV_FILE):
-            df = pd.read_csv(LOCAL_CSV_FILE)
-        else:
-            df = pd.DataFrame(columns=EXPECTED_COLUMNS)
-    return df
-
-
-def save_data(df, sheet=None):
-    """Save DataFrame to Google Sheet or local CSV. This is not cached."""
-    if sheet:
-        # gspread: clear and push
-        try:
-            sheet.clear()
-            sheet.append_row(df.columns.tolist())
-            sheet.append_rows(df.astype(str).values.tolist())
-        except Exception as e:
-            st.error(f"Failed to save to Google Sheets: {e}")
-    else:
-        df.to_csv(LOCAL_CSV_FILE, index=False)
-    
-    bump_data_version()  # ensures cache invalidation
-
-def import_data(uploaded_file):
-    """Return DataFrame from uploaded CSV/XLSX file."""
+        st.error(f"Failed to save to {storage.name} storage: {e}")
+
+
+def reporting_data(storage=None, currency=DEFAULT_CURRENCY):
+    """The loaded ledger plus an Amount column in the reporting currency."""
+    return ledger.reporting_data(storage or init_storage(), currency)
+
+
+def reporting_rows(storage=None, filters=None, currency=DEFAULT_CURRENCY):
+    """The rows matching filters, plus an Amount column in the reporting currency."""
+    return ledger.reporting_rows(storage or init_storage(), filters, currency)
+
+
+def get_cube(storage=None, currency=DEFAULT_CURRENCY):
+    """Return the aggregate cube of reporting-currency amounts."""
+    return ledger.get_cube(storage or init_storage(), currency)
+
+
+def query_data(storage=None, filters=None):
+    """Return only the rows matching filters."""
+    return ledger.query_data(storage or init_storage(), filters)
+
+
+def distinct_values(storage=None, column="Category", filters=None):
+    """Sorted unique values of a column among the rows matching filters."""
+    return ledger.distinct_values(storage or init_storage(), column, filters)
+
+
+def value_range(storage=None, column="PricePaid"):
+    """(min, max) of a column, or (None, None) when there is no data."""
+    return ledger.value_range(storage or init_storage(), column)
+
+
+def incomplete_rows(storage=None):
+    """Rows missing Date or ExpenseType."""
+    return ledger.incomplete_rows(storage or init_storage())
+
+
+def apply_edits(updates, inserts, deletes, storage=None):
+    """Send only edited, new and deleted rows to storage (see core.ledger.apply_edits)."""
+    storage = storage or init_storage()
     try:
-        if uploaded_file.name.endswith(".csv"):
-            return pd.read_csv(uploaded_file)
-        else:
-            return pd.read_excel(uploaded_file)
+        ledger.apply_edits(updates, inserts, deletes, storage)
     except Exception as e:
-        st.error(f"Failed to import file: {e}")
-        return pd.DataFrame(columns=EXPECTED_COLUMNS)
+        st.error(f"Failed to save to {storage.name} storage: {e}")
 
 
-def export_data_bytes(df, file_type="csv"):
-    """Return bytes for a download_button (csv or xlsx)."""
-    if file_type == "csv":
-        return df.to_csv(index=False).encode("utf-8"), "text/csv"
-    elif file_type == "xlsx":
-        import io
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False)
-        return output.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    else:
-        return None, None
+def append_data(chunks, storage=None):
+    """Stream already-normalized chunks into storage. Returns the rows written."""
+    return ledger.append_data(chunks, storage or init_storage())
 
 
-def clean_data(df):
-    """
-    Standardizes and cleans expense data.
-    - Strips whitespace
-    - Normalizes 'Date' to date-only
-    - Ensures consistent column types
-    """
-    import pandas as pd
-
-    if "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
+def merge_data(chunks, storage=None):
+    """Deduplicating merge; returns a report with inserted / skipped / flagged counts."""
+    return ledger.merge_data(chunks, storage or init_storage())
 
-    # Trim whitespace from string columns
-    for col in df.select_dtypes(include=["object"]).columns:
-        df[col] = df[col].astype(str).str.strip()
 
-    return df
+def import_data(uploaded_file, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Stream an uploaded CSV/XLSX file as normalized chunks.
+    Yields (chunk, progress) with progress in [0, 1]; memory stays at about one chunk.
+    """
+    try:
+        yield from ledger.import_data(uploaded_file, chunk_rows)
+    except Exception as e:
+        st.error(f"Failed to import file: {e}")
 
 
-def bump_data_version():
-    """Increment version counter so cached data refreshes."""
-    st.session_state["data_version"] = st.session_state.get("data_version", 0) + 1
+def cached_export_bytes(df, file_type, storage=None):
+    """
+    Export bytes generated on demand and cached per storage fingerprint and format.
+    df may be None (a page reading one period at a time): the whole ledger is loaded here.
+    """
+    storage = storage or init_storage()
+    return ledger.cached_export_bytes(df if df is not None else ledger.load_data(storage), file_type, storage)
@@ -1,82 +1,119 @@
 # import_export.py
 import streamlit as st
 import pandas as pd
-from io import BytesIO
+import numpy as np
+from config import IMPORT_PREVIEW_ROWS
+from data_manager import import_data, merge_data, cached_export_bytes, EXPORT_FORMATS
+from core.schema import to_editable
 
 # ============================================================
-# 📥 Import Expense Data (CSV / XLSX) with Preview + Edit + Merge
+# 📥 Import Expense Data (CSV / XLSX) with Sampled Preview + Streamed Merge
 # ============================================================
-def import_button(existing_columns=None):
+def scan_import(uploaded_file, preview_rows=IMPORT_PREVIEW_ROWS):
+    """
+    One streaming pass over the upload: row counts, incomplete rows and a
+    uniform random sample for the preview (smallest random keys win, so the
+    sample never holds more than preview_rows + one chunk).
+    """
+    progress = st.sidebar.progress(0.0, text="Scanning file…")
+    rng = np.random.default_rng()
+    sample, keys = pd.DataFrame(), np.array([])
+    summary = {"rows": 0, "incomplete": 0}
+
+    for chunk, fraction in import_data(uploaded_file):
+        summary["rows"] += len(chunk)
+        summary["incomplete"] += int((chunk["Date"].isna() | chunk["PricePaid"].isna()).sum())
+
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        sample = pd.concat([sample, chunk], ignore_index=True)
+        if len(sample) > preview_rows:
+            keep = np.argsort(keys)[:preview_rows]
+            sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+        progress.progress(fraction, text=f"Scanning file… {summary['rows']:,} rows")
+
+    progress.empty()
+    summary["sample"] = sample.sort_values("Date", na_position="last") if not sample.empty else sample
+    return summary
+
+
+def import_button():
     st.sidebar.subheader("📥 Import Data")
     uploaded_file = st.sidebar.file_uploader("Upload a CSV or Excel file", type=["csv", "xlsx"])
 
     if not uploaded_file:
         return None
 
-    try:
-        if uploaded_file.name.endswith(".csv"):
-            df_import = pd.read_csv(uploaded_file)
-        else:
-            df_import = pd.read_excel(uploaded_file)
-    except Exception as e:
-        st.sidebar.error(f"⚠️ Failed to read file: {e}")
-        return None
+    # Scan once per uploaded file, not on every rerun
+    scan_key = f"import_scan_{uploaded_file.file_id}"
+    if scan_key not in st.session_state:
+        st.session_state[scan_key] = scan_import(uploaded_file)
+    summary = st.session_state[scan_key]
 
-    if df_import.empty:
+    if summary["rows"] == 0:
         st.sidebar.warning("⚠️ Uploaded file is empty.")
         return None
 
-    expected_cols = existing_columns or [
-        "Date", "ExpenseType", "Category", "Subcategory", "Item", "Brand",
-        "Shop", "PricePaid", "Currency", "Quantity", "QuantityUnit", "PricePerUnit"
-    ]
-
-    for col in expected_cols:
-        if col not in df_import.columns:
-            df_import[col] = None
-
-    df_import = df_import[expected_cols]
-    df_import["Date"] = pd.to_datetime(df_import["Date"], errors="coerce").dt.date
-
-    st.markdown("### 👀 Preview Imported Data (Editable)")
-    editable_df = st.data_editor(df_import, num_rows="dynamic", width="stretch", hide_index=True)
+    st.markdown("### 👀 Preview Imported Data (Sample)")
+    st.caption(
+        f"{summary['rows']:,} rows found · showing {len(summary['sample'])} sampled rows"
+        + (f" · ⚠️ {summary['incomplete']:,} rows missing Date or PricePaid" if summary["incomplete"] else "")
+    )
+    st.dataframe(to_editable(summary["sample"]), width="stretch", hide_index=True)
 
     if st.button("✅ Merge into Main Dataset", width="stretch"):
-        st.session_state["pending_import_df"] = editable_df
+        st.session_state["pending_import_file"] = uploaded_file
         st.session_state["merge_ready"] = True
         st.toast("Data ready to merge.")
         st.sidebar.write("🧩 Import flagged for merge.")
         # no rerun here — merge happens in main script
-        return editable_df
+        return uploaded_file
 
     return None
 
 
+def merge_import(uploaded_file, storage):
+    """
+    Stream the upload into storage chunk by chunk, with progress, skipping rows
+    already stored. Returns the merge report (inserted / skipped / flagged).
+    """
+    progress = st.progress(0.0, text="Merging…")
+
+    def _chunks():
+        for chunk, fraction in import_data(uploaded_file):
+            yield chunk
+            progress.progress(fraction, text=f"Merging… {fraction:.0%}")
+
+    report = merge_data(_chunks(), storage)
+    progress.empty()
+    return report
+
+
 # ============================================================
-# 📤 Export Buttons (CSV / Excel)
+# 📤 Export Buttons (CSV / CSV.gz / Excel / Parquet)
 # ============================================================
-def export_buttons(df):
-    """Provide buttons to export filtered or full dataset."""
+EXPORT_LABELS = {
+    "csv": "CSV",
+    "csv.gz": "CSV (gzip)",
+    "xlsx": "Excel",
+    "parquet": "Parquet",
+}
+
+
+def export_buttons(df, storage=None):
+    """
+    Export the full dataset. Nothing is serialized on rerun: the file is built
+    when the download button is clicked and cached per data version and format.
+    """
     st.sidebar.subheader("📤 Export Data")
 
-    # --- CSV Export ---
-    csv_data = df.to_csv(index=False).encode("utf-8")
+    file_type = st.sidebar.selectbox(
+        "Format", list(EXPORT_LABELS), format_func=EXPORT_LABELS.get, key="export_format"
+    )
+    extension, mime = EXPORT_FORMATS[file_type]
     st.sidebar.download_button(
-        label="💾 Download CSV",
-        data=csv_data,
-        file_name="expenses_export.csv",
-        mime="text/csv",
+        label=f"💾 Download {EXPORT_LABELS[file_type]}",
+        data=lambda: cached_export_bytes(df, file_type, storage),
+        file_name=f"expenses_export.{extension}",
+        mime=mime,
+        on_click="ignore",
     )
-
-    # --- Excel Export ---
-    try:
-        output = BytesIO()
-        df.to_excel(output, index=False, sheet_name="Expenses")
-        st.sidebar.download_button(
-            label="📘 Download Excel",
-            data=output.getvalue(),
-            file_name="expenses_export.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-    except Exception as e:
-        st.sidebar.warning(f"Excel export unavailable: {e}")
@@ -1,45 +1,56 @@
 # pages/Analytics_and_Trends.py
 import streamlit as st
 import pandas as pd
-from data_manager import init_storage, load_data
-from analytics import monthly_trends, category_insights, what_if_simulation
-from charts import monthly_spending, stacked_area_chart, multi_year_comparison, calendar_heatmap
-from ui_components import theme_css
+from data_manager import prefetch_storage, init_storage, load_data, reporting_data, get_cube
+from analytics import monthly_trends, group_forecast_table, category_insights, what_if_simulation
+from charts import monthly_spending, daily_spending, stacked_area_chart, multi_year_comparison, calendar_heatmap
+from ui_components import theme_css, reporting_currency_select, missing_rate_warning, perf_panel
+from core.tracing import start_rerun
 
 st.set_page_config(page_title="📊 Analytics Dashboard", layout="wide")
+start_rerun("Analytics")  # spans below are grouped per rerun (tracing.py)
+prefetch_storage()  # storage opens (Google auth) while the skeleton below renders
 
 # Theme
 dark_mode = st.sidebar.checkbox("🌗 Dark mode", value=False)
 theme_css(dark_mode)
+currency = reporting_currency_select()
 
 st.title("📊 Analytics & Trends")
 
 # Load data
-sheet = init_storage()
-version = st.session_state.get("data_version", 0)
-df = load_data(_sheet=sheet, version=version)
+storage = init_storage()
+df = load_data(storage=storage)
 
 if df.empty:
     st.info("No data available for analytics.")
     st.stop()
 
+# Every view below rolls up this one cube (amounts in the reporting currency)
+cube = get_cube(storage, currency)
+missing_rate_warning(reporting_data(storage, currency), currency)  # the frame the cube was built from (cached)
+
 st.markdown("### 🔥 Monthly & Yearly Visualizations")
 
 col1, col2 = st.columns(2)
 with col1:
-    monthly_spending(df)
-    calendar_heatmap(df)
+    monthly_spending(cube, currency)
+    calendar_heatmap(cube)
 with col2:
-    stacked_area_chart(df)
-    multi_year_comparison(df)
+    stacked_area_chart(cube)
+    multi_year_comparison(cube)
+daily_spending(cube, currency)
 
 st.markdown("---")
 st.header("🧠 Analytical Insights")
-monthly_trends(df)
-category_insights(df)
-what_if_simulation(df)
+monthly_trends(cube, currency)
+group_forecast_table(cube, currency)
+category_insights(cube, currency)
+what_if_simulation(cube, currency)
 
 # Navigation
 st.sidebar.markdown("---")
 if st.sidebar.button("⬅️ Back to Expense Dashboard"):
     st.switch_page("Main_Dashboard_App.py")
+
+perf_panel()
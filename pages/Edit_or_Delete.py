@@ -1,10 +1,13 @@
 # pages/Edit_or_Delete.py
 import streamlit as st
 import pandas as pd
-from data_manager import init_storage, load_data, save_data
-from ui_components import inline_edit_table, theme_css
+from data_manager import prefetch_storage, init_storage, load_data
+from ui_components import inline_edit_table, theme_css, perf_panel
+from core.tracing import start_rerun
 
 st.set_page_config(page_title="✏️ Edit or Delete Entries", layout="wide")
+start_rerun("Edit")  # spans below are grouped per rerun (tracing.py)
+prefetch_storage()  # storage opens (Google auth) while the skeleton below renders
 
 # Theme
 dark_mode = st.sidebar.checkbox("🌗 Dark mode", value=False)
@@ -12,18 +15,21 @@ theme_css(dark_mode)
 
 st.title("✏️ Edit or Delete Entries")
 
-# Load data
-sheet = init_storage()
-version = st.session_state.get("data_version", 0)
-df = load_data(_sheet=sheet, version=version)
+# Load data (a pushdown-capable store is queried per filter instead)
+storage = init_storage()
 
-if df.empty:
-    st.info("No data available to edit.")
+if storage.supports_pushdown:
+    inline_edit_table(None, storage)
 else:
-    inline_edit_table(df, save_data, sheet)
+    df = load_data(storage=storage)
+    if df.empty:
+        st.info("No data available to edit.")
+    else:
+        inline_edit_table(df, storage)
 
 # Back button
 st.sidebar.markdown("---")
 if st.sidebar.button("⬅️ Back to Expense Dashboard"):
     st.switch_page("Main_Dashboard_App.py")
 
+perf_panel()
@@ -0,0 +1,144 @@
+# synthetic_data.py
+"""
+Synthetic expense ledgers for benchmarks (benchmarks.py) and load testing.
+Rows follow schema.EXPECTED_COLUMNS and use the categories, subcategories,
+shops and units from data/dropdown_options.json, with a realistic shape:
+- a few categories and shops take most of the transactions
+- prices are log-normal around a per-category typical price
+- more spending on weekends; mostly SEK, some INR / EUR
+Generation is vectorized (10M rows in seconds) and deterministic per seed.
+
+Usage: python synthetic_data.py 1M -o ledger_1M.arrow   (.arrow / .parquet / .csv)
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.schema import EXPECTED_COLUMNS, _ROW_ID_MASK
+
+DROPDOWN_OPTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "dropdown_options.json")
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+ITEMS_PER_CATEGORY = 40
+BRANDS = [f"Brand {i}" for i in range(1, 61)]
+CURRENCY_SHARES = {"SEK": 0.85, "INR": 0.12, "EUR": 0.03}
+SERVICE_CATEGORIES = {"Dine-Out", "Photos"}
+
+
+def parse_size(text):
+    """'10k' / '1M' / '2500' -> number of rows."""
+    if text in SIZES:
+        return SIZES[text]
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower())
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def load_dropdown_options(path=DROPDOWN_OPTIONS_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _zipf_weights(n, rng, s=1.1, shuffle=True):
+    """Skewed popularity over n choices, in a random order unless shuffle is False."""
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    if shuffle:
+        rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _categorical(codes, values):
+    return pd.Categorical.from_codes(codes, categories=pd.Index(values, dtype=object))
+
+
+def generate_ledger(rows, seed=0, start="2021-01-01", end="2025-12-31", options=None):
+    """A typed ledger of rows synthetic transactions (columns = EXPECTED_COLUMNS)."""
+    rng = np.random.default_rng(seed)
+    options = options or load_dropdown_options()
+    categories = options["categories"]
+    shops = options["shops"]
+    units = options["units"]
+
+    # Dates: uniform over the range, weekends weighted up
+    days = pd.date_range(start, end, freq="D")
+    day_weights = np.where(days.dayofweek >= 5, 1.4, 1.0)
+    dates = days[rng.choice(len(days), size=rows, p=day_weights / day_weights.sum())]
+
+    category = rng.choice(len(categories), size=rows, p=_zipf_weights(len(categories), rng))
+    shop = rng.choice(len(shops), size=rows, p=_zipf_weights(len(shops), rng))
+
+    # Subcategory: one of the category's subcategories (if it has any), sometimes blank
+    subcategories = sorted({s for c in categories for s in options["subcategories"].get(c, [])})
+    sub_lookup = [[subcategories.index(s) for s in options["subcategories"].get(c, [])] for c in categories]
+    pick = rng.random(rows)
+    subcategory = np.full(rows, -1)
+    for k, choices in enumerate(sub_lookup):
+        if choices:
+            rows_k = np.flatnonzero((category == k) & (pick < 0.8))
+            subcategory[rows_k] = np.asarray(choices)[rng.integers(0, len(choices), len(rows_k))]
+
+    # Items: a fixed pool per category
+    item_names = [f"{c} item {i}" for c in categories for i in range(1, ITEMS_PER_CATEGORY + 1)]
+    item = category * ITEMS_PER_CATEGORY + rng.integers(0, ITEMS_PER_CATEGORY, rows)
+    brand = np.where(rng.random(rows) < 0.3, -1, rng.choice(len(BRANDS), size=rows, p=_zipf_weights(len(BRANDS), rng)))
+
+    # Quantities: mostly counts (the first unit), some weighed / measured
+    unit = rng.choice(len(units), size=rows, p=_zipf_weights(len(units), rng, s=2.5, shuffle=False))
+    counted = np.asarray(units)[unit] == "Count"
+    quantity = np.where(counted, rng.integers(1, 7, rows), rng.uniform(0.2, 3.0, rows).round(2))
+
+    # Prices: log-normal around a typical price per category
+    typical = rng.uniform(15, 400, len(categories))
+    price = (typical[category] * rng.lognormal(0.0, 0.6, rows) * np.where(counted, quantity ** 0.5, 1.0)).round(2)
+    price_per_unit = (price / quantity).round(2)
+
+    currency_names = list(CURRENCY_SHARES)
+    currency = rng.choice(len(currency_names), size=rows, p=list(CURRENCY_SHARES.values()))
+    expense_type = np.isin(np.asarray(categories)[category], list(SERVICE_CATEGORIES)).astype(int)
+
+    ledger = pd.DataFrame({
+        "Date": dates.astype("datetime64[ns]"),
+        "ExpenseType": _categorical(expense_type, ["Goods", "Service"]),
+        "Category": _categorical(category, categories),
+        "Subcategory": _categorical(subcategory, subcategories),
+        "Item": pd.array(np.asarray(item_names, dtype=object)[item], dtype="str"),
+        "Brand": _categorical(brand, BRANDS),
+        "Shop": _categorical(shop, shops),
+        "PricePaid": price,
+        "Currency": _categorical(currency, currency_names),
+        "Quantity": quantity.astype(float),
+        "QuantityUnit": _categorical(unit, units),
+        "PricePerUnit": price_per_unit,
+        "RowID": pd.array(rng.integers(1, _ROW_ID_MASK, size=rows, dtype=np.int64), dtype="Int64"),
+    })
+    return ledger.sort_values("Date", kind="stable", ignore_index=True)[EXPECTED_COLUMNS]
+
+
+def write_ledger(df, path):
+    """Write a ledger as .arrow (Feather), .parquet or .csv, by extension."""
+    if path.endswith(".arrow") or path.endswith(".feather"):
+        df.to_feather(path)
+    elif path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        out = df.assign(Date=df["Date"].dt.strftime("%Y-%m-%d"))
+        out.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic expense ledger.")
+    parser.add_argument("size", help="rows: 10k, 100k, 1M, 10M or a number")
+    parser.add_argument("-o", "--out", help="output file (.arrow, .parquet or .csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = parse_size(args.size)
+    out = args.out or f"ledger_{args.size}.arrow"
+    write_ledger(generate_ledger(rows, seed=args.seed), out)
+    print(f"Wrote {rows:,} rows to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cache import CACHE  # noqa: E402
+from synthetic_data import generate_ledger  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """Cached loads are keyed on store fingerprints, which tmp_path stores can repeat."""
+    CACHE.clear()
+    yield
+    CACHE.clear()
+
+
+@pytest.fixture
+def ledger():
+    """Schema-typed synthetic ledger of n rows."""
+    return lambda n, seed=0: generate_ledger(n, seed=seed)
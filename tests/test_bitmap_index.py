@@ -0,0 +1,62 @@
+# tests/test_bitmap_index.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.bitmap_index import BITMAP_MAX_VALUES, BitmapIndex
+from core.storage_backends import apply_filters
+
+
+@pytest.fixture(scope="module")
+def rows():
+    from synthetic_data import generate_ledger
+
+    return generate_ledger(2000, seed=3)
+
+
+def _filters(rows):
+    shops = rows["Shop"].dropna().unique()[:3].tolist()
+    items = rows["Item"].dropna().unique()[:5].tolist()
+    return [
+        {},
+        {"Shop": shops},
+        {"Item": items},  # wide column: code lookup, not bitmaps
+        {"Year": [2022, 2024], "Month": [1, 2, 12]},
+        {"Date": (pd.Timestamp("2023-03-01"), pd.Timestamp("2023-06-30")), "PricePaid": (10.0, 200.0)},
+        {"Shop": shops, "ExpenseType": ["Goods"], "Category": []},  # an empty selection is no filter
+        {"Shop": ["no such shop"]},
+    ]
+
+
+def test_masks_match_apply_filters(rows):
+    index = BitmapIndex(rows)
+    assert len(index.columns["Shop"].values) <= BITMAP_MAX_VALUES < len(index.columns["Item"].values)
+    for filters in _filters(rows):
+        expected = apply_filters(rows, filters)
+        pd.testing.assert_frame_equal(index.take(rows, filters), expected)
+
+
+def test_options_are_the_values_left_by_the_filters(rows):
+    index = BitmapIndex(rows)
+    for filters in _filters(rows):
+        expected = sorted(apply_filters(rows, filters)["Category"].dropna().unique())
+        assert index.options("Category", filters) == expected
+
+
+def test_amount_range_only_where_the_frame_has_it(rows):
+    plain = BitmapIndex(rows)
+    assert "Amount" not in plain.ranges
+    assert len(plain.take(rows, {"Amount": (0.0, 1.0)})) == len(rows)  # ignored, as apply_filters does
+
+    converted = rows.assign(Amount=rows["PricePaid"] * 10)
+    index = BitmapIndex(converted)
+    expected = converted[(converted["Amount"] >= 100) & (converted["Amount"] <= 500)]
+    pd.testing.assert_frame_equal(index.take(converted, {"Amount": (100, 500)}), expected)
+
+
+def test_missing_values_never_match(rows):
+    holes = rows.copy()
+    holes.loc[holes.index[:10], "Shop"] = np.nan
+    index = BitmapIndex(holes)
+    taken = index.take(holes, {"Shop": holes["Shop"].dropna().unique().tolist()})
+    assert len(taken) == len(holes) - 10
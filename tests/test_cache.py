@@ -0,0 +1,70 @@
+# tests/test_cache.py
+import pandas as pd
+
+from core.cache import VersionedCache, cached_on_frame, estimate_size, frame_fingerprint, tag_fingerprint
+
+
+def test_new_fingerprint_supersedes_older_entries():
+    cache = VersionedCache(max_bytes=1 << 20)
+    cache.put("ns", "v1", "a", params=("x",))
+    cache.put("ns", "v1", "b", params=("y",))
+    cache.put("other", "v1", "c")
+    cache.put("ns", "v2", "d", params=("x",))
+
+    assert cache.peek("ns", "v1", ("x",)) is None and cache.peek("ns", "v1", ("y",)) is None
+    assert cache.peek("ns", "v2", ("x",)) == "d"
+    assert cache.peek("other", "v1") == "c"  # other namespaces keep their version
+
+
+def test_get_or_compute_counts_and_reuses():
+    cache, calls = VersionedCache(max_bytes=1 << 20), []
+    compute = lambda: calls.append(1) or len(calls)  # noqa: E731
+    assert cache.get_or_compute("ns", "v1", compute) == 1
+    assert cache.get_or_compute("ns", "v1", compute) == 1
+    assert cache.get_or_compute("ns", "v2", compute) == 2
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_rekey_stores_under_the_computed_fingerprint():
+    cache = VersionedCache(max_bytes=1 << 20)
+    cache.get_or_compute("load", "stale", lambda: "rows", rekey=lambda value: "fresh")
+    assert cache.peek("load", "stale") is None
+    assert cache.peek("load", "fresh") == "rows"
+
+
+def test_expired_entries_are_recomputed():
+    cache = VersionedCache(max_bytes=1 << 20)
+    cache.put("ns", "v1", "old", ttl=-1)
+    assert cache.peek("ns", "v1") is None
+    assert cache.get_or_compute("ns", "v1", lambda: "new") == "new"
+
+
+def test_byte_budget_evicts_least_recently_used():
+    value = b"x" * 1000
+    cache = VersionedCache(max_bytes=3 * estimate_size(value))
+    for name in ("a", "b", "c"):
+        cache.put(name, "v1", value)
+    cache.get_or_compute("a", "v1", lambda: None)  # touch a
+    cache.put("d", "v1", value)
+
+    assert cache.peek("b", "v1") is None
+    assert cache.peek("a", "v1") is not None and cache.peek("d", "v1") is not None
+
+
+def test_cached_on_frame_keys_on_the_tag_and_variant():
+    calls = []
+
+    @cached_on_frame("test_frames")
+    def total(frame, column):
+        calls.append(column)
+        return frame[column].sum()
+
+    df = pd.DataFrame({"a": [1, 2], "b": [3, 4]})
+    tag_fingerprint(df, ("store", 1), ("SEK",))
+    assert frame_fingerprint(df) == (("store", 1), ("SEK",))
+    assert total(df, "a") == 3 and total(df, "a") == 3 and total(df, "b") == 7
+    assert calls == ["a", "b"]
+
+    copy = df.copy()  # untagged: keyed on its content, so the same data shares the entry
+    assert total(copy, "a") == 3 and total(copy.copy(), "a") == 3
+    assert calls == ["a", "b", "a"]
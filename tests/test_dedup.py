@@ -0,0 +1,95 @@
+# tests/test_dedup.py
+import pandas as pd
+import pytest
+
+from core.dedup import FingerprintIndex, deduplicate
+from core.ledger import load_data, merge_data
+from core.schema import apply_schema
+from core.storage_backends import PartitionedBackend
+
+
+def _counts(report):
+    return {k: report[k] for k in ("inserted", "skipped", "flagged")}
+
+
+def _import(rows, chunk_rows):
+    return [rows.iloc[i:i + chunk_rows] for i in range(0, len(rows), chunk_rows)]
+
+
+@pytest.fixture
+def purchases():
+    """Two identical milk purchases (a genuine repeat), bread, and eggs at a near-identical price."""
+    return apply_schema(pd.DataFrame({
+        "Date": ["2024-01-01"] * 4,
+        "Shop": ["ICA"] * 4,
+        "Item": ["milk", "milk", "bread", "eggs"],
+        "PricePaid": [10.0, 10.0, 20.2, 19.8],
+    }))
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 4])
+def test_chunk_boundaries_do_not_matter(purchases, chunk_rows):
+    index, report = FingerprintIndex.build(purchases.iloc[:1]), {}
+    for chunk in deduplicate(_import(purchases, chunk_rows), index, report):
+        index.add(chunk)
+
+    assert _counts(report) == {"inserted": 3, "skipped": 1, "flagged": 1}
+
+
+def test_normalized_text_matches(purchases):
+    index, report = FingerprintIndex.build(purchases), {}
+    shouted = purchases.assign(Item=purchases["Item"].astype(str).str.upper() + "  ")
+    assert list(deduplicate([shouted], index, report)) == []
+    assert report["skipped"] == 4
+
+
+def test_index_round_trip(tmp_path, purchases):
+    index = FingerprintIndex.build(purchases, source=("store", 3))
+    index.save(str(tmp_path / "index.npz"))
+    loaded = FingerprintIndex.load(str(tmp_path / "index.npz"))
+
+    assert loaded.matches(("store", 3)) and not loaded.matches(("store", 4))
+    pd.testing.assert_series_equal(loaded.exact.sort_index(), index.exact.sort_index(), check_names=False)
+    assert FingerprintIndex.load(str(tmp_path / "missing.npz")) is None
+
+
+def test_reimport_is_idempotent(tmp_path, ledger):
+    storage = PartitionedBackend(str(tmp_path / "store"))
+    storage.save(ledger(50))
+    statement = ledger(300, seed=1)
+    index_file = str(tmp_path / "index.npz")
+
+    first = merge_data(_import(statement, 100), storage, index_file=index_file)
+    stored = len(load_data(storage))
+    second = merge_data(_import(statement, 70), storage, index_file=index_file)
+
+    assert first["inserted"] == 300
+    assert _counts(second) == {"inserted": 0, "skipped": 300, "flagged": 0}
+    assert len(load_data(storage)) == stored == 350
+
+
+def test_overlapping_reimport_adds_only_new_rows(tmp_path, ledger):
+    storage = PartitionedBackend(str(tmp_path / "store"))
+    storage.save(ledger(50))
+    statement = ledger(200, seed=1)
+    index_file = str(tmp_path / "index.npz")
+
+    merge_data(_import(statement.iloc[:120], 50), storage, index_file=index_file)
+    report = merge_data(_import(statement, 50), storage, index_file=index_file)
+
+    assert (report["inserted"], report["skipped"]) == (80, 120)
+    assert len(load_data(storage)) == 250
+
+
+def test_index_is_rebuilt_when_the_store_changed_elsewhere(tmp_path, ledger):
+    storage = PartitionedBackend(str(tmp_path / "store"))
+    storage.save(ledger(50))
+    statement = ledger(100, seed=1)
+    index_file = str(tmp_path / "index.npz")
+    merge_data(_import(statement, 100), storage, index_file=index_file)
+
+    rows = load_data(storage)
+    storage.save(rows[~rows["RowID"].isin(statement["RowID"].iloc[:10])])  # not through merge_data
+    report = merge_data(_import(statement, 100), storage, index_file=index_file)
+
+    assert (report["inserted"], report["skipped"]) == (10, 90)
@@ -0,0 +1,139 @@
+# tests/test_journal.py
+import os
+
+import pandas as pd
+import pytest
+
+from core.journal import JournaledStorage
+from core.schema import apply_schema
+from core.storage_backends import PartitionedBackend, apply_row_changes
+
+
+def _assert_same_rows(left, right):
+    """Same rows, whatever order and column dtypes (schema typing is load_data's job) the store keeps."""
+    left, right = (apply_schema(df).sort_values("RowID").reset_index(drop=True) for df in (left, right))
+    pd.testing.assert_frame_equal(left, right, check_dtype=False, check_categorical=False)
+
+
+def _store(tmp_path, rows=None):
+    if rows is not None:
+        PartitionedBackend(str(tmp_path / "store")).save(rows)
+    return JournaledStorage(PartitionedBackend(str(tmp_path / "store")), str(tmp_path / "journal"), compact_bytes=float("inf"))
+
+
+def _edit(rows):
+    """Two price edits (one moved to a month the store lacks) and two deletes."""
+    updates = rows.iloc[[3, 40]].copy()
+    updates["PricePaid"] = 1.5
+    updates.loc[updates.index[0], "Date"] = pd.Timestamp("2031-05-05")
+    return updates, rows["RowID"].iloc[[7, 90]].tolist()
+
+
+def test_replay_after_reopen(tmp_path, ledger):
+    base, added = ledger(200), ledger(20, seed=1)
+    updates, deletes = _edit(base)
+    store = _store(tmp_path, base)
+    store.append_chunks([added])
+    store.apply_changes(updates, updates.iloc[:0], deletes)
+
+    expected = apply_row_changes(pd.concat([base, added], ignore_index=True), updates, updates.iloc[:0], deletes)
+    reopened = _store(tmp_path)
+    _assert_same_rows(reopened.load(), expected)
+    assert len(PartitionedBackend(str(tmp_path / "store")).load()) == len(base)  # the snapshot was not touched
+
+
+def test_torn_tail_is_truncated(tmp_path, ledger):
+    base = ledger(50)
+    store = _store(tmp_path, base)
+    store.append_chunks([ledger(5, seed=1)])
+    intact = os.path.getsize(tmp_path / "journal")
+    store.append_chunks([ledger(5, seed=2)])
+    with open(tmp_path / "journal", "r+b") as f:
+        f.truncate(os.path.getsize(tmp_path / "journal") - 3)  # crash mid-write
+
+    reopened = _store(tmp_path)
+    assert os.path.getsize(tmp_path / "journal") == intact
+    assert len(reopened.load()) == 55
+
+
+def test_corrupt_record_is_truncated(tmp_path, ledger):
+    store = _store(tmp_path, ledger(50))
+    store.append_chunks([ledger(5, seed=1)])
+    with open(tmp_path / "journal", "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))  # payload no longer matches its CRC
+
+    reopened = _store(tmp_path)
+    assert os.path.getsize(tmp_path / "journal") == 0
+    assert len(reopened.load()) == 50
+
+
+def test_compaction_round_trip(tmp_path, ledger):
+    base, added = ledger(500), ledger(50, seed=1)
+    updates, deletes = _edit(base)
+    store = _store(tmp_path, base)
+    store.append_chunks([added])
+    store.apply_changes(updates, updates.iloc[:0], deletes)
+    before = store.load()
+    store.compact()
+
+    assert store.status()["records"] == 0
+    snapshot = PartitionedBackend(str(tmp_path / "store"))
+    _assert_same_rows(snapshot.load(), before)
+    _assert_same_rows(_store(tmp_path).load(), before)
+
+
+def test_compaction_keeps_manifest_stats(tmp_path, ledger):
+    store = _store(tmp_path, ledger(500))
+    store.append_chunks([ledger(50, seed=1)])
+    updates, deletes = _edit(store.load())
+    store.apply_changes(updates, updates.iloc[:0], deletes)
+    store.compact()
+
+    snapshot = PartitionedBackend(str(tmp_path / "store"))
+    for key, stats in snapshot.manifest().items():
+        fresh = snapshot._stats(key, snapshot._partition(key).load())
+        assert stats["total"] == pytest.approx(fresh["total"])
+        assert {k: v for k, v in stats.items() if k != "total"} == {k: v for k, v in fresh.items() if k != "total"}
+
+
+def test_compaction_rewrites_only_edited_partitions(tmp_path, ledger):
+    base = ledger(500)
+    store = _store(tmp_path, base)
+    snapshot = PartitionedBackend(str(tmp_path / "store"))
+    edited = base.iloc[[0]].assign(PricePaid=2.0)
+    key = edited["Date"].iloc[0].strftime("%Y-%m")
+    untouched = {k: os.stat(snapshot._file(k)).st_mtime_ns for k in snapshot.manifest() if k != key}
+    store.apply_changes(edited, edited.iloc[:0], [])
+    store.compact()
+
+    assert {k: os.stat(snapshot._file(k)).st_mtime_ns for k in untouched} == untouched
+    assert snapshot.load().set_index("RowID").loc[edited["RowID"].iloc[0], "PricePaid"] == 2.0
+
+
+def test_refold_is_idempotent(tmp_path, ledger):
+    base, added = ledger(300), ledger(30, seed=1)
+    updates, deletes = _edit(base)
+    store = _store(tmp_path, base)
+    store.append_chunks([added])
+    store.apply_changes(updates, updates.iloc[:0], deletes)
+    upserts, deleted = store.overlay()
+    store.compact()
+    folded = PartitionedBackend(str(tmp_path / "store")).load()
+
+    # A crash before the checkpoint replays the same net changes on the next fold
+    again = PartitionedBackend(str(tmp_path / "store"))
+    again.apply_changes(upserts, upserts.iloc[:0], sorted(deleted))
+    _assert_same_rows(again.load(), folded)
+
+
+def test_save_folds_the_journal_first(tmp_path, ledger):
+    base = ledger(100)
+    store = _store(tmp_path, base)
+    store.append_chunks([ledger(10, seed=1)])
+    store.save(base.iloc[:60])
+
+    assert store.status()["records"] == 0
+    _assert_same_rows(_store(tmp_path).load(), base.iloc[:60])
@@ -0,0 +1,56 @@
+# tests/test_row_changes.py
+import pandas as pd
+import pytest
+
+from core.schema import apply_schema, to_editable, with_row_ids
+from core.storage_backends import apply_row_changes
+from ui_components import editor_deltas
+
+
+@pytest.fixture
+def rows():
+    return apply_schema(pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=5),
+        "Shop": ["a", "b", "c", "d", "e"],
+        "PricePaid": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "RowID": [11, 12, 13, 14, 15],
+    }))
+
+
+def test_updates_keep_their_position(rows):
+    updates = rows.iloc[[3, 1]].assign(PricePaid=[40.0, 20.0])
+    out = apply_row_changes(rows, updates, rows.iloc[:0], [])
+    assert out["RowID"].tolist() == [11, 12, 13, 14, 15]
+    assert out["PricePaid"].tolist() == [1.0, 20.0, 3.0, 40.0, 5.0]
+
+
+def test_deletes_and_inserts(rows):
+    inserts = apply_schema(with_row_ids(pd.DataFrame({"Date": ["2024-02-01"], "Shop": ["new"], "PricePaid": [9.0]})))
+    out = apply_row_changes(rows, rows.iloc[:0], inserts, [12, 15, 999])
+    assert out["Shop"].astype(str).tolist() == ["a", "c", "d", "new"]
+    assert out["RowID"].iloc[-1] == inserts["RowID"].iloc[0]
+
+
+def test_unknown_update_ids_are_appended(rows):
+    unknown = rows.iloc[[0]].assign(RowID=99, Shop="elsewhere")
+    out = apply_row_changes(rows, unknown, rows.iloc[:0], [])
+    assert out["RowID"].tolist() == [11, 12, 13, 14, 15, 99]
+
+
+def test_applying_twice_changes_nothing(rows):
+    updates = rows.iloc[[2]].assign(PricePaid=30.0)
+    once = apply_row_changes(rows, updates, rows.iloc[:0], [14])
+    twice = apply_row_changes(once, updates, rows.iloc[:0], [14])
+    pd.testing.assert_frame_equal(once, twice)
+
+
+def test_editor_deltas_drop_edits_to_deleted_rows(rows):
+    state = {
+        "edited_rows": {"1": {"PricePaid": 0.5}, "3": {"Shop": "d2"}},
+        "deleted_rows": [1, 4],
+        "added_rows": [{"Date": "2024-02-01", "Shop": "new", "PricePaid": 9.0}],
+    }
+    updates, inserts, deletes = editor_deltas(to_editable(rows), state)
+    assert updates["RowID"].tolist() == [14] and updates["Shop"].tolist() == ["d2"]
+    assert deletes == [12, 15]
+    assert "RowID" not in inserts.columns and inserts["Shop"].tolist() == ["new"]
@@ -0,0 +1,136 @@
+# tests/test_sheets_backend.py
+import pandas as pd
+import pytest
+
+from core.schema import EXPECTED_COLUMNS, apply_schema
+from core.storage_backends import SheetsBackend, _to_sheet_rows
+
+gspread_utils = pytest.importorskip("gspread.utils")
+
+
+class FakeWorksheet:
+    """In-memory stand-in for a gspread worksheet: a list of rows, header first, plus the calls made."""
+    id = 1
+
+    def __init__(self, values=None):
+        self.values = [list(row) for row in values or [EXPECTED_COLUMNS]]
+        self.calls = []
+        self.updated = 0
+        self.spreadsheet = self
+
+    def get_lastUpdateTime(self):
+        return str(self.updated)
+
+    def _write(self, call):
+        self.calls.append(call)
+        self.updated += 1
+
+    def get_all_values(self):
+        return [list(row) for row in self.values]
+
+    def clear(self):
+        self.values = []
+        self._write(("clear",))
+
+    def append_row(self, row):
+        self.values.append(list(row))
+        self._write(("append", 1))
+
+    def append_rows(self, rows):
+        self.values.extend(list(row) for row in rows)
+        self._write(("append", len(rows)))
+
+    def batch_update(self, updates):
+        for update in updates:
+            grid = gspread_utils.a1_range_to_grid_range(update["range"])
+            for offset, row in enumerate(update["values"]):
+                self.values[grid["startRowIndex"] + offset] = list(row)
+        self._write(("update", sum(len(u["values"]) for u in updates)))
+
+    def delete_rows(self, start, end):
+        del self.values[start - 1:end]
+        self._write(("delete", end - start + 1))
+
+    def insert_rows(self, rows, row):
+        self.values[row - 1:row - 1] = [list(r) for r in rows]
+        self._write(("insert", len(rows)))
+
+
+def _rows(n, shops=None):
+    """n typed rows; shops maps a position to a Shop other than "shop <position>"."""
+    return apply_schema(pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=n),
+        "Shop": [(shops or {}).get(i, f"shop {i}") for i in range(n)],
+        "PricePaid": [float(i + 1) for i in range(n)],
+        "RowID": range(1, n + 1),
+    }))[EXPECTED_COLUMNS]
+
+
+@pytest.fixture
+def synced(tmp_path):
+    """A backend synced with a sheet holding ten rows, and that sheet."""
+    sheet = FakeWorksheet()
+    backend = SheetsBackend(sheet, str(tmp_path / "mirror.json"))
+    backend.save(_rows(10), mode="resync")
+    sheet.calls.clear()
+    return backend, sheet
+
+
+def _shops(sheet):
+    return [row[EXPECTED_COLUMNS.index("Shop")] for row in sheet.values[1:]]
+
+
+def test_edit_is_one_batch_update(synced):
+    backend, sheet = synced
+    df = _rows(10, shops={4: "edited"})
+    backend.save(df)
+
+    assert sheet.calls == [("update", 1)]
+    assert _shops(sheet)[4] == "edited"
+
+
+def test_delete_and_insert_in_place(synced):
+    backend, sheet = synced
+    df = _rows(10).drop(index=[2, 3])
+    extra = _rows(12).iloc[[10]]
+    df = pd.concat([df.iloc[:5], extra, df.iloc[5:]], ignore_index=True)
+    backend.save(df)
+
+    assert sorted(sheet.calls) == [("delete", 2), ("insert", 1)]
+    assert sheet.values[1:] == _to_sheet_rows(df)
+
+
+def test_new_rows_at_the_end_are_appended(synced):
+    backend, sheet = synced
+    backend.save(_rows(13))
+
+    assert sheet.calls == [("append", 3)]
+    assert _shops(sheet) == [f"shop {i}" for i in range(13)]
+
+
+def test_unchanged_save_writes_nothing(synced):
+    backend, sheet = synced
+    backend.save(_rows(10))
+    assert sheet.calls == []
+
+
+def test_mixed_changes_match_the_frame(synced):
+    backend, sheet = synced
+    df = _rows(14).drop(index=[0, 7])
+    df.loc[[3, 9], "PricePaid"] = 99.0
+    backend.save(df)
+
+    assert sheet.values[1:] == _to_sheet_rows(df)
+    assert backend.load().values.tolist() == _to_sheet_rows(df)  # the mirror matches too
+
+
+def test_diff_against_remote_edits(synced, tmp_path):
+    backend, sheet = synced
+    sheet.values[3][EXPECTED_COLUMNS.index("Shop")] = "remote"
+    sheet.updated += 1
+    df = _rows(10, shops={5: "local"})
+    backend.save(df)
+
+    # The save refreshes first, so the remote edit is diffed (and overwritten) rather than missed
+    assert _shops(sheet) == df["Shop"].astype(str).tolist()
+    assert ("update", 2) in sheet.calls
@@ -1,10 +1,18 @@
 # ui_components.py
+from calendar import month_name
+
 import streamlit as st
 import pandas as pd
-from currency_manager import get_exchange_rate
-from utils import calculate_price_per_unit
-from config import SUPPORTED_CURRENCIES, DEFAULT_CURRENCY
-from data_manager import bump_data_version
+from core.currency_manager import get_exchange_rate, unconverted_counts
+from config import SUPPORTED_CURRENCIES, DEFAULT_CURRENCY, TABLE_PAGE_SIZES, TABLE_PAGE_SIZE
+from core.schema import apply_schema, to_editable, with_row_ids
+from core.bitmap_index import filter_index
+from core.derived import DERIVED_ONLY, add_derived
+from core import tracing
+from core.tracing import traced
+from data_manager import (
+    query_data, reporting_rows, distinct_values, value_range, apply_edits
+)
 
 
 # ====================================================
@@ -33,6 +41,63 @@ def theme_css(dark: bool):
     st.markdown(css, unsafe_allow_html=True)
 
 
+# ====================================================
+# 💱 REPORTING CURRENCY
+# ====================================================
+def reporting_currency_select():
+    """Sidebar choice of the currency every total is reported in (kept across pages)."""
+    current = st.session_state.get("reporting_currency", DEFAULT_CURRENCY)
+    currency = st.sidebar.selectbox(
+        "💱 Reporting currency", SUPPORTED_CURRENCIES, index=SUPPORTED_CURRENCIES.index(current)
+    )
+    st.session_state["reporting_currency"] = currency
+    return currency
+
+
+def missing_rate_warning(report, currency):
+    """Warn when rows of report (with an Amount column) have no rate into currency."""
+    missing = unconverted_counts(report)
+    if missing:
+        rows = ", ".join(f"{n:,} {code}" for code, n in missing.items())
+        st.warning(f"⚠️ No exchange rate into {currency} for {rows} row(s): they are left out of the totals until a rate is available.")
+
+
+# ====================================================
+# 📄 PAGINATED TABLES
+# ====================================================
+@traced("paginate")
+def paginate(df, key, sort_columns=None, page_size=TABLE_PAGE_SIZE):
+    """
+    Sort / page-size / page controls for a large table.
+    Returns (page, view_key): only the rows of the visible page, so just those
+    are serialized to the browser, and a key identifying the current view
+    (sort, size, page) for widgets that must not carry state across pages.
+    """
+    sort_columns = [c for c in (sort_columns or df.columns) if c in df.columns]
+    col_sort, col_order, col_size, col_page = st.columns([2, 1, 1, 1])
+    with col_sort:
+        sort_by = st.selectbox("Sort by", sort_columns, key=f"{key}_sort")
+    with col_order:
+        descending = st.toggle("Descending", value=True, key=f"{key}_desc")
+    with col_size:
+        size = st.selectbox(
+            "Rows per page", TABLE_PAGE_SIZES,
+            index=TABLE_PAGE_SIZES.index(page_size) if page_size in TABLE_PAGE_SIZES else 0, key=f"{key}_size",
+        )
+    pages = max(1, -(-len(df) // size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages  # the data shrank under the selected page
+    with col_page:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    order = df[sort_by].reset_index(drop=True).sort_values(
+        ascending=not descending, na_position="last", kind="stable"
+    ).index
+    start = (page - 1) * size
+    st.caption(f"Rows {min(start + 1, len(df)):,}–{min(start + size, len(df)):,} of {len(df):,}")
+    return df.iloc[order[start:start + size]], f"{key}_{sort_by}_{descending}_{size}_{page}"
+
+
 # ====================================================
 # ➕ ADD EXPENSE
 # ====================================================
@@ -44,12 +109,11 @@ def sidebar_add_expense(df, save_fn):
         date = st.date_input("Date")
         expense_type = st.selectbox("Expense Type", ["Goods", "Service"])
         shop = st.text_input("Shop")
-        currency = st.selectbox("Currency", ["SEK", "INR"])
-        if currency == "INR":
-            rate = get_exchange_rate("INR", "SEK")
-            st.caption(f"Live rate: 1 INR = {rate:.2f} SEK" if rate else "Rate unavailable")
-        else:
-            rate = 1.0
+        currency = st.selectbox("Currency", SUPPORTED_CURRENCIES, index=SUPPORTED_CURRENCIES.index(DEFAULT_CURRENCY))
+        if currency != DEFAULT_CURRENCY:
+            # Amounts are stored as paid; reports convert them into the reporting currency
+            rate = get_exchange_rate(currency, DEFAULT_CURRENCY)
+            st.caption(f"Rate today: 1 {currency} = {rate:.2f} {DEFAULT_CURRENCY}" if rate else "Rate unavailable")
 
         st.divider()
         st.markdown("#### 🧾 Add Items for this Expense")
@@ -77,10 +141,7 @@ def sidebar_add_expense(df, save_fn):
                 unit = st.text_input("Unit", st.session_state["temp_inputs"]["unit"])
 
                 # Amount input
-                if currency == "INR":
-                    amount_str = st.text_input("Amount (INR)", st.session_state["temp_inputs"]["amount"])
-                else:
-                    amount_str = st.text_input("Amount (SEK)", st.session_state["temp_inputs"]["amount"])
+                amount_str = st.text_input(f"Amount ({currency})", st.session_state["temp_inputs"]["amount"])
 
             submitted_item = st.form_submit_button("➕ Add Item")
             if submitted_item:
@@ -95,8 +156,7 @@ def sidebar_add_expense(df, save_fn):
                     st.warning("⚠️ Invalid amount entered.")
                     amount = 0.0
 
-                price = round(amount * rate, 2)
-                price_per_unit = round(price / quantity, 2) if quantity else 0
+                price = round(amount, 2)
 
                 new_item = {
                     "Category": category or "Uncategorized",
@@ -107,7 +167,6 @@ def sidebar_add_expense(df, save_fn):
                     "QuantityUnit": unit,
                     "PricePaid": price,
                     "Currency": currency,
-                    "PricePerUnit": price_per_unit,
                 }
 
                 st.session_state["multi_items"].append(new_item)
@@ -148,8 +207,8 @@ def sidebar_add_expense(df, save_fn):
                         }
                         new_rows.append(row)
 
-                    df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
-                    save_fn(df)
+                    new_df = add_derived(apply_schema(with_row_ids(pd.DataFrame(new_rows))), ["PricePerUnit"])
+                    save_fn(df, new_df)  # writes only new_df
                     st.success(f"✅ Added {len(new_rows)} expense entries successfully!")
 
                     # Clear all after saving
@@ -159,186 +218,229 @@ def sidebar_add_expense(df, save_fn):
                         "quantity": "", "unit": "Count", "amount": ""
                     }
 
-                    bump_data_version()
                     st.rerun()
 
 
+# ====================================================
+# 📅 PERIOD SELECTION
+# ====================================================
+def period_options(df, storage=None):
+    """
+    Years with dated rows (newest first) and a function year -> its months,
+    from the store when it supports pushdown (partitioned: the manifest alone),
+    else from the bitmap index over df.
+    """
+    if storage is not None and storage.supports_pushdown:
+        def months(year):
+            return distinct_values(storage=storage, column="Month", filters={"Year": [year]})
+        years = distinct_values(storage=storage, column="Year")
+    else:
+        index = filter_index(df)
+
+        def months(year):
+            return index.options("Month", {"Year": [year]})
+        years = index.options("Year")
+    return sorted((int(y) for y in years), reverse=True), lambda year: [int(m) for m in months(year)]
+
+
+def selected_period(years, months, key):
+    """
+    Year / Month filters picked in period_select's widgets, read from their
+    state before they are drawn so that only this period has to be loaded.
+    None when there are no dated rows.
+    """
+    if not years:
+        return None
+    if st.session_state.get(f"{key}_year") not in years:
+        st.session_state[f"{key}_year"] = years[0]
+    year = st.session_state[f"{key}_year"]
+    month_names = {month_name[m]: m for m in months(year)}
+    if st.session_state.get(f"{key}_month") not in month_names:
+        st.session_state[f"{key}_month"] = "All"  # month not in this year (or first run)
+    period = {"Year": [year]}
+    if st.session_state[f"{key}_month"] != "All":
+        period["Month"] = [month_names[st.session_state[f"{key}_month"]]]
+    return period
+
+
+def period_select(years, months, key):
+    """The Year and Month selectboxes behind selected_period."""
+    col_year, col_month = st.columns([1, 1])
+    with col_year:
+        year = st.selectbox("Select Year", years, key=f"{key}_year")
+    with col_month:
+        st.selectbox("Select Month", ["All"] + [month_name[m] for m in months(year)], key=f"{key}_month")
+
+
 # ====================================================
 # 🔍 FILTERS
 # ====================================================
-def filter_section(df):
-    """Sidebar filters for date, category, shop, price, etc."""
+@traced("filter_section", arg=None)
+def filter_section(df, storage=None, scope=None, currency=DEFAULT_CURRENCY):
+    """
+    Sidebar filters for date, category, shop, price, etc.
+    With a pushdown-capable storage (partitioned, SQLite), options come straight
+    from the store and df may be None; otherwise from the in-memory bitmap
+    index. The rows of scope (e.g. the selected period) are read once, with
+    their Amount in currency, per data version (data_manager.reporting_rows);
+    the sidebar's filters are applied to them through their bitmap index.
+    """
     import streamlit as st
     import pandas as pd
 
     st.sidebar.markdown("### 🔍 Filters")
 
-    if df.empty:
+    pushdown = storage is not None and storage.supports_pushdown
+
+    if not pushdown and df.empty:
         st.sidebar.info("No data available.")
         return df
 
-    # --- Ensure Date column is datetime ---
-    if "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
     # Safe unique lists
-    categories = sorted(df["Category"].dropna().unique().tolist()) if "Category" in df.columns else []
-    shops = sorted(df["Shop"].dropna().unique().tolist()) if "Shop" in df.columns else []
+    if pushdown:
+        categories = distinct_values(storage=storage, column="Category")
+        shops = distinct_values(storage=storage, column="Shop")
+        date_low, date_high = value_range(storage=storage, column="Date")
+    else:
+        index = filter_index(df)
+        categories = index.options("Category")
+        shops = index.options("Shop")
+        has_dates = "Date" in df.columns and df["Date"].notna().any()
+        date_low, date_high = (df["Date"].min(), df["Date"].max()) if has_dates else (None, None)
 
     selected_categories = st.sidebar.multiselect("Category", options=categories)
     selected_shops = st.sidebar.multiselect("Shop", options=shops)
 
-    # Price slider
-    price_max = float(df["PricePaid"].max()) if "PricePaid" in df.columns and not df["PricePaid"].isna().all() else 1000.0
-    min_price, max_price = st.sidebar.slider("Price Range (SEK)", 0.0, price_max, (0.0, price_max))
+    rows = reporting_rows(storage=storage, filters=scope, currency=currency)
+
+    # Price slider, over the Amount the totals add up (PricePaid mixes currencies)
+    price_high = rows["Amount"].max() if len(rows) else None
+    price_max = float(price_high) if price_high is not None and pd.notna(price_high) else 1000.0
+    min_price, max_price = st.sidebar.slider(f"Price Range ({currency})", 0.0, price_max, (0.0, price_max))
 
     # --- Date Range Filter ---
     start_date, end_date = None, None
-    if "Date" in df.columns and df["Date"].notna().any():
-        min_date = df["Date"].min().date()
-        max_date = df["Date"].max().date()
+    if date_low is not None and pd.notna(date_low):
+        min_date = date_low.date()
+        max_date = date_high.date()
         start_date, end_date = st.sidebar.date_input("📅 Date Range", [min_date, max_date])
     # If no valid dates, start_date/end_date remain None
 
     # --- Apply filters ---
-    df_filtered = df.copy()
-
-    if selected_categories and "Category" in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered["Category"].isin(selected_categories)]
-    if selected_shops and "Shop" in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered["Shop"].isin(selected_shops)]
-    if start_date and end_date and "Date" in df_filtered.columns:
-        df_filtered = df_filtered[
-            (df_filtered["Date"].dt.date >= start_date) &
-            (df_filtered["Date"].dt.date <= end_date)
-        ]
-    if "PricePaid" in df_filtered.columns:
-        df_filtered = df_filtered[
-            (df_filtered["PricePaid"] >= min_price) &
-            (df_filtered["PricePaid"] <= max_price)
-        ]
-
-    return df_filtered
+    filters = {
+        "Category": selected_categories,
+        "Shop": selected_shops,
+    }
+    if (min_price, max_price) != (0.0, price_max):
+        filters["Amount"] = (min_price, max_price)  # untouched, it keeps rows without a rate (missing_rate_warning)
+    if start_date and end_date:
+        filters["Date"] = (start_date, end_date)
+
+    return filter_index(rows).take(rows, filters)
 
 
 # ====================================================
 # ✏️ INLINE EDITOR (EDIT / DELETE)
 # ====================================================
-def inline_edit_table(df, save_fn, sheet=None):
+def hidden_columns():
+    """column_config hiding bookkeeping and derived columns from tables and editors."""
+    return {name: None for name in ["RowID"] + DERIVED_ONLY}
+
+
+def editor_deltas(shown, state):
+    """
+    (updates, inserts, deleted RowIDs) from st.data_editor's edit state for
+    the frame it was given. Only touched rows are materialized; their derived
+    columns (PricePerUnit, ...) are recomputed by data_manager.apply_edits.
+    """
+    deleted = set(state.get("deleted_rows", []))
+    edited = {int(pos): cells for pos, cells in state.get("edited_rows", {}).items() if int(pos) not in deleted}
+
+    updates = shown.iloc[list(edited)].copy()
+    for label, cells in zip(updates.index, edited.values()):
+        for column, value in cells.items():
+            updates.at[label, column] = value
+    inserts = pd.DataFrame(state.get("added_rows", []), columns=shown.columns).drop(columns="RowID")
+    deletes = shown["RowID"].iloc[sorted(deleted)].tolist()
+    return updates, inserts, deletes
+
+
+@traced("inline_edit_table", arg=None)
+def inline_edit_table(df, storage=None):
+    """
+    Year → Month → cascading detail filters over the ledger, then an editable table.
+    With a pushdown-capable storage df may be None: Year / Month options come
+    from the store and only the selected period is loaded (once per storage
+    fingerprint); the detail cascade filters that frame. Saving sends only the
+    edited, added and deleted rows (matched on RowID).
+    """
     import streamlit as st
     import pandas as pd
 
     st.subheader("✏️ Edit or Delete Entries (by Year → Month)")
 
-    if df.empty:
+    pushdown = storage is not None and storage.supports_pushdown
+
+    if not pushdown and (df is None or df.empty):
         st.info("No data to edit.")
         return
 
-    # Ensure Date is datetime
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-
-    # Extract year/month
-    df["Year"] = df["Date"].dt.year
-    df["Month"] = df["Date"].dt.month
-    df["MonthName"] = df["Date"].dt.strftime("%B")
-
-    df["Date"] = df["Date"].dt.date
+    def period_values(column, filters):
+        if pushdown:
+            return distinct_values(storage=storage, column=column, filters=filters)
+        return filter_index(df).options(column, filters)
 
     # ---------------- YEAR & MONTH FILTERS ----------------
+    years = [int(y) for y in period_values("Year", {})]
+    if not years:
+        st.info("No data to edit.")
+        return
+
     col_year, col_month = st.columns([1, 1])
 
-    years = sorted(df["Year"].dropna().unique().tolist(), reverse=True)
-    years_display = ["All"] + [str(y) for y in years]
+    years_display = ["All"] + [str(y) for y in sorted(years, reverse=True)]
 
     with col_year:
         selected_year = st.selectbox("📅 Select Year", years_display, key="year_select")
 
-    if selected_year != "All":
-        months = (
-            df[df["Year"] == int(selected_year)][["Month", "MonthName"]]
-            .drop_duplicates()
-            .sort_values("Month")
-        )
-    else:
-        months = df[["Month", "MonthName"]].drop_duplicates().sort_values("Month")
+    period = {"Year": [int(selected_year)]} if selected_year != "All" else {}
+    months = [int(m) for m in period_values("Month", period)]
 
-    month_options = ["All"] + months["MonthName"].tolist()
-    month_map = dict(zip(months["MonthName"], months["Month"]))
+    month_options = ["All"] + [month_name[m] for m in months]
+    month_map = {month_name[m]: m for m in months}
 
     with col_month:
         selected_month_name = st.selectbox("🗓️ Select Month", month_options, key="month_select")
 
-    # ---------------- DEPENDENT FILTERS ----------------
-    st.markdown("### 🔍 Filter by Expense Details")
-    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    if selected_month_name != "All":
+        period["Month"] = [month_map[selected_month_name]]
 
-    base_df = df.copy()
+    # The period's rows, loaded once; every detail option and the final filter come from them
+    rows = query_data(storage=storage, filters=period) if pushdown else df
+    index = filter_index(rows)
 
-    # Expense Type
-    with col1:
-        f_exp = st.multiselect(
-            "Expense Type",
-            sorted(base_df["ExpenseType"].dropna().unique()),
-            key="filter_exp"
-        )
-    df1 = base_df[base_df["ExpenseType"].isin(f_exp)] if f_exp else base_df
-
-    # Category
-    with col2:
-        f_cat = st.multiselect(
-            "Category",
-            sorted(df1["Category"].dropna().unique()),
-            key="filter_cat"
-        )
-    df2 = df1[df1["Category"].isin(f_cat)] if f_cat else df1
-
-    # Subcategory
-    with col3:
-        f_sub = st.multiselect(
-            "Subcategory",
-            sorted(df2["Subcategory"].dropna().unique()),
-            key="filter_sub"
-        )
-    df3 = df2[df2["Subcategory"].isin(f_sub)] if f_sub else df2
-
-    # Item
-    with col4:
-        f_item = st.multiselect(
-            "Item",
-            sorted(df3["Item"].dropna().unique()),
-            key="filter_item"
-        )
-    df4 = df3[df3["Item"].isin(f_item)] if f_item else df3
-
-    # Brand
-    with col5:
-        f_brand = st.multiselect(
-            "Brand",
-            sorted(df4["Brand"].dropna().unique()),
-            key="filter_brand"
-        )
-    df5 = df4[df4["Brand"].isin(f_brand)] if f_brand else df4
-
-    # Shop
-    with col6:
-        f_shop = st.multiselect(
-            "Shop",
-            sorted(df5["Shop"].dropna().unique()),
-            key="filter_shop"
-        )
-    df6 = df5[df5["Shop"].isin(f_shop)] if f_shop else df5
+    # ---------------- DEPENDENT FILTERS ----------------
+    st.markdown("### 🔍 Filter by Expense Details")
+    cascade = [
+        ("ExpenseType", "Expense Type", "filter_exp"),
+        ("Category", "Category", "filter_cat"),
+        ("Subcategory", "Subcategory", "filter_sub"),
+        ("Item", "Item", "filter_item"),
+        ("Brand", "Brand", "filter_brand"),
+        ("Shop", "Shop", "filter_shop"),
+    ]
+
+    # Each dropdown only offers values of the period left after the selections to its left
+    detail_filters = {}
+    for col, (column, label, key) in zip(st.columns(len(cascade)), cascade):
+        with col:
+            detail_filters[column] = st.multiselect(label, index.options(column, {**period, **detail_filters}), key=key)
 
     # -------------- FINAL FILTER APPLICATION --------------
-    filtered_df = df6.copy()
+    filters = dict(detail_filters)
+    filters.update(period)
 
-    if selected_year != "All":
-        filtered_df = filtered_df[filtered_df["Year"] == int(selected_year)]
-
-    if selected_month_name != "All":
-        filtered_df = filtered_df[filtered_df["Month"] == month_map[selected_month_name]]
-    
-    filtered_df["Date"] = filtered_df["Date"]
+    filtered_df = index.take(rows, filters)
 
     st.markdown("### 🧾 Filtered Entries")
 
@@ -346,39 +448,78 @@ def inline_edit_table(df, save_fn, sheet=None):
         st.info("No entries match your filters.")
         return
 
-    # ---------------- EDITABLE TABLE ----------------
-    edited_df = st.data_editor(
-        filtered_df.drop(columns=["Year", "Month", "MonthName"]),
+    # ---------------- EDITABLE TABLE (one page at a time) ----------------
+    page, view_key = paginate(filtered_df, "edit_page", sort_columns=["Date", "PricePaid", "Category", "Shop", "Item"])
+    # Plain dtypes for the editor, so new categories can be typed in; positions match the editor's rows
+    shown = to_editable(page).reset_index(drop=True)
+    editor_key = f"edit_filtered_{view_key}"  # edits stay with the page they were made on
+    st.data_editor(
+        shown,
         num_rows="dynamic",
         width="stretch",
-        key="edit_filtered",
-        hide_index=True
+        key=editor_key,
+        hide_index=True,
+        column_config=hidden_columns(),
     )
 
     # ---------------- SAVE CHANGES ----------------
-    if not edited_df.equals(filtered_df.drop(columns=["Year", "Month", "MonthName"])):
+    # The editor's own delta (edited / added / deleted rows) says what changed: no full-frame compare
+    state = st.session_state.get(editor_key) or {}
+    if any(state.get(k) for k in ("edited_rows", "added_rows", "deleted_rows")):
         st.warning("Unsaved changes detected!")
 
         if st.button("💾 Save Changes", key="save_filtered_btn"):
-            # Auto-recompute PricePerUnit
-            if "PricePaid" in edited_df.columns and "Quantity" in edited_df.columns:
-                edited_df["PricePerUnit"] = edited_df.apply(
-                    lambda x: round(x["PricePaid"] / x["Quantity"], 2)
-                    if pd.notnull(x["PricePaid"]) and pd.notnull(x["Quantity"]) and x["Quantity"] != 0
-                    else 0,
-                    axis=1
-                )
-
-            df_base = df.drop(columns=["Year", "Month", "MonthName"])
-            mask = df.index.isin(filtered_df.index)
+            updates, inserts, deletes = editor_deltas(shown, state)
+            apply_edits(updates, inserts, deletes, storage)
+            st.success("✅ Saved successfully!")
 
-            updated_df = pd.concat([df_base[~mask], edited_df], ignore_index=True)
+            del st.session_state[editor_key]  # the edits are now in the data
+            st.rerun()
 
-            save_fn(updated_df, sheet)
-            st.success("✅ Saved successfully!")
-            st.cache_data.clear()
 
-            from data_manager import bump_data_version
-            bump_data_version()
+# ====================================================
+# ⏱️ PERFORMANCE PANEL (opt-in)
+# ====================================================
+def perf_panel():
+    """
+    Close this rerun's trace and, when enabled in the sidebar, show its slowest
+    spans, rolling percentiles over recent reruns and JSON / CSV dumps.
+    Call last on a page so every span of the rerun is included.
+    """
+    spans = pd.DataFrame(tracing.current_spans())
+    rerun = tracing.finish_rerun()
+    if not st.sidebar.toggle("⏱️ Performance panel", key="perf_panel") or rerun is None:
+        return
 
-            st.rerun()
+    with st.expander(f"⏱️ Performance — rerun #{rerun['rerun']}: {rerun['ms']:,.0f} ms, {rerun['spans']} spans", expanded=True):
+        columns = ["name", "ms", "rows", "bytes", "parent", "depth"]
+        st.markdown("**Slowest spans (this rerun)**")
+        if spans.empty:
+            st.caption("No spans recorded.")
+        else:
+            st.dataframe(
+                spans.reindex(columns=columns + (["hit"] if "hit" in spans.columns else []))
+                .sort_values("ms", ascending=False).head(20),
+                hide_index=True,
+                column_config={"ms": st.column_config.NumberColumn(format="%.1f")},
+            )
+
+        history = tracing.span_history()
+        st.markdown(f"**Rolling percentiles (ms, last {len(history):,} spans)**")
+        st.dataframe(
+            tracing.percentiles(history), hide_index=True,
+            column_config={q: st.column_config.NumberColumn(format="%.1f") for q in ["p50", "p90", "p99", "max"]},
+        )
+        reruns = tracing.rerun_history()
+        if len(reruns) > 1:
+            st.line_chart(reruns.set_index("rerun")["ms"], height=160)
+
+        col_json, col_csv = st.columns(2)
+        col_json.download_button(
+            "💾 Trace (JSON)", data=lambda: tracing.dump("json"), file_name="trace.json",
+            mime="application/json", on_click="ignore",
+        )
+        col_csv.download_button(
+            "💾 Spans (CSV)", data=lambda: tracing.dump("csv"), file_name="trace_spans.csv",
+            mime="text/csv", on_click="ignore",
+        )